@@ -4,10 +4,13 @@ from fastapi.responses import FileResponse, JSONResponse
 from app.services.preprocessing import PreprocessingService
 from app.services.detection_service import DetectionService
 from app.services.scoring_engine import ScoringEngine
-import shutil
+from app.utils.stage_executor import StageExecutor
 import os
+import asyncio
+import uuid
 import uvicorn
 from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
@@ -27,14 +30,58 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Blocking pipeline stages run in these pools (sized by STAGE_THREAD_WORKERS / STAGE_PROCESS_WORKERS).
+# Worker processes are forked before any stage thread runs and before the services load model
+# weights; where fork is unavailable or unsafe (Windows, macOS) that work runs in the threads.
+stage_executor = StageExecutor()
+stage_executor.start()
+
 # Initialize services
-preprocessing_service = PreprocessingService()
-detection_service = DetectionService()
+preprocessing_service = PreprocessingService(executor=stage_executor)
+detection_service = DetectionService(executor=stage_executor)
 scoring_engine = ScoringEngine()
 
 # Store processed claims in memory (for prototype)
 claims_db = {}
 
+# Uploads are read into memory in chunks and rejected past this size
+MAX_UPLOAD_MB = float(os.getenv("MAX_UPLOAD_MB", "25"))
+UPLOAD_CHUNK_SIZE = 64 * 1024
+# The JPEG header (EXIF, ICC, XMP segments) is looked for in this much of an upload
+HEADER_SCAN_LIMIT = 1024 * 1024
+# Uploaded originals are only written to disk when a retention directory is set
+UPLOAD_RETENTION_DIR = os.getenv("UPLOAD_RETENTION_DIR", "")
+if UPLOAD_RETENTION_DIR:
+    os.makedirs(UPLOAD_RETENTION_DIR, exist_ok=True)
+
+cold_archive_task = None
+
+async def archive_cold_points_periodically(interval_seconds: float):
+    """Background job moving aged Qdrant points to the cold collection"""
+    while True:
+        try:
+            await stage_executor.run_thread(detection_service.fraud_detector.archive_cold_points)
+        except Exception as e:
+            print(f"⚠️  Cold archive failed: {e}")
+        await asyncio.sleep(interval_seconds)
+
+@app.on_event("startup")
+async def startup():
+    global cold_archive_task
+    fraud_detector = detection_service.fraud_detector
+    if fraud_detector.use_qdrant and fraud_detector.cold_after_days > 0:
+        interval_hours = float(os.getenv("QDRANT_COLD_ARCHIVE_INTERVAL_HOURS", "24"))
+        cold_archive_task = asyncio.create_task(archive_cold_points_periodically(interval_hours * 3600))
+
+@app.on_event("shutdown")
+async def shutdown():
+    if cold_archive_task is not None:
+        cold_archive_task.cancel()
+    # Flush Qdrant writes still sitting in the write-behind buffer
+    await detection_service.fraud_detector.close()
+    await detection_service.llava_analyzer.close()
+    stage_executor.shutdown()
+
 @app.get("/")
 async def root():
     return {
@@ -45,6 +92,7 @@ async def root():
             "analyze_claim": "/api/analyze-claim",
             "get_claim": "/api/claim/{job_id}",
             "list_claims": "/api/claims",
+            "ollama_metrics": "/api/ollama/metrics",
             "health": "/health"
         }
     }
@@ -63,6 +111,33 @@ async def health_check():
         }
     }
 
+async def read_upload(image: UploadFile) -> Tuple[bytes, Optional[Dict[str, Any]]]:
+    """Upload bytes (at most MAX_UPLOAD_MB), and the JPEG header fields parsed as soon as they arrive"""
+    buffer = bytearray()
+    header = None
+    while True:
+        chunk = await image.read(UPLOAD_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer.extend(chunk)
+        if len(buffer) > MAX_UPLOAD_MB * 1024 * 1024:
+            raise HTTPException(
+                status_code=413,
+                detail=f"Image exceeds the {MAX_UPLOAD_MB:g} MB upload limit"
+            )
+        if header is None and len(buffer) - len(chunk) < HEADER_SCAN_LIMIT and buffer[:3] == b"\xff\xd8\xff":
+            header = preprocessing_service.metadata_extractor.parse_header(bytes(buffer))
+    return bytes(buffer), header
+
+def retained_upload_path(filename: Optional[str]) -> str:
+    """Unique path for a retained upload: two claims sending IMG_0001.jpg do not collide"""
+    name = os.path.basename(filename or "") or "upload"
+    return os.path.join(UPLOAD_RETENTION_DIR, f"{uuid.uuid4().hex}_{name}")
+
+def write_file(path: str, data: bytes):
+    with open(path, "wb") as f:
+        f.write(data)
+
 @app.post("/api/analyze-claim")
 async def analyze_claim(
     image: UploadFile = File(...),
@@ -89,14 +164,15 @@ async def analyze_claim(
             detail="Claim description must be at least 10 characters"
         )
     
-    # Save uploaded file
-    os.makedirs("data/uploads", exist_ok=True)
-    temp_path = f"data/uploads/{image.filename}"
+    # Read the upload into memory; it is only written to disk for retention, off the event loop
+    image_bytes, header = await read_upload(image)
+    original_path = None
+    retention = None
+    if UPLOAD_RETENTION_DIR:
+        original_path = retained_upload_path(image.filename)
+        retention = asyncio.create_task(stage_executor.run_thread(write_file, original_path, image_bytes))
     
     try:
-        with open(temp_path, "wb") as buffer:
-            shutil.copyfileobj(image.file, buffer)
-        
         print(f"\n{'='*70}")
         print(f"Processing claim: {claim_description[:50]}...")
         print(f"{'='*70}\n")
@@ -104,9 +180,11 @@ async def analyze_claim(
         # Step 1: Preprocess
         print("📋 Step 1/5: Preprocessing...")
         preprocess_result = await preprocessing_service.process_claim_image(
-            temp_path,
+            original_path,
             claim_date,
-            claim_description
+            claim_description,
+            image_bytes=image_bytes,
+            header=header
         )
         print("✓ Preprocessing complete")
         
@@ -117,7 +195,12 @@ async def analyze_claim(
             preprocess_result["job_id"],
             claim_description,
             preprocess_result["metadata"],
-            preprocess_result["validation"]
+            preprocess_result["validation"],
+            policy_id=policy_id,
+            claim_location=claim_location,
+            original_path=preprocess_result["original_path"] or "",
+            tamper_screen=preprocess_result["tamper_screen"],
+            bundle=preprocess_result["bundle"]
         )
         print("✓ AI analysis complete")
         
@@ -163,7 +246,8 @@ async def analyze_claim(
             "job_id": preprocess_result["job_id"],
             "claim_info": claim_record["claim_info"],
             "report": report,
-            "annotated_image_url": f"/api/annotated-image/{preprocess_result['job_id']}"
+            "annotated_image_url": f"/api/annotated-image/{preprocess_result['job_id']}",
+            "thumbnail_url": f"/api/thumbnail/{preprocess_result['job_id']}"
         }
     
     except Exception as e:
@@ -171,9 +255,16 @@ async def analyze_claim(
         raise HTTPException(status_code=500, detail=str(e))
     
     finally:
-        # Cleanup temp file
-        if os.path.exists(temp_path):
-            os.remove(temp_path)
+        if retention is not None:
+            try:
+                await retention
+            except OSError as e:
+                print(f"⚠️  Could not retain upload {original_path}: {e}")
+
+@app.get("/api/ollama/metrics")
+async def ollama_metrics():
+    """In-flight and queued LLaVA requests, and queue wait vs generation time of recent ones"""
+    return detection_service.llava_analyzer.client.metrics()
 
 @app.get("/api/claim/{job_id}")
 async def get_claim(job_id: str):
@@ -214,6 +305,16 @@ async def get_annotated_image(job_id: str):
     
     return FileResponse(image_path, media_type="image/jpeg")
 
+@app.get("/api/thumbnail/{job_id}")
+async def get_thumbnail(job_id: str):
+    """Retrieve the small preview of a claim image"""
+    image_path = f"data/uploads/thumbnails/{job_id}.jpg"
+    
+    if not os.path.exists(image_path):
+        raise HTTPException(status_code=404, detail="Thumbnail not found")
+    
+    return FileResponse(image_path, media_type="image/jpeg")
+
 if __name__ == "__main__":
     print("\n" + "="*70)
     print("🚀 Starting Insurance Claim Validation API")
@@ -1,15 +1,61 @@
-import imagehash
-from PIL import Image
 from typing import Dict, Any, List, Optional
 import numpy as np
-from datetime import datetime
+from PIL import Image
+from datetime import datetime, timedelta
 import os
-import json
+import asyncio
+import atexit
+import hashlib
+import io
+import struct
+import threading
+import time
+import uuid
+from app.utils.ann_index import IVFPQIndex
+from app.utils.geometric_verify import FeatureCache, OrbVerifier
+from app.utils.hamming import HASH_FIELDS, PackedHashColumns, hamming_distances, hash_distances, hex_to_uint64
+from app.utils.hash_index import ExactHashIndex, MultiIndexHashIndex
+from app.utils.jpeg_forensics import (
+    CAMERA_SIGNATURES_PATH, EDITOR_SEGMENTS, QuantTableIndex, estimate_quality, exif_thumbnail,
+    read_jpeg_structure, table_signature, thumbnail_structure
+)
+from app.utils.jpeg_header import HeaderParseError, read_jpeg_header
+from app.utils.hash_store import MAX_STORED_TILES, EmbeddingLogStore, HashLogStore, TileLogStore
+from app.utils.perceptual_hash import PerceptualHasher
+from app.utils.stage_executor import StageExecutor
+from app.utils.tile_hash import TileHasher, TileHashIndex
+
+# Bits per perceptual hash; Qdrant stores each hash as a +1/-1 vector of this size
+HASH_VECTOR_SIZE = 64
+
+# Namespace for point IDs of job IDs that are not UUIDs themselves
+POINT_ID_NAMESPACE = uuid.UUID("5b7f0a64-3c1e-4e8a-9d2f-1a6c0e4b7d93")
+
+# Collection written by earlier versions (single 64-dim 0/1 vector, cosine)
+LEGACY_COLLECTION_NAME = "claim_images"
+
+# Payload indexes: sha256 backs the exact tier, the rest back scoped (filtered) search
+PAYLOAD_INDEXES = (
+    ("sha256", "keyword"),
+    ("timestamp", "datetime"),
+    ("policy_id", "keyword"),
+    ("claim_location", "keyword"),
+)
+
+# EXIF Software values that mark an edited image (lowercase substrings)
+EDITING_SOFTWARE = ("photoshop", "gimp", "pixlr", "lightroom", "snapseed")
 
 class FraudDetector:
-    def __init__(self, use_qdrant: bool = None, qdrant_host: str = None, qdrant_port: int = None):
+    def __init__(self,
+                 use_qdrant: bool = None,
+                 qdrant_host: str = None,
+                 qdrant_port: int = None,
+                 executor: Optional[StageExecutor] = None):
         """Initialize fraud detection system with optional Qdrant support"""
         
+        # The *_async checks hash and query in this pool (the pipeline passes its own)
+        self.executor = executor or StageExecutor()
+        
         # Get settings from environment variables or parameters
         if use_qdrant is None:
             use_qdrant = os.getenv("USE_QDRANT", "false").lower() == "true"
@@ -21,24 +67,128 @@ class FraudDetector:
             qdrant_port = int(os.getenv("QDRANT_PORT", "6333"))
         
         self.use_qdrant = use_qdrant
-        self.storage_file = "data/image_hashes.json"
+        self.hasher = PerceptualHasher()
+        self.storage_file = "data/image_hashes.bin"
+        self.legacy_storage_file = "data/image_hashes.json"
+        
+        # "index" probes a multi-index, "scan" does a vectorized linear scan
+        self.hash_search_mode = os.getenv("HASH_SEARCH_MODE", "index").lower()
+        
+        # File-store distances count differing hex digits of the hashes, as the
+        # original character comparison did. HASH_DISTANCE=bits counts differing
+        # bits, which the "6 bits out of 64" threshold was meant for; stricter per
+        # pair, so it changes which claims match and their similarity_score.
+        self.hash_distance = os.getenv("HASH_DISTANCE", "hex").lower()
+        if self.hash_distance not in ("hex", "bits"):
+            raise ValueError(f"HASH_DISTANCE must be 'hex' or 'bits', got {self.hash_distance!r}")
+        
+        # Tiered check: exact SHA-256, then an average_hash prefilter (looser than the
+        # threshold, CASCADE_PREFILTER_SLACK past it unless CASCADE_PREFILTER_BITS is set)
+        # confirmed on phash and dhash, so it only ever drops phash matches. Off by
+        # default: matching then uses phash alone and duplicate_details are unchanged.
+        self.use_cascade = os.getenv("DUPLICATE_CASCADE", "false").lower() == "true"
+        prefilter_bits = os.getenv("CASCADE_PREFILTER_BITS")
+        self.cascade_prefilter_bits = int(prefilter_bits) if prefilter_bits else None
+        self.cascade_prefilter_slack = int(os.getenv("CASCADE_PREFILTER_SLACK", "4"))
+        self.probe_field = "average_hash" if self.use_cascade else "phash"
+        
+        # Append-only hash log, packed uint64 columns and lookup indexes, loaded on first use
+        self._hash_store = None
+        self._hash_columns = None
+        self._probe_index = None
+        self._sha256_index = None
+        
+        # Check-and-insert is atomic under this lock; the log is fsynced in the
+        # background every HASH_SNAPSHOT_INTERVAL seconds (0 = write inline on every claim)
+        self._index_lock = threading.Lock()
+        self.snapshot_interval = float(os.getenv("HASH_SNAPSHOT_INTERVAL", "1.0"))
+        self._snapshot_thread = None
+        self._stop_snapshots = threading.Event()
         
         # Ensure data directory exists
         os.makedirs("data", exist_ok=True)
         
+        # Async mode: non-blocking queries and a write-behind buffer for upserts
+        self.use_async_qdrant = os.getenv("QDRANT_ASYNC", "false").lower() == "true"
+        self.async_client = None
+        self._write_buffer = None
+        self._async_collection_ready = False
+        
+        # Search scope for perceptual matches: claims from the last N months (0 = all)
+        # and optionally only the same claim location. Exact SHA-256 matches are never scoped.
+        self.search_months = int(os.getenv("DUPLICATE_SEARCH_MONTHS", "0"))
+        self.search_same_region = os.getenv("DUPLICATE_SAME_REGION", "false").lower() == "true"
+        
+        # Points older than this move to the cold collection (0 = never)
+        self.cold_after_days = int(os.getenv("QDRANT_COLD_AFTER_DAYS", "0"))
+        
+        # Region-level matching for crops, mirrors and rotations that change the whole-image
+        # hashes: keypoint tile hashes vote for the stored image they came from. Kept in a
+        # local tile log next to either backend.
+        self.use_tile_index = os.getenv("TILE_INDEX", "false").lower() == "true"
+        self.tile_max_distance = int(os.getenv("TILE_MAX_DISTANCE", "3"))
+        self.tile_min_votes = int(os.getenv("TILE_MIN_VOTES", "3"))
+        self.tile_storage_file = "data/tile_hashes.bin"
+        self.tile_hasher = TileHasher(stored_tiles=MAX_STORED_TILES) if self.use_tile_index else None
+        self._tile_store = None
+        self._tile_index = None
+        self._tile_lock = threading.Lock()
+        
+        # Semantic near-duplicates (same vehicle, different shot) from YOLO backbone embeddings:
+        # exact scan until EMBEDDING_TRAIN_SIZE are stored, then an IVF-PQ index trained in the background
+        self.embedding_similarity = float(os.getenv("EMBEDDING_SIMILARITY", "0.92"))
+        self.embedding_train_size = int(os.getenv("EMBEDDING_TRAIN_SIZE", "20000"))
+        self.embedding_nlist = int(os.getenv("EMBEDDING_NLIST", "1024"))
+        self.embedding_nprobe = int(os.getenv("EMBEDDING_NPROBE", "32"))
+        self.embedding_pq_m = int(os.getenv("EMBEDDING_PQ_M", "16"))
+        self.embedding_storage_file = "data/embeddings.bin"
+        self.embedding_index_file = "data/embedding_ivfpq.npz"
+        self._embedding_store = None
+        self._embedding_index = None
+        self._embedding_lock = threading.Lock()
+        self._embedding_training = None
+        
+        # Optional geometric check of the top-k perceptual/tile candidates (ORB + FLANN LSH +
+        # RANSAC) within a latency budget; candidates that fail it are not reported as duplicates
+        self.verify_duplicates = os.getenv("DUPLICATE_VERIFY", "false").lower() == "true"
+        self.verify_top_k = int(os.getenv("VERIFY_TOP_K", "3"))
+        self.verify_budget_ms = float(os.getenv("VERIFY_BUDGET_MS", "200"))
+        self.verifier = None
+        self.feature_cache = None
+        if self.verify_duplicates:
+            self.verifier = OrbVerifier(min_inliers=int(os.getenv("VERIFY_MIN_INLIERS", "15")))
+            self.feature_cache = FeatureCache("data/orb_features")
+        
+        # Header-only JPEG forensics (quantization/Huffman tables, APPn segments, EXIF thumbnail);
+        # camera table signatures come from a curated, read-only file (JPEG_SIGNATURES_FILE)
+        self.use_jpeg_fingerprint = os.getenv("JPEG_FINGERPRINT", "true").lower() == "true"
+        self.quant_tables = None
+        if self.use_jpeg_fingerprint:
+            self.quant_tables = QuantTableIndex(os.getenv("JPEG_SIGNATURES_FILE") or CAMERA_SIGNATURES_PATH)
+        
+        # Prefilter on the hashes of the embedded EXIF thumbnail (read from the header, no full
+        # decode); the full-image hashes still decide. Thumbnail hashes drift a few bits from the
+        # full image's (resampling, thumbnail JPEG quality), hence the extra slack.
+        self.use_thumbnail_prefilter = os.getenv("THUMBNAIL_PREFILTER", "false").lower() == "true"
+        self.thumbnail_slack_bits = int(os.getenv("THUMBNAIL_SLACK_BITS", "4"))
+        
         if use_qdrant:
             try:
                 from qdrant_client import QdrantClient
-                from qdrant_client.models import Distance, VectorParams, PointStruct
                 
-                # Connect to Qdrant
+                # Connect to Qdrant (QDRANT_HOST=":memory:" runs the local in-memory mode)
                 print(f"🔗 Connecting to Qdrant at {qdrant_host}:{qdrant_port}")
-                self.client = QdrantClient(host=qdrant_host, port=qdrant_port)
-                self.collection_name = "claim_images"
+                client_kwargs = self._qdrant_client_kwargs(qdrant_host, qdrant_port)
+                self.client = QdrantClient(**client_kwargs)
+                self.collection_name = os.getenv("QDRANT_COLLECTION", "claim_image_hashes")
+                self.cold_collection_name = f"{self.collection_name}_cold"
                 
                 # Initialize collection if it doesn't exist
                 self._init_collection()
-                print("✅ Fraud Detector initialized with Qdrant")
+                
+                if self.use_async_qdrant:
+                    self._init_async_client(client_kwargs)
+                print(f"✅ Fraud Detector initialized with Qdrant{' (async write-behind)' if self.use_async_qdrant else ''}")
             except Exception as e:
                 print(f"⚠️  Qdrant not available: {e}")
                 print("   Falling back to file-based storage")
@@ -51,14 +201,488 @@ class FraudDetector:
     
     def _init_file_storage(self):
         """Initialize file-based storage for image hashes"""
-        if not os.path.exists(self.storage_file):
-            with open(self.storage_file, 'w') as f:
-                json.dump([], f)
+        self._load_file_index()
+    
+    def _load_file_index(self):
+        """Open the hash log (migrating the legacy JSON once) and build the lookup indexes"""
+        if self._probe_index is not None:
+            return
+        
+        with self._index_lock:
+            if self._probe_index is not None:
+                return
+            
+            compact_every = int(os.getenv("HASH_LOG_COMPACT_EVERY", "100000"))
+            self._hash_store = HashLogStore(
+                self.storage_file,
+                legacy_json_path=self.legacy_storage_file,
+                compact_every=compact_every,
+                group_commit=self.snapshot_interval > 0
+            )
+            self._rebuild_hash_indexes()
+        
+        if self.snapshot_interval > 0:
+            # Last snapshot on interpreter exit, in case shutdown hooks never ran
+            atexit.register(self._hash_store.sync)
+            self._snapshot_thread = threading.Thread(
+                target=self._snapshot_loop, name="hash-log-snapshot", daemon=True
+            )
+            self._snapshot_thread.start()
+    
+    def _snapshot_loop(self):
+        while not self._stop_snapshots.wait(self.snapshot_interval):
+            try:
+                self.snapshot_hash_log()
+            except Exception as e:
+                print(f"⚠️  Hash log snapshot failed: {e}")
+    
+    def snapshot_hash_log(self) -> int:
+        """Make pending hash records durable (one write + fsync) and compact when due
+        
+        Returns the number of records written.
+        """
+        if self._hash_store is None:
+            return 0
+        
+        written = self._hash_store.sync()
+        if self._hash_store.should_compact():
+            # Compaction shifts positions, so no check may run until the indexes are rebuilt
+            with self._index_lock:
+                if self._hash_store.compact():
+                    self._rebuild_hash_indexes()
+        return written
+    
+    def _rebuild_hash_indexes(self):
+        """Rebuild packed hash columns and lookup indexes from the memory-mapped log"""
+        records = self._hash_store.records()
+        self._hash_columns = PackedHashColumns.from_records(records)
+        
+        self._probe_index = MultiIndexHashIndex(metric=self.hash_distance)
+        self._probe_index.build(self._hash_columns.column(self.probe_field))
+        
+        # Keyed by the first 8 digest bytes; the full digest is checked on lookup
+        self._sha256_index = ExactHashIndex()
+        self._sha256_index.build(
+            np.ascontiguousarray(records["sha256"][:, :8]).view(">u8").ravel().astype(np.uint64)
+            if len(records) else np.empty(0, dtype=np.uint64)
+        )
+    
+    def _load_tile_index(self):
+        """Open the tile log and build the tile vote index"""
+        if self._tile_index is not None:
+            return
+        
+        with self._tile_lock:
+            if self._tile_index is None:
+                self._tile_store = TileLogStore(
+                    self.tile_storage_file,
+                    compact_every=int(os.getenv("HASH_LOG_COMPACT_EVERY", "100000"))
+                )
+                self._rebuild_tile_index()
+    
+    def _rebuild_tile_index(self):
+        """Rebuild the tile vote index from the memory-mapped tile log"""
+        records = self._tile_store.records()
+        counts = records["tile_count"].astype(np.int64)
+        used = np.arange(MAX_STORED_TILES) < counts[:, None]
+        
+        self._tile_index = TileHashIndex()
+        self._tile_index.build(
+            records["tile_hashes"][used],
+            np.repeat(np.arange(len(records)), counts),
+            len(records)
+        )
+    
+    def _check_tiles(self, tiles: tuple, job_id: str) -> tuple:
+        """Vote for stored images sharing keypoint tiles with this one, then index its tiles
+        
+        tiles is TileHasher.hash_image output. Returns (duplicate details, stats).
+        """
+        stored, query = tiles
+        self._load_tile_index()
+        
+        with self._tile_lock:
+            votes = self._tile_index.search(query, self.tile_max_distance, self.tile_min_votes)
+            
+            duplicate_details = []
+            for position, count in votes:
+                record = self._tile_store.get(position)
+                duplicate_details.append({
+                    "job_id": record["job_id"],
+                    "similarity_score": round(count / max(1, len(record["tile_hashes"])), 3),
+                    "timestamp": record["timestamp"],
+                    "match_tier": "tile_vote",
+                    "matched_tiles": count
+                })
+            
+            self._tile_store.append({
+                "job_id": job_id,
+                "timestamp": datetime.now().isoformat(),
+                "tile_hashes": stored
+            })
+            self._tile_index.add(stored[:MAX_STORED_TILES])
+            
+            if self._tile_store.should_compact() and self._tile_store.compact():
+                self._rebuild_tile_index()
+        
+        stats = {"query_tiles": len(query), "stored_tiles": min(len(stored), MAX_STORED_TILES),
+                 "tile_candidates": len(votes)}
+        return duplicate_details, stats
+    
+    def _describe_image(self, gray: Optional[Image.Image]) -> tuple:
+        """(tile hashes, ORB features) of the decoded image for the enabled refine stages"""
+        if gray is None:
+            return None, None
+        tiles = self.tile_hasher.hash_image(gray) if self.tile_hasher is not None else None
+        features = self.verifier.describe(gray) if self.verifier is not None else None
+        return tiles, features
+    
+    def _refine_duplicates(self, result: Dict[str, Any], job_id: str, tiles: tuple = None, features=None) -> Dict[str, Any]:
+        """Optional stages on the decoded image: tile-vote matches, then geometric verification"""
+        if tiles is not None:
+            result = self._merge_tile_matches(result, tiles, job_id)
+        if features is not None:
+            result = self._verify_duplicates(result, features, job_id)
+        return result
+    
+    def _merge_tile_matches(self, result: Dict[str, Any], tiles: tuple, job_id: str) -> Dict[str, Any]:
+        """Add tile-vote matches that the whole-image tiers did not already report"""
+        tile_details, tile_stats = self._check_tiles(tiles, job_id)
+        reported = {detail["job_id"] for detail in result["duplicate_details"]}
+        result["duplicate_details"].extend(
+            detail for detail in tile_details if detail["job_id"] not in reported
+        )
+        
+        result["duplicate_count"] = len(result["duplicate_details"])
+        result["is_duplicate"] = result["duplicate_count"] > 0
+        if result["match_tier"] is None and result["is_duplicate"]:
+            result["match_tier"] = "tile_vote"
+        result["tile_stats"] = tile_stats
+        return result
+    
+    def _verify_duplicates(self, result: Dict[str, Any], features, job_id: str) -> Dict[str, Any]:
+        """Confirm the top-k non-exact candidates by ORB geometry within the latency budget
+        
+        Exact SHA-256 matches need no check. Candidates beyond top-k, past the
+        budget or without cached features (e.g. backfilled images) are kept
+        and marked unchecked; candidates that fail are moved to
+        "rejected_candidates". This image's features are cached either way.
+        """
+        start = time.perf_counter()
+        deadline = start + self.verify_budget_ms / 1000
+        
+        candidates = sorted(
+            (detail for detail in result["duplicate_details"] if detail["match_tier"] != "exact_sha256"),
+            key=lambda detail: -detail["similarity_score"]
+        )
+        stats = {"checked": 0, "verified": 0, "rejected": 0, "unchecked": 0}
+        for rank, detail in enumerate(candidates):
+            stored = None
+            if rank < self.verify_top_k and time.perf_counter() < deadline:
+                stored = self.feature_cache.get(self._point_id(detail["job_id"]))
+            if stored is None:
+                detail["geometric_verification"] = "unchecked"
+                stats["unchecked"] += 1
+                continue
+            
+            verification = self.verifier.verify(features, stored)
+            detail["geometric_verification"] = verification
+            stats["checked"] += 1
+            stats["verified" if verification["verified"] else "rejected"] += 1
+        
+        self.feature_cache.put(self._point_id(job_id), features)
+        stats["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        
+        rejected = [
+            detail for detail in result["duplicate_details"]
+            if isinstance(detail.get("geometric_verification"), dict)
+            and not detail["geometric_verification"]["verified"]
+        ]
+        if rejected:
+            result["duplicate_details"] = [
+                detail for detail in result["duplicate_details"] if detail not in rejected
+            ]
+            result["duplicate_count"] = len(result["duplicate_details"])
+            result["is_duplicate"] = result["duplicate_count"] > 0
+            result["match_tier"] = next(
+                (tier for tier in ("exact_sha256", "perceptual_cascade", "phash", "tile_vote")
+                 if any(detail["match_tier"] == tier for detail in result["duplicate_details"])),
+                None
+            )
+        result["rejected_candidates"] = rejected
+        result["verification_stats"] = stats
+        return result
+    
+    def _load_embedding_store(self, dim: int):
+        """Open the embedding log and the saved IVF-PQ index, encoding records stored since its save"""
+        if self._embedding_store is not None:
+            return
+        
+        with self._embedding_lock:
+            if self._embedding_store is not None:
+                return
+            
+            store = EmbeddingLogStore(self.embedding_storage_file, dim)
+            if os.path.exists(self.embedding_index_file):
+                index = IVFPQIndex.load(self.embedding_index_file)
+                if index.dim == dim and len(index) <= len(store):
+                    self._add_stored_embeddings(index, store, len(index), len(store))
+                    self._embedding_index = index
+                else:
+                    print(f"⚠️  Ignoring {self.embedding_index_file}: it does not match {self.embedding_storage_file}")
+            self._embedding_store = store
+    
+    def _add_stored_embeddings(self, index: IVFPQIndex, store: EmbeddingLogStore, start: int, end: int,
+                               chunk_size: int = 65536):
+        embeddings = store.records()["embedding"]
+        for chunk_start in range(start, end, chunk_size):
+            index.add(embeddings[chunk_start:min(end, chunk_start + chunk_size)])
+    
+    def _embedding_candidates(self, embedding: np.ndarray, count: int) -> np.ndarray:
+        """Positions of the stored embeddings nearest to this one (approximate once the index is trained)"""
+        if self._embedding_index is not None:
+            return self._embedding_index.search(embedding, count)[0]
+        
+        stored = self._embedding_store.records()["embedding"]
+        if not len(stored):
+            return np.empty(0, dtype=np.int64)
+        similarities = np.concatenate([
+            stored[start:start + 65536].astype(np.float32) @ embedding
+            for start in range(0, len(stored), 65536)
+        ])
+        return np.argpartition(-similarities, min(count, len(similarities)) - 1)[:count]
+    
+    def check_similar_embedding(self, embedding: np.ndarray, job_id: str, top_k: int = 5) -> Dict[str, Any]:
+        """Stored claims whose YOLO backbone embedding is close to this one, then store it
+        
+        Candidates from the ANN index are re-scored exactly against the stored
+        float16 embeddings before the EMBEDDING_SIMILARITY cutoff is applied.
+        """
+        embedding = np.asarray(embedding, dtype=np.float32).ravel()
+        self._load_embedding_store(len(embedding))
+        
+        start = time.perf_counter()
+        with self._embedding_lock:
+            search_mode = "ivfpq" if self._embedding_index is not None else "exact"
+            positions = self._embedding_candidates(embedding, top_k * 4)
+            
+            similar_claims = []
+            if len(positions):
+                stored = np.stack([self._embedding_store.row(position)["embedding"] for position in positions.tolist()])
+                similarities = stored.astype(np.float32) @ embedding
+                for order in np.argsort(-similarities)[:top_k].tolist():
+                    if similarities[order] < self.embedding_similarity:
+                        break
+                    record = self._embedding_store.row(int(positions[order]))
+                    similar_claims.append({
+                        "job_id": record["job_id"].decode("utf-8"),
+                        "similarity_score": round(float(similarities[order]), 3),
+                        "timestamp": record["timestamp"].decode("utf-8")
+                    })
+            search_ms = (time.perf_counter() - start) * 1000
+            
+            self._embedding_store.append({
+                "job_id": job_id,
+                "timestamp": datetime.now().isoformat(),
+                "embedding": embedding
+            })
+            if self._embedding_index is not None:
+                self._embedding_index.add(embedding)
+        
+        if self._embedding_index is None and len(self._embedding_store) >= self.embedding_train_size \
+                and (self._embedding_training is None or not self._embedding_training.is_alive()):
+            self._embedding_training = threading.Thread(
+                target=self.train_embedding_index, name="embedding-index-train", daemon=True
+            )
+            self._embedding_training.start()
+        
+        return {
+            "is_similar": len(similar_claims) > 0,
+            "similar_count": len(similar_claims),
+            "similar_claims": similar_claims,
+            "search_mode": search_mode,
+            "search_ms": round(search_ms, 2)
+        }
+    
+    def train_embedding_index(self, sample_size: int = 65536) -> int:
+        """Train the IVF-PQ index on stored embeddings, encode them all and swap it in
+        
+        Encoding runs outside the lock; only embeddings stored meanwhile are
+        added under it. Returns the number of indexed embeddings.
+        """
+        store = self._embedding_store
+        records = store.records()
+        count = len(records)
+        if not count:
+            return 0
+        
+        dim = records["embedding"].shape[1]
+        sample = records["embedding"][np.sort(
+            np.random.default_rng(0).choice(count, min(count, sample_size), replace=False)
+        )]
+        
+        # About 40 training vectors per coarse centroid; PQ subspaces must divide the dimension
+        nlist = max(1, min(self.embedding_nlist, len(sample) // 40))
+        m = next(m for m in range(min(self.embedding_pq_m, dim), 0, -1) if dim % m == 0)
+        
+        start = time.perf_counter()
+        index = IVFPQIndex(dim, nlist=nlist, m=m, nprobe=self.embedding_nprobe)
+        index.train(sample)
+        self._add_stored_embeddings(index, store, 0, count)
+        
+        with self._embedding_lock:
+            self._add_stored_embeddings(index, store, count, len(store))
+            self._embedding_index = index
+            index.save(self.embedding_index_file)
+        
+        print(f"🧭 Trained embedding index: {len(index):,} embeddings, {nlist} lists × {m} bytes "
+              f"in {time.perf_counter() - start:.1f}s")
+        return len(index)
+    
+    def _sha256_key(self, sha256: Optional[str]) -> int:
+        return int(sha256[:16], 16) if sha256 else 0
+    
+    def _search_hash_field(self, field: str, value: int, max_bits: int) -> List[tuple]:
+        """(position, distance) of stored hashes within max_bits of value"""
+        if self.hash_search_mode == "index" and field == self.probe_field:
+            return self._probe_index.search(value, max_bits)
+        positions, distances = self._hash_columns.search(field, value, max_bits, metric=self.hash_distance)
+        return list(zip(positions.tolist(), distances.tolist()))
+    
+    def _prefilter_radius(self, max_hamming: int) -> int:
+        """average_hash prefilter radius: CASCADE_PREFILTER_BITS, else the threshold plus slack"""
+        if self.cascade_prefilter_bits is not None:
+            return self.cascade_prefilter_bits
+        return max_hamming + self.cascade_prefilter_slack
+    
+    def _confirm_candidates(self, positions: List[int], hashes: Dict[str, Any], max_hamming: int) -> tuple:
+        """Cascade confirmation of prefilter candidates; returns (positions, phash distances, dhash rejections)
+        
+        A candidate is confirmed only when phash and dhash are both within
+        max_hamming, so the cascade never matches a pair phash alone would not.
+        """
+        phash_distances = hash_distances(
+            self._hash_columns.column("phash")[positions], int(hashes["phash"], 16), self.hash_distance
+        )
+        confirmed = phash_distances <= max_hamming
+        rejected = 0
+        if confirmed.any():
+            dhash_distances = hash_distances(
+                self._hash_columns.column("dhash")[positions], int(hashes["dhash"], 16), self.hash_distance
+            )
+            rejected = int((confirmed & (dhash_distances > max_hamming)).sum())
+            confirmed &= dhash_distances <= max_hamming
+        return np.array(positions)[confirmed].tolist(), phash_distances[confirmed].tolist(), rejected
+    
+    def _find_matches(self, hashes: Dict[str, Any], max_hamming: int) -> tuple:
+        """Run the duplicate tiers; returns ([(position, phash distance, tier)], stats)"""
+        phash = int(hashes["phash"], 16)
+        stats = {"exact_matches": 0, "prefilter_candidates": 0, "confirmed_matches": 0, "dhash_rejections": 0}
+        
+        # Tier 1: identical content
+        exact_positions = []
+        if hashes.get("sha256"):
+            digest = np.frombuffer(bytes.fromhex(hashes["sha256"]), dtype=np.uint8)
+            exact_positions = [
+                position for position in self._sha256_index.lookup(self._sha256_key(hashes["sha256"]))
+                if np.array_equal(self._hash_store.row(position)["sha256"], digest)
+            ]
+        stats["exact_matches"] = len(exact_positions)
+        
+        matches = {}
+        if exact_positions:
+            distances = hash_distances(self._hash_columns.column("phash")[exact_positions], phash, self.hash_distance)
+            for position, distance in zip(exact_positions, distances.tolist()):
+                matches[position] = (distance, "exact_sha256")
+        
+        if self.use_cascade:
+            # Tier 2: cheap average_hash prefilter over the index, wider than the threshold
+            # so it only drops clear non-matches
+            candidates = [
+                position for position, _ in
+                self._search_hash_field("average_hash", int(hashes["average_hash"], 16),
+                                        self._prefilter_radius(max_hamming))
+                if position not in matches
+            ]
+            stats["prefilter_candidates"] = len(candidates)
+            
+            # Tier 3: confirm survivors on phash and dhash (both must agree)
+            if candidates:
+                positions, distances, stats["dhash_rejections"] = self._confirm_candidates(
+                    candidates, hashes, max_hamming
+                )
+                for position, distance in zip(positions, distances):
+                    matches[position] = (distance, "perceptual_cascade")
+        else:
+            for position, distance in self._search_hash_field("phash", phash, max_hamming):
+                matches.setdefault(position, (distance, "phash"))
+        
+        stats["confirmed_matches"] = len(matches) - len(exact_positions)
+        return [(position, *matches[position]) for position in sorted(matches)], stats
+    
+    def _build_duplicate_details(self, matches: List[tuple]) -> List[Dict[str, Any]]:
+        """Resolve (position, distance[, tier]) matches to the reported duplicate details"""
+        duplicate_details = []
+        for position, distance, *tier in matches:
+            stored = self._hash_store.get(position)
+            similarity = 1 - (distance / 64)
+            detail = {
+                "job_id": stored["job_id"],
+                "similarity_score": round(similarity, 3),
+                "timestamp": stored["timestamp"]
+            }
+            if tier:
+                detail["match_tier"] = tier[0]
+            duplicate_details.append(detail)
+        return duplicate_details
+    
+    def _qdrant_client_kwargs(self, host: str, port: int) -> Dict[str, Any]:
+        if host == ":memory:":
+            return {"location": ":memory:"}
+        return {"host": host, "port": port}
+    
+    def _init_async_client(self, client_kwargs: Dict[str, Any]):
+        """Create the AsyncQdrantClient and the write-behind buffer for upserts"""
+        from qdrant_client import AsyncQdrantClient
+        from app.utils.write_behind import WriteBehindBuffer
+        
+        self.async_client = AsyncQdrantClient(**client_kwargs)
+        self._write_buffer = WriteBehindBuffer(
+            self._flush_points,
+            max_size=int(os.getenv("QDRANT_FLUSH_SIZE", "64")),
+            max_delay=float(os.getenv("QDRANT_FLUSH_INTERVAL", "1.0"))
+        )
+    
+    def _collection_config(self) -> Dict[str, Any]:
+        """Vector and quantization settings shared by the sync and async clients"""
+        from qdrant_client.models import (
+            Distance, VectorParams, Datatype, BinaryQuantization, BinaryQuantizationConfig
+        )
+        
+        return {
+            "vectors_config": {
+                field: VectorParams(
+                    size=HASH_VECTOR_SIZE,
+                    distance=Distance.DOT,
+                    datatype=Datatype.FLOAT16,
+                    on_disk=True
+                )
+                for field in HASH_FIELDS
+            },
+            "quantization_config": BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=True)
+            )
+        }
     
     def _init_collection(self):
-        """Initialize Qdrant collection for image hashes"""
+        """Initialize Qdrant collection for image hashes
+        
+        Each hash type is a named +1/-1 vector under DOT distance, so the score
+        is 64 - 2 * Hamming distance. Binary quantization keeps 8 bytes per
+        vector in RAM; the full vectors live on disk for rescoring.
+        """
         try:
-            from qdrant_client.models import Distance, VectorParams
+            from qdrant_client.models import PayloadSchemaType
             
             collections = self.client.get_collections().collections
             collection_names = [c.name for c in collections]
@@ -66,72 +690,286 @@ class FraudDetector:
             if self.collection_name not in collection_names:
                 self.client.create_collection(
                     collection_name=self.collection_name,
-                    vectors_config=VectorParams(size=64, distance=Distance.COSINE)
+                    **self._collection_config()
                 )
                 print(f"Created Qdrant collection: {self.collection_name}")
+                
+                if LEGACY_COLLECTION_NAME in collection_names and LEGACY_COLLECTION_NAME != self.collection_name:
+                    self._migrate_legacy_collection()
+            
+            for field_name, schema in PAYLOAD_INDEXES:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType(schema)
+                )
         except Exception as e:
             print(f"Error initializing Qdrant collection: {e}")
             raise
     
-    def compute_perceptual_hash(self, image_path: str) -> Dict[str, Any]:
-        """Compute multiple perceptual hashes for robust duplicate detection"""
+    def _migrate_legacy_collection(self, batch_size: int = 256):
+        """Copy points from the legacy cosine collection using their stored hex hashes
+        
+        Legacy payloads only carry phash and dhash, so migrated points have just
+        those two named vectors. The legacy collection is left untouched.
+        """
+        from qdrant_client.models import PointStruct
+        
+        migrated = 0
+        offset = None
+        while True:
+            points, offset = self.client.scroll(
+                collection_name=LEGACY_COLLECTION_NAME,
+                limit=batch_size,
+                offset=offset,
+                with_payload=True,
+                with_vectors=False
+            )
+            
+            batch = []
+            for point in points:
+                payload = point.payload or {}
+                if not payload.get("job_id") or not payload.get("phash"):
+                    continue
+                batch.append(PointStruct(
+                    id=self._point_id(payload["job_id"]),
+                    vector={
+                        field: self._hash_to_vector(payload[field])
+                        for field in HASH_FIELDS if payload.get(field)
+                    },
+                    payload=payload
+                ))
+            
+            if batch:
+                self.client.upsert(collection_name=self.collection_name, points=batch)
+                migrated += len(batch)
+            
+            if offset is None:
+                break
+        
+        print(f"📦 Migrated {migrated} points from legacy collection '{LEGACY_COLLECTION_NAME}'")
+    
+    def _point_id(self, job_id: str) -> str:
+        """Stable point ID: the job's UUID, or a UUIDv5 of non-UUID job IDs"""
+        try:
+            return str(uuid.UUID(job_id))
+        except ValueError:
+            return str(uuid.uuid5(POINT_ID_NAMESPACE, job_id))
+    
+    def compute_perceptual_hash(self,
+                                image_path: str,
+                                data: Optional[bytes] = None,
+                                original: Optional[bytes] = None) -> Dict[str, Any]:
+        """Compute multiple perceptual hashes for robust duplicate detection
         
-        image = Image.open(image_path)
+        data is the file's content when the caller already holds it in memory.
+        original is the uploaded file's content: the exact-tier SHA-256 is taken
+        from it when given, so it does not depend on how the upload was decoded
+        (REDUCED_DECODE changes the processed pixels, not the upload).
+        """
         
-        # Compute different hash types
-        phash = imagehash.phash(image)
-        dhash = imagehash.dhash(image)
-        whash = imagehash.whash(image)
-        average_hash = imagehash.average_hash(image)
+        if data is None:
+            with open(image_path, "rb") as f:
+                data = f.read()
         
-        # Convert to vectors for Qdrant (using phash as main)
-        phash_vector = self._hash_to_vector(phash)
+        # One decode and grayscale conversion for all four hash types
+        hashes = self.hasher.hash_bytes(data)
+        hashes["sha256"] = hashlib.sha256(original if original is not None else data).hexdigest()
         
-        return {
-            "phash": str(phash),
-            "dhash": str(dhash),
-            "whash": str(whash),
-            "average_hash": str(average_hash),
-            "phash_vector": phash_vector
+        return hashes
+    
+    def _hash_image_file(self,
+                         image_path: str,
+                         data: Optional[bytes] = None,
+                         original_path: str = "",
+                         original: Optional[bytes] = None) -> tuple:
+        """(perceptual hashes, grayscale image) from a single read and decode
+        
+        The grayscale image is only kept (otherwise None) when the tile index or
+        geometric verification will use it.
+        """
+        if original is None and original_path:
+            with open(original_path, "rb") as f:
+                original = f.read()
+        
+        if self.tile_hasher is None and self.verifier is None:
+            return self.compute_perceptual_hash(image_path, data, original), None
+        
+        if data is None:
+            with open(image_path, "rb") as f:
+                data = f.read()
+        
+        with Image.open(io.BytesIO(data)) as image:
+            gray = image.convert("L")
+        hashes = self.hasher.hash_image(gray)
+        hashes["sha256"] = hashlib.sha256(original if original is not None else data).hexdigest()
+        
+        return hashes, gray
+    
+    def compute_thumbnail_hash(self, image_path: Optional[str], data: Optional[bytes] = None) -> Optional[Dict[str, Any]]:
+        """Perceptual hashes of the embedded EXIF thumbnail, without decoding the full image
+        
+        Only the markers before the first scan are read. Cameras pad thumbnails of
+        non-4:3 photos with black bars, which are cropped to the main image's
+        aspect ratio so the hashes line up with the full image's. Returns None
+        for files without a (readable) JPEG thumbnail. data is the file's
+        content when it is already in memory.
+        """
+        try:
+            with (io.BytesIO(data) if data is not None else open(image_path, "rb")) as f:
+                width, height, exif = read_jpeg_header(f)
+            thumbnail = exif_thumbnail(exif) if exif else None
+            if thumbnail is None:
+                return None
+            
+            with Image.open(io.BytesIO(thumbnail)) as image:
+                gray = image.convert("L")
+        except (OSError, HeaderParseError, struct.error):
+            return None
+        
+        thumb_width, thumb_height = gray.size
+        if thumb_width * height > thumb_height * width:
+            content_width = round(thumb_height * width / height)
+            left = (thumb_width - content_width) // 2
+            gray = gray.crop((left, 0, left + content_width, thumb_height))
+        elif thumb_width * height < thumb_height * width:
+            content_height = round(thumb_width * height / width)
+            top = (thumb_height - content_height) // 2
+            gray = gray.crop((0, top, thumb_width, top + content_height))
+        
+        return self.hasher.hash_image(gray)
+    
+    def thumbnail_prefilter(self,
+                            image_path: Optional[str],
+                            threshold: float = 0.9,
+                            data: Optional[bytes] = None) -> Dict[str, Any]:
+        """Read-only duplicate candidates from the EXIF thumbnail hashes
+        
+        Runs the cascade's average_hash prefilter and phash + dhash confirmation,
+        widened by THUMBNAIL_SLACK_BITS against the file store, so it can start
+        before (or stand in for) the full-resolution decode. Nothing is stored;
+        the full-image hashes confirm. The Qdrant store is not searched here.
+        """
+        start = time.perf_counter()
+        result = {"available": False, "candidates": [], "candidate_count": 0, "hashes": None}
+        
+        hashes = self.compute_thumbnail_hash(image_path, data)
+        if hashes is not None and not self.use_qdrant:
+            self._load_file_index()
+            max_hamming = int((1 - threshold) * 64) + self.thumbnail_slack_bits
+            with self._index_lock:
+                positions = [
+                    position for position, _ in
+                    self._search_hash_field("average_hash", int(hashes["average_hash"], 16),
+                                            self._prefilter_radius(max_hamming))
+                ]
+                if positions:
+                    positions, _, _ = self._confirm_candidates(positions, hashes, max_hamming)
+                result["candidates"] = [self._hash_store.get(position)["job_id"] for position in positions]
+            
+            result["available"] = True
+            result["candidate_count"] = len(result["candidates"])
+            result["hashes"] = hashes
+            
+            # Load the candidates' ORB features while the full image is still being decoded
+            if self.feature_cache is not None:
+                for candidate in result["candidates"][:self.verify_top_k]:
+                    self.feature_cache.get(self._point_id(candidate))
+        
+        result["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 2)
+        return result
+    
+    def _escalate_prefilter(self, result: Dict[str, Any], prefilter: Dict[str, Any]) -> Dict[str, Any]:
+        """Report which thumbnail candidates the full-image hashes confirmed"""
+        reported = {detail["job_id"] for detail in result["duplicate_details"]}
+        result["thumbnail_prefilter"] = {
+            "available": prefilter["available"],
+            "candidate_count": prefilter["candidate_count"],
+            "confirmed": [candidate for candidate in prefilter["candidates"] if candidate in reported],
+            "missed": sorted(reported - set(prefilter["candidates"])),
+            "elapsed_ms": prefilter["elapsed_ms"]
         }
+        return result
     
-    def _hash_to_vector(self, hash_obj) -> List[float]:
-        """Convert image hash to vector for Qdrant"""
-        # Convert hash to binary string, then to vector
-        binary_str = format(int(str(hash_obj), 16), '064b')
-        vector = [float(bit) for bit in binary_str]
-        return vector
+    def _hash_to_vector(self, hash_hex: str) -> List[float]:
+        """Convert a hex hash to a +1/-1 vector for Qdrant (dot = 64 - 2 * Hamming)"""
+        binary_str = format(int(hash_hex, 16), f'0{HASH_VECTOR_SIZE}b')
+        return [1.0 if bit == "1" else -1.0 for bit in binary_str]
     
     def _hamming_distance(self, hash1: str, hash2: str) -> int:
-        """Calculate Hamming distance between two hashes"""
+        """Calculate Hamming distance between two hashes (in HASH_DISTANCE units)"""
+        if self.hash_distance == "bits":
+            return (int(hash1, 16) ^ int(hash2, 16)).bit_count()
         return sum(c1 != c2 for c1, c2 in zip(hash1, hash2))
     
-    def check_duplicate(self, image_path: str, job_id: str, threshold: float = 0.9) -> Dict[str, Any]:
-        """Check if image is a duplicate or reused from previous claims"""
+    def check_duplicate(self,
+                        image_path: str,
+                        job_id: str,
+                        threshold: float = 0.9,
+                        policy_id: str = "",
+                        claim_location: str = "",
+                        original_path: str = "",
+                        image_bytes: Optional[bytes] = None,
+                        original_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+        """Check if image is a duplicate or reused from previous claims
+        
+        original_path is the uploaded file, whose EXIF thumbnail feeds the
+        THUMBNAIL_PREFILTER stage (re-encoded copies carry no EXIF) and whose
+        bytes the exact SHA-256 tier hashes.
+        image_bytes and original_bytes are the content of image_path and
+        original_path if already in memory.
+        """
+        prefilter = None
+        if self.use_thumbnail_prefilter:
+            prefilter = self.thumbnail_prefilter(original_path or image_path, threshold, original_bytes)
         
         # Compute hash
-        hashes = self.compute_perceptual_hash(image_path)
+        hashes, gray = self._hash_image_file(image_path, image_bytes, original_path, original_bytes)
+        claim = {"policy_id": policy_id, "claim_location": self._normalize_location(claim_location)}
         
         if self.use_qdrant:
-            return self._check_duplicate_qdrant(hashes, job_id, threshold)
+            result = self._check_duplicate_qdrant(hashes, job_id, threshold, claim)
         else:
-            return self._check_duplicate_file(hashes, job_id, threshold)
+            result = self._check_duplicate_file(hashes, job_id, threshold)
+        result = self._refine_duplicates(result, job_id, *self._describe_image(gray))
+        return self._escalate_prefilter(result, prefilter) if prefilter else result
     
-    def _check_duplicate_qdrant(self, hashes: Dict[str, Any], job_id: str, threshold: float) -> Dict[str, Any]:
+    def _check_duplicate_qdrant(self,
+                                hashes: Dict[str, Any],
+                                job_id: str,
+                                threshold: float,
+                                claim: Dict[str, str] = None) -> Dict[str, Any]:
         """Check duplicates using Qdrant vector database"""
+        claim = claim or {}
         try:
-            from qdrant_client.models import PointStruct
+            # Tier 1: identical content via the sha256 payload index, hot and cold
+            exact_results = []
+            if hashes.get("sha256"):
+                for collection_name in self._exact_search_collections():
+                    results, _ = self.client.scroll(
+                        collection_name=collection_name,
+                        scroll_filter=self._sha256_filter(hashes["sha256"]),
+                        limit=5,
+                        with_payload=True
+                    )
+                    exact_results.extend(results)
             
-            # Search for similar images in Qdrant
+            # Search for similar images in Qdrant on the phash named vector, within the search scope
+            max_hamming = int((1 - threshold) * 64)
+            min_score = HASH_VECTOR_SIZE - 2 * max_hamming
+            query_vector = self._hash_to_vector(hashes["phash"])
+            scope_filter = self._search_scope_filter(claim.get("claim_location"))
             search_results = None
 
             # Newer clients: `query_points` (returns QueryResponse with .points)
             if hasattr(self.client, "query_points"):
                 response = self.client.query_points(
                     collection_name=self.collection_name,
-                    query=hashes["phash_vector"],
+                    query=query_vector,
+                    using="phash",
+                    query_filter=scope_filter,
                     limit=5,
-                    score_threshold=threshold,
+                    score_threshold=min_score,
                 )
                 search_results = response.points
 
@@ -140,105 +978,655 @@ class FraudDetector:
                 search_method = getattr(self.client, "search", None) or getattr(self.client, "search_points", None)
                 search_results = search_method(
                     collection_name=self.collection_name,
-                    query_vector=hashes["phash_vector"],
+                    query_vector=("phash", query_vector),
+                    query_filter=scope_filter,
                     limit=5,
-                    score_threshold=threshold,
+                    score_threshold=min_score,
                 )
 
             else:
                 raise AttributeError("QdrantClient has no compatible search method (query_points/search/search_points)")
             
-            is_duplicate = len(search_results) > 0
-            duplicate_details = []
-            
-            if is_duplicate:
-                for result in search_results:
-                    duplicate_details.append({
-                        "job_id": result.payload.get("job_id"),
-                        "similarity_score": result.score,
-                        "timestamp": result.payload.get("timestamp")
-                    })
+            duplicate_details = self._qdrant_duplicate_details(exact_results, search_results)
             
-            # Store current image hash
+            # Store current image hashes; the ID is stable, so retries overwrite the same point
             self.client.upsert(
                 collection_name=self.collection_name,
-                points=[
-                    PointStruct(
-                        id=abs(hash(job_id)) % (10 ** 8),  # Convert to positive integer ID
-                        vector=hashes["phash_vector"],
-                        payload={
-                            "job_id": job_id,
-                            "timestamp": datetime.now().isoformat(),
-                            "phash": hashes["phash"],
-                            "dhash": hashes["dhash"]
-                        }
-                    )
-                ]
+                points=[self._hash_point(hashes, job_id, claim)]
             )
             
-            return {
-                "is_duplicate": is_duplicate,
-                "duplicate_count": len(search_results),
-                "duplicate_details": duplicate_details,
-                "hashes": hashes
-            }
+            return self._qdrant_duplicate_result(duplicate_details, hashes)
         except Exception as e:
             print(f"Error in Qdrant duplicate check: {e}")
             # Fallback to file-based method
             return self._check_duplicate_file(hashes, job_id, threshold)
     
-    def _check_duplicate_file(self, hashes: Dict[str, Any], job_id: str, threshold: float) -> Dict[str, Any]:
-        """Check duplicates using file-based storage"""
+    async def check_duplicate_async(self,
+                                    image_path: str,
+                                    job_id: str,
+                                    threshold: float = 0.9,
+                                    policy_id: str = "",
+                                    claim_location: str = "",
+                                    original_path: str = "",
+                                    image_bytes: Optional[bytes] = None,
+                                    original_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+        """check_duplicate for the request path: Qdrant I/O never blocks the event loop
         
-        # Load existing hashes
+        The thumbnail prefilter runs while the full image is decoded and hashed.
+        Without QDRANT_ASYNC the check itself is the synchronous one.
+        """
+        prepared = await self.prepare_duplicate_check(
+            image_path, threshold, policy_id, claim_location, original_path, image_bytes, original_bytes
+        )
+        return await self.record_duplicate_check(prepared, job_id)
+    
+    async def prepare_duplicate_check(self,
+                                      image_path: str,
+                                      threshold: float = 0.9,
+                                      policy_id: str = "",
+                                      claim_location: str = "",
+                                      original_path: str = "",
+                                      image_bytes: Optional[bytes] = None,
+                                      original_bytes: Optional[bytes] = None) -> Dict[str, Any]:
+        """Read-only half of check_duplicate_async: hashes, tiles, ORB features and the thumbnail prefilter
+        
+        Nothing is stored. record_duplicate_check runs the check-and-insert
+        later, so a caller can store a claim only once the rest of its
+        analysis succeeded.
+        """
+        def describe():
+            hashes, gray = self._hash_image_file(image_path, image_bytes, original_path, original_bytes)
+            return (hashes, *self._describe_image(gray))
+        
+        hashing = asyncio.create_task(self.executor.run_thread(describe))
+        prefilter = None
+        if self.use_thumbnail_prefilter:
+            prefilter = await self.executor.run_thread(
+                self.thumbnail_prefilter, original_path or image_path, threshold, original_bytes
+            )
+        hashes, tiles, features = await hashing
+        return {
+            "hashes": hashes,
+            "tiles": tiles,
+            "features": features,
+            "prefilter": prefilter,
+            "threshold": threshold,
+            "claim": {"policy_id": policy_id, "claim_location": self._normalize_location(claim_location)}
+        }
+    
+    async def record_duplicate_check(self, prepared: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        """Check-and-insert of a claim from prepare_duplicate_check; returns check_duplicate's result"""
+        hashes, threshold, claim = prepared["hashes"], prepared["threshold"], prepared["claim"]
+        
+        if self.async_client is None:
+            if self.use_qdrant:
+                result = await self.executor.run_thread(self._check_duplicate_qdrant, hashes, job_id, threshold, claim)
+            else:
+                result = await self.executor.run_thread(self._check_duplicate_file, hashes, job_id, threshold)
+        else:
+            result = await self._check_duplicate_qdrant_async(hashes, job_id, threshold, claim)
+        if prepared["tiles"] is not None or prepared["features"] is not None:
+            result = await self.executor.run_thread(
+                self._refine_duplicates, result, job_id, prepared["tiles"], prepared["features"]
+            )
+        prefilter = prepared["prefilter"]
+        return self._escalate_prefilter(result, prefilter) if prefilter else result
+    
+    async def _check_duplicate_qdrant_async(self,
+                                            hashes: Dict[str, Any],
+                                            job_id: str,
+                                            threshold: float,
+                                            claim: Dict[str, str]) -> Dict[str, Any]:
+        """Async Qdrant check; the insert is buffered and flushed in batches
+        
+        Buffered points are not in Qdrant yet, so they are matched locally
+        (SHA-256 and phash XOR + popcount) to keep read-your-writes for
+        claims still in flight. The buffer is snapshotted and this claim's
+        point added with no await in between, before any query: of two
+        concurrent identical claims the second always sees the first, and a
+        batch flushed mid-query is found by Qdrant if not by the snapshot.
+        """
         try:
-            with open(self.storage_file, 'r') as f:
-                stored_hashes = json.load(f)
-        except:
-            stored_hashes = []
+            await self._ensure_async_collection()
+            exact_collections = await self._exact_search_collections_async() if hashes.get("sha256") else []
+        except Exception as e:
+            print(f"Error in async Qdrant duplicate check: {e}")
+            # Nothing is buffered yet: fall back to the file-based method, off the event loop
+            return await self.executor.run_thread(self._check_duplicate_file, hashes, job_id, threshold)
+        
+        max_hamming = int((1 - threshold) * 64)
+        point_id = self._point_id(job_id)
+        
+        pending = self._write_buffer.pending()
+        self._write_buffer.add(point_id, self._hash_point(hashes, job_id, claim))
+        pending_details = self._pending_duplicate_details(pending, hashes, max_hamming, claim, point_id)
+        
+        # This claim's own point may be flushed while the queries run
+        queries = [self.async_client.query_points(
+            collection_name=self.collection_name,
+            query=self._hash_to_vector(hashes["phash"]),
+            using="phash",
+            query_filter=self._search_scope_filter(claim.get("claim_location"), exclude_id=point_id),
+            limit=5,
+            score_threshold=HASH_VECTOR_SIZE - 2 * max_hamming,
+        )]
+        queries.extend(
+            self.async_client.scroll(
+                collection_name=collection_name,
+                scroll_filter=self._sha256_filter(hashes["sha256"], exclude_id=point_id),
+                limit=5,
+                with_payload=True
+            )
+            for collection_name in exact_collections
+        )
+        
+        try:
+            response, *scrolls = await asyncio.gather(*queries)
+        except Exception as e:
+            # The point stays buffered and is written once Qdrant is back; report what the buffer shows
+            print(f"Error in async Qdrant duplicate check: {e}")
+            result = self._qdrant_duplicate_result(pending_details, hashes)
+            result["search_error"] = str(e)
+            return result
+        
+        exact_results = [result for results, _ in scrolls for result in results]
+        duplicate_details = self._qdrant_duplicate_details(exact_results, response.points)
+        
+        # Points flushed while the queries ran may be reported by both sides
+        reported = {detail["job_id"] for detail in duplicate_details}
+        duplicate_details.extend(detail for detail in pending_details if detail["job_id"] not in reported)
+        
+        return self._qdrant_duplicate_result(duplicate_details, hashes)
+    
+    async def _ensure_async_collection(self):
+        """Create the collection through the async client if it is missing
+        
+        Against a server this is normally a no-op, since __init__ already
+        created it; the local in-memory mode keeps separate state per client.
+        """
+        if self._async_collection_ready:
+            return
+        
+        from qdrant_client.models import PayloadSchemaType
+        
+        if not await self.async_client.collection_exists(self.collection_name):
+            await self.async_client.create_collection(
+                collection_name=self.collection_name,
+                **self._collection_config()
+            )
+            for field_name, schema in PAYLOAD_INDEXES:
+                await self.async_client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType(schema)
+                )
+        self._async_collection_ready = True
+    
+    async def _flush_points(self, points: List[Any]):
+        """Write-behind flush: one batched upsert, acknowledged before points leave the buffer"""
+        await self.async_client.upsert(
+            collection_name=self.collection_name,
+            points=points,
+            wait=True
+        )
+    
+    async def flush(self):
+        """Flush buffered Qdrant writes now"""
+        if self._write_buffer is not None:
+            await self._write_buffer.flush()
+    
+    async def close(self):
+        """Flush buffered writes and close the async client (call on shutdown)"""
+        if self._write_buffer is not None:
+            await self._write_buffer.close()
+        if self.async_client is not None:
+            await self.async_client.close()
+        
+        self._stop_snapshots.set()
+        if self._hash_store is not None:
+            self._hash_store.sync()
+        
+        if self._embedding_index is not None:
+            with self._embedding_lock:
+                self._embedding_index.save(self.embedding_index_file)
+    
+    def _pending_duplicate_details(self,
+                                   pending: List[Any],
+                                   hashes: Dict[str, Any],
+                                   max_hamming: int,
+                                   claim: Dict[str, str],
+                                   exclude_id: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Match buffered (not yet flushed) points with the same tiers and scope as Qdrant"""
+        pending = [point for point in pending if point.id != exclude_id]
+        if not pending:
+            return []
+        
+        phash_distances = hamming_distances(
+            hex_to_uint64(point.payload["phash"] for point in pending),
+            int(hashes["phash"], 16)
+        )
         
-        is_duplicate = False
         duplicate_details = []
+        for point, distance in zip(pending, phash_distances.tolist()):
+            if hashes.get("sha256") and point.payload.get("sha256") == hashes["sha256"]:
+                similarity, tier = 1.0, "exact_sha256"
+            elif distance <= max_hamming and self._in_search_scope(point.payload, claim.get("claim_location")):
+                similarity, tier = round(1 - (distance / 64), 3), "phash"
+            else:
+                continue
+            duplicate_details.append({
+                "job_id": point.payload["job_id"],
+                "similarity_score": similarity,
+                "timestamp": point.payload["timestamp"],
+                "match_tier": tier
+            })
+        return duplicate_details
+    
+    def _normalize_location(self, claim_location: Optional[str]) -> str:
+        """Case-folded location; the form's "Unknown" default counts as no location"""
+        location = (claim_location or "").strip().lower()
+        return "" if location == "unknown" else location
+    
+    def _search_cutoff(self) -> Optional[datetime]:
+        if self.search_months <= 0:
+            return None
+        return datetime.now() - timedelta(days=30 * self.search_months)
+    
+    def _search_scope_filter(self, claim_location: Optional[str], exclude_id: Optional[str] = None):
+        """Payload filter restricting perceptual search to the configured scope (None = everything)"""
+        from qdrant_client.models import Filter, FieldCondition, DatetimeRange, HasIdCondition, MatchValue
+        
+        if exclude_id is not None:
+            return Filter(
+                must=(self._search_scope_filter(claim_location) or Filter()).must,
+                must_not=[HasIdCondition(has_id=[exclude_id])]
+            )
+        
+        conditions = []
+        cutoff = self._search_cutoff()
+        if cutoff is not None:
+            conditions.append(FieldCondition(key="timestamp", range=DatetimeRange(gte=cutoff)))
+        if self.search_same_region and claim_location:
+            conditions.append(FieldCondition(key="claim_location", match=MatchValue(value=claim_location)))
+        
+        return Filter(must=conditions) if conditions else None
+    
+    def _in_search_scope(self, payload: Dict[str, Any], claim_location: Optional[str]) -> bool:
+        """Same scope as _search_scope_filter, for points that are not in Qdrant yet"""
+        cutoff = self._search_cutoff()
+        if cutoff is not None and datetime.fromisoformat(payload["timestamp"]) < cutoff:
+            return False
+        if self.search_same_region and claim_location:
+            return payload.get("claim_location") == claim_location
+        return True
+    
+    def _exact_search_collections(self) -> List[str]:
+        """Collections searched by the exact tier: hot, plus cold once it exists"""
+        if self.client.collection_exists(self.cold_collection_name):
+            return [self.collection_name, self.cold_collection_name]
+        return [self.collection_name]
+    
+    async def _exact_search_collections_async(self) -> List[str]:
+        if await self.async_client.collection_exists(self.cold_collection_name):
+            return [self.collection_name, self.cold_collection_name]
+        return [self.collection_name]
+    
+    def archive_cold_points(self, batch_size: int = 256) -> int:
+        """Move points older than QDRANT_COLD_AFTER_DAYS from the hot to the cold collection
+        
+        Keeps the hot collection (searched on every claim) bounded by age. Cold
+        points stay reachable by the exact SHA-256 tier. Returns the number moved.
+        """
+        if not self.use_qdrant or self.cold_after_days <= 0:
+            return 0
+        
+        from qdrant_client.models import (
+            Filter, FieldCondition, DatetimeRange, PointStruct, PointIdsList, PayloadSchemaType
+        )
+        
+        if not self.client.collection_exists(self.cold_collection_name):
+            self.client.create_collection(
+                collection_name=self.cold_collection_name,
+                **self._collection_config()
+            )
+            for field_name, schema in PAYLOAD_INDEXES:
+                self.client.create_payload_index(
+                    collection_name=self.cold_collection_name,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType(schema)
+                )
+            print(f"Created Qdrant collection: {self.cold_collection_name}")
+        
+        cutoff = datetime.now() - timedelta(days=self.cold_after_days)
+        old_points = Filter(must=[FieldCondition(key="timestamp", range=DatetimeRange(lt=cutoff))])
+        
+        moved = 0
+        while True:
+            # Moved points are deleted, so every pass restarts from the first match
+            points, _ = self.client.scroll(
+                collection_name=self.collection_name,
+                scroll_filter=old_points,
+                limit=batch_size,
+                with_payload=True,
+                with_vectors=True
+            )
+            if not points:
+                break
+            
+            self.client.upsert(
+                collection_name=self.cold_collection_name,
+                points=[PointStruct(id=point.id, vector=point.vector, payload=point.payload) for point in points],
+                wait=True
+            )
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=PointIdsList(points=[point.id for point in points]),
+                wait=True
+            )
+            moved += len(points)
+        
+        if moved:
+            print(f"🧊 Moved {moved} points older than {self.cold_after_days} days to '{self.cold_collection_name}'")
+        return moved
+    
+    def _sha256_filter(self, sha256: str, exclude_id: Optional[str] = None):
+        from qdrant_client.models import Filter, FieldCondition, HasIdCondition, MatchValue
+        
+        return Filter(
+            must=[FieldCondition(key="sha256", match=MatchValue(value=sha256))],
+            must_not=[HasIdCondition(has_id=[exclude_id])] if exclude_id is not None else None
+        )
+    
+    def _hash_point(self,
+                    hashes: Dict[str, Any],
+                    job_id: str,
+                    claim: Dict[str, str] = None,
+                    timestamp: Optional[str] = None):
+        """PointStruct carrying all four hash vectors and the hex hashes as payload"""
+        from qdrant_client.models import PointStruct
+        
+        claim = claim or {}
+        return PointStruct(
+            id=self._point_id(job_id),
+            vector={field: self._hash_to_vector(hashes[field]) for field in HASH_FIELDS},
+            payload={
+                "job_id": job_id,
+                "timestamp": timestamp or datetime.now().isoformat(),
+                "phash": hashes["phash"],
+                "dhash": hashes["dhash"],
+                "whash": hashes["whash"],
+                "average_hash": hashes["average_hash"],
+                "sha256": hashes.get("sha256"),
+                "policy_id": claim.get("policy_id") or None,
+                "claim_location": claim.get("claim_location") or None
+            }
+        )
+    
+    def _qdrant_duplicate_details(self, exact_results: List[Any], search_results: List[Any]) -> List[Dict[str, Any]]:
+        """Duplicate details from sha256 scroll hits and phash search hits"""
+        duplicate_details = []
+        
+        # A point caught mid-move can briefly exist in both hot and cold
+        exact_results = list({result.id: result for result in exact_results}.values())
+        for result in exact_results:
+            duplicate_details.append({
+                "job_id": result.payload.get("job_id"),
+                "similarity_score": 1.0,
+                "timestamp": result.payload.get("timestamp"),
+                "match_tier": "exact_sha256"
+            })
+        
+        exact_ids = {result.id for result in exact_results}
+        for result in search_results:
+            if result.id not in exact_ids:
+                distance = round((HASH_VECTOR_SIZE - result.score) / 2)
+                duplicate_details.append({
+                    "job_id": result.payload.get("job_id"),
+                    "similarity_score": round(1 - (distance / 64), 3),
+                    "timestamp": result.payload.get("timestamp"),
+                    "match_tier": "phash"
+                })
+        
+        return duplicate_details
+    
+    def _qdrant_duplicate_result(self, duplicate_details: List[Dict[str, Any]], hashes: Dict[str, Any]) -> Dict[str, Any]:
+        match_tier = None
+        if any(detail["match_tier"] == "exact_sha256" for detail in duplicate_details):
+            match_tier = "exact_sha256"
+        elif duplicate_details:
+            match_tier = "phash"
+        
+        return {
+            "is_duplicate": len(duplicate_details) > 0,
+            "duplicate_count": len(duplicate_details),
+            "duplicate_details": duplicate_details,
+            "match_tier": match_tier,
+            "hashes": hashes
+        }
+    
+    def _check_duplicate_file(self, hashes: Dict[str, Any], job_id: str, threshold: float) -> Dict[str, Any]:
+        """Check duplicates using file-based storage"""
+        
+        self._load_file_index()
         
         # Compare with stored hashes (using Hamming distance)
         # threshold of 0.9 similarity = max 6 bits different (out of 64)
         max_hamming = int((1 - threshold) * 64)
         
-        for stored in stored_hashes:
-            distance = self._hamming_distance(hashes["phash"], stored["phash"])
-            if distance <= max_hamming:
-                is_duplicate = True
-                similarity = 1 - (distance / 64)
-                duplicate_details.append({
-                    "job_id": stored["job_id"],
-                    "similarity_score": round(similarity, 3),
-                    "timestamp": stored["timestamp"]
-                })
+        # Check and insert atomically: two concurrent uploads of one photo cannot both miss
+        with self._index_lock:
+            matches, tier_stats = self._find_matches(hashes, max_hamming)
+            duplicate_details = self._build_duplicate_details(matches)
+            
+            # Store current hash (buffered for the next snapshot, or one fixed-size append)
+            self._hash_store.append({
+                "job_id": job_id,
+                "timestamp": datetime.now().isoformat(),
+                "phash": hashes["phash"],
+                "dhash": hashes["dhash"],
+                "whash": hashes["whash"],
+                "average_hash": hashes["average_hash"],
+                "sha256": hashes.get("sha256")
+            })
+            self._hash_columns.append([int(hashes[field], 16) for field in HASH_FIELDS])
+            self._probe_index.add(int(hashes[self.probe_field], 16))
+            self._sha256_index.add(self._sha256_key(hashes.get("sha256")))
+            
+            # Without snapshots, periodically drop superseded records inline; positions shift, so re-index
+            if not self._hash_store.group_commit and self._hash_store.should_compact() \
+                    and self._hash_store.compact():
+                self._rebuild_hash_indexes()
         
-        # Store current hash
-        stored_hashes.append({
-            "job_id": job_id,
-            "timestamp": datetime.now().isoformat(),
-            "phash": hashes["phash"],
-            "dhash": hashes["dhash"],
-            "whash": hashes["whash"],
-            "average_hash": hashes["average_hash"]
-        })
+        is_duplicate = len(duplicate_details) > 0
         
-        # Save updated hashes
-        with open(self.storage_file, 'w') as f:
-            json.dump(stored_hashes, f, indent=2)
+        # Report the strongest tier that decided the match
+        match_tier = None
+        for tier in ("exact_sha256", "perceptual_cascade", "phash"):
+            if any(detail["match_tier"] == tier for detail in duplicate_details):
+                match_tier = tier
+                break
         
         return {
             "is_duplicate": is_duplicate,
             "duplicate_count": len(duplicate_details),
             "duplicate_details": duplicate_details,
+            "match_tier": match_tier,
+            "tier_stats": tier_stats,
             "hashes": hashes
         }
     
+    def index_hashes(self, entries: List[Dict[str, Any]]) -> int:
+        """Bulk-insert precomputed hashes without checking them (archive backfill)
+        
+        Each entry has "hashes" (as from compute_perceptual_hash) and "job_id",
+        plus optional "timestamp", "policy_id" and "claim_location". Qdrant gets
+        one batched upsert; the file store appends under the index lock and is
+        made durable before returning. Returns the number of entries stored.
+        """
+        if not entries:
+            return 0
+        
+        if self.use_qdrant:
+            self.client.upsert(
+                collection_name=self.collection_name,
+                points=[
+                    self._hash_point(
+                        entry["hashes"],
+                        entry["job_id"],
+                        {
+                            "policy_id": entry.get("policy_id", ""),
+                            "claim_location": self._normalize_location(entry.get("claim_location"))
+                        },
+                        timestamp=entry.get("timestamp")
+                    )
+                    for entry in entries
+                ],
+                wait=True
+            )
+            return len(entries)
+        
+        self._load_file_index()
+        with self._index_lock:
+            for entry in entries:
+                hashes = entry["hashes"]
+                self._hash_store.append({
+                    "job_id": entry["job_id"],
+                    "timestamp": entry.get("timestamp") or datetime.now().isoformat(),
+                    "phash": hashes["phash"],
+                    "dhash": hashes["dhash"],
+                    "whash": hashes["whash"],
+                    "average_hash": hashes["average_hash"],
+                    "sha256": hashes.get("sha256")
+                })
+                self._hash_columns.append([int(hashes[field], 16) for field in HASH_FIELDS])
+                self._probe_index.add(int(hashes[self.probe_field], 16))
+                self._sha256_index.add(self._sha256_key(hashes.get("sha256")))
+        
+        self.snapshot_hash_log()
+        return len(entries)
+    
+    def check_duplicates_batch(self, hashes_list: List[Dict[str, Any]], threshold: float = 0.9) -> List[Dict[str, Any]]:
+        """Check many precomputed hash sets against the file store in one vectorized pass
+        
+        Read-only: nothing is stored, so this suits bulk audits of existing archives.
+        """
+        self._load_file_index()
+        
+        max_hamming = int((1 - threshold) * 64)
+        queries = [int(hashes["phash"], 16) for hashes in hashes_list]
+        
+        with self._index_lock:
+            found = self._hash_columns.search_batch("phash", queries, max_hamming, metric=self.hash_distance)
+            details = [
+                self._build_duplicate_details(zip(positions.tolist(), distances.tolist()))
+                for positions, distances in found
+            ]
+        
+        results = []
+        for hashes, duplicate_details in zip(hashes_list, details):
+            results.append({
+                "is_duplicate": len(duplicate_details) > 0,
+                "duplicate_count": len(duplicate_details),
+                "duplicate_details": duplicate_details,
+                "hashes": hashes
+            })
+        
+        return results
+    
+    def analyze_jpeg_fingerprint(self,
+                                 image_path: Optional[str],
+                                 metadata: Dict[str, Any],
+                                 data: Optional[bytes] = None) -> Dict[str, Any]:
+        """Re-save and camera/encoder mismatch indicators from the JPEG header alone (of data if given)"""
+        result = {
+            "jpeg_fingerprint_score": 0,
+            "fraud_indicators": [],
+            "fingerprint": None
+        }
+        if not self.use_jpeg_fingerprint:
+            return result
+        
+        try:
+            with (io.BytesIO(data) if data is not None else open(image_path, "rb")) as f:
+                structure = read_jpeg_structure(f)
+        except (OSError, HeaderParseError, struct.error):
+            # Not a JPEG (or an unreadable one): nothing to fingerprint
+            return result
+        
+        tables = structure["quant_tables"]
+        signature = table_signature(tables)
+        libjpeg_quality = self.quant_tables.software_quality(signature)
+        editors = [EDITOR_SEGMENTS[segment] for segment in structure["app_segments"] if segment in EDITOR_SEGMENTS]
+        app_ids = [identifier for _, identifier in structure["app_segments"]]
+        thumbnail = thumbnail_structure(structure["exif"]) if structure["exif"] else None
+        
+        make = (metadata.get("camera_make") or "").strip()
+        model = (metadata.get("camera_model") or "").strip()
+        
+        score = 0
+        indicators = []
+        
+        # Photoshop / Save for Web write their own APPn segments. An EXIF Software tag
+        # naming an editor is already scored (validation and metadata score): count it once
+        software = (metadata.get("software") or "").lower()
+        if editors and not any(tool in software for tool in EDITING_SOFTWARE):
+            score += 3
+            indicators.append(f"Saved by Adobe software ({', '.join(editors)})")
+        
+        if make:
+            # Only curated make/models have known tables to mismatch: standard libjpeg
+            # tables are also what many phones encode with
+            known = self.quant_tables.camera_signatures(make, model)
+            if known and signature not in known:
+                score += 2
+                if libjpeg_quality is not None:
+                    indicators.append(
+                        f"{make} {model} photo encoded with standard libjpeg tables "
+                        f"(quality {libjpeg_quality}), not this camera's own tables"
+                    )
+                else:
+                    indicators.append(f"Quantization tables do not match known {make} {model} output")
+            
+            # Cameras write baseline JPEGs with the standard Huffman tables
+            if structure["progressive"] or not structure["standard_huffman"]:
+                score += 1
+                indicators.append("Progressive or optimized encoding, unusual for a camera original")
+            
+            # Cameras put EXIF directly after SOI; libjpeg-based savers write JFIF first
+            if "JFIF" in app_ids and "Exif" in app_ids and app_ids.index("JFIF") < app_ids.index("Exif"):
+                score += 1
+                indicators.append("JFIF header written ahead of the camera EXIF")
+        
+        if thumbnail:
+            image_ratio = structure["width"] / max(structure["height"], 1)
+            thumbnail_ratio = thumbnail["width"] / max(thumbnail["height"], 1)
+            if abs(image_ratio - thumbnail_ratio) / image_ratio > 0.1:
+                score += 2
+                indicators.append("EXIF thumbnail aspect ratio differs from the image (cropped or replaced after capture)")
+            elif libjpeg_quality is not None and \
+                    self.quant_tables.software_quality(table_signature(thumbnail["quant_tables"])) is None:
+                score += 1
+                indicators.append("EXIF thumbnail keeps camera tables but the image was re-encoded")
+        
+        result.update({
+            "jpeg_fingerprint_score": min(score, 10),
+            "fraud_indicators": indicators,
+            "fingerprint": {
+                "quant_signature": signature,
+                "estimated_quality": estimate_quality(tables),
+                "libjpeg_quality": libjpeg_quality,
+                "progressive": structure["progressive"],
+                "standard_huffman": structure["standard_huffman"],
+                "app_segments": [f"APP{marker - 0xE0}:{identifier}" for marker, identifier in structure["app_segments"]],
+                "thumbnail_size": [thumbnail["width"], thumbnail["height"]] if thumbnail else None
+            }
+        })
+        return result
+    
     def calculate_metadata_fraud_score(self, 
                                        metadata: Dict[str, Any],
-                                       validation_result: Dict[str, Any]) -> Dict[str, Any]:
+                                       validation_result: Dict[str, Any],
+                                       jpeg_fingerprint: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """Calculate fraud risk score based on metadata"""
         
         fraud_score = 0
@@ -255,8 +1643,7 @@ class FraudDetector:
         # Check for editing software
         if metadata.get("software"):
             software = metadata["software"].lower()
-            editing_tools = ["photoshop", "gimp", "pixlr", "lightroom", "snapseed"]
-            for tool in editing_tools:
+            for tool in EDITING_SOFTWARE:
                 if tool in software:
                     fraud_score += 2
                     fraud_indicators.append(f"Edited with {tool}")
@@ -267,6 +1654,11 @@ class FraudDetector:
             fraud_score += 1
             fraud_indicators.append("Camera information missing despite EXIF presence")
         
+        # Header-level evidence of re-saving (analyze_jpeg_fingerprint)
+        if jpeg_fingerprint:
+            fraud_score += jpeg_fingerprint["jpeg_fingerprint_score"]
+            fraud_indicators.extend(jpeg_fingerprint["fraud_indicators"])
+        
         # Add validation issues
         if validation_result.get("issues"):
             fraud_indicators.extend(validation_result["issues"])
@@ -1,17 +1,30 @@
 import requests
+import httpx
 import json
 import base64
-from typing import Dict, Any, List
+import os
+from typing import Dict, Any, List, Optional, Tuple
 import re
 from pathlib import Path
+from app.utils.ollama_client import OllamaClient
+from app.utils.stage_executor import StageExecutor
 
 class LLaVADamageAnalyzer:
-    def __init__(self, model_name: str = "llava:13b", ollama_host: str = "http://localhost:11434"):
+    def __init__(self,
+                 model_name: str = "llava:13b",
+                 ollama_host: str = "http://localhost:11434",
+                 executor: Optional[StageExecutor] = None):
         """Initialize LLaVA analyzer using Ollama"""
+        # Image files are read and encoded for the *_async methods in this pool
+        self.executor = executor or StageExecutor()
         self.model_name = model_name
         self.ollama_host = ollama_host
         self.api_endpoint = f"{ollama_host}/api/generate"
         
+        # Keep-alive client the *_async methods share; queues requests FIFO beyond
+        # the server's parallel slots (OLLAMA_PARALLEL)
+        self.client = OllamaClient(ollama_host)
+        
         # Severity mapping
         self.severity_levels = {
             "minor": 2,
@@ -22,6 +35,10 @@ class LLaVADamageAnalyzer:
             "totalloss": 10
         }
         
+        # One generate request answers both the damage analysis and the consistency check
+        # (analyze_claim), instead of two that each prefill the image
+        self.single_pass = os.getenv("LLAVA_SINGLE_PASS", "false").lower() == "true"
+        
         # Check if Ollama is running
         try:
             response = requests.get(f"{ollama_host}/api/tags", timeout=5)
@@ -49,28 +66,17 @@ class LLaVADamageAnalyzer:
     def analyze_damage(self, 
                        image_path: str, 
                        claim_description: str,
-                       metadata: Dict[str, Any]) -> Dict[str, Any]:
+                       metadata: Dict[str, Any],
+                       image_base64: Optional[str] = None) -> Dict[str, Any]:
         """Analyze damage using Vision-Language Model via Ollama"""
         
         print(f"🔍 Analyzing damage with {self.model_name}...")
         
-        # Create comprehensive prompt
-        prompt = self._create_analysis_prompt(claim_description, metadata)
+        # Encode image (unless the caller already holds it encoded)
+        if image_base64 is None:
+            image_base64 = self._encode_image_to_base64(image_path)
         
-        # Encode image
-        image_base64 = self._encode_image_to_base64(image_path)
-        
-        # Prepare request payload
-        payload = {
-            "model": self.model_name,
-            "prompt": prompt,
-            "images": [image_base64],
-            "stream": False,
-            "options": {
-                "temperature": 0.7,
-                "num_predict": 512  # Max tokens to generate
-            }
-        }
+        payload = self._damage_payload(claim_description, metadata, image_base64)
         
         try:
             # Make request to Ollama
@@ -88,28 +94,93 @@ class LLaVADamageAnalyzer:
             
             print(f"✅ Analysis complete. Generated {len(generated_text)} characters")
             
-            # Parse structured output
-            parsed_analysis = self._parse_response(generated_text)
+            return self._damage_result(generated_text)
+            
+        except requests.exceptions.Timeout:
+            print("❌ Request timeout - Ollama took too long")
+            raise Exception("Analysis timeout - please try again")
+        except Exception as e:
+            print(f"❌ Error during analysis: {e}")
+            raise
+    
+    async def analyze_damage_async(self,
+                                   image_path: str,
+                                   claim_description: str,
+                                   metadata: Dict[str, Any],
+                                   image_base64: Optional[str] = None) -> Dict[str, Any]:
+        """analyze_damage through the shared, slot-limited Ollama client"""
+        
+        print(f"🔍 Analyzing damage with {self.model_name}...")
+        
+        if image_base64 is None:
+            image_base64 = await self.executor.run_thread(self._encode_image_to_base64, image_path)
+        
+        try:
+            result, timing = await self.client.generate(
+                self._damage_payload(claim_description, metadata, image_base64)
+            )
+            generated_text = result.get('response', '')
             
-            # Calculate damage score
-            damage_score = self._calculate_damage_score(parsed_analysis)
+            print(f"✅ Analysis complete. Generated {len(generated_text)} characters "
+                  f"(queued {timing['queue_wait_ms']:.0f} ms, generated in {timing['generation_ms']:.0f} ms)")
             
-            return {
-                "raw_response": generated_text,
-                "parsed_analysis": parsed_analysis,
-                "damage_score": damage_score,
-                "severity_level": parsed_analysis.get("severity", "Unknown")
-            }
+            analysis = self._damage_result(generated_text)
+            analysis["ollama_timing"] = timing
+            return analysis
             
-        except requests.exceptions.Timeout:
+        except httpx.TimeoutException:
             print("❌ Request timeout - Ollama took too long")
             raise Exception("Analysis timeout - please try again")
         except Exception as e:
             print(f"❌ Error during analysis: {e}")
             raise
     
-    def _create_analysis_prompt(self, claim_description: str, metadata: Dict) -> str:
-        """Create structured prompt for damage analysis"""
+    def _damage_payload(self, claim_description: str, metadata: Dict[str, Any], image_base64: str) -> Dict[str, Any]:
+        """Ollama generate request for analyze_damage"""
+        return {
+            "model": self.model_name,
+            "prompt": self._create_analysis_prompt(claim_description, metadata),
+            "images": [image_base64],
+            "stream": False,
+            "options": {
+                "temperature": 0.7,
+                "num_predict": 512  # Max tokens to generate
+            }
+        }
+    
+    def _damage_result(self, generated_text: str) -> Dict[str, Any]:
+        """analyze_damage's result from the model's answer"""
+        
+        # Parse structured output
+        parsed_analysis = self._parse_response(generated_text)
+        
+        # Calculate damage score
+        damage_score = self._calculate_damage_score(parsed_analysis)
+        
+        return {
+            "raw_response": generated_text,
+            "parsed_analysis": parsed_analysis,
+            "damage_score": damage_score,
+            "severity_level": parsed_analysis.get("severity", "Unknown")
+        }
+    
+    def empty_result(self, skipped: str) -> Dict[str, Any]:
+        """analyze_damage-shaped result for a claim LLaVA did not see (skipped names the reason)"""
+        return {
+            "raw_response": "",
+            "parsed_analysis": self._parse_response(""),
+            "damage_score": 0,
+            "severity_level": "Unknown",
+            "skipped": skipped
+        }
+    
+    def _create_analysis_prompt(self, claim_description: str, metadata: Dict, consistency_score: bool = False) -> str:
+        """Create structured prompt for damage analysis (plus check_consistency's questions, for analyze_claim)"""
+        
+        consistency_section = """
+
+CONSISTENCY SCORE:
+[Compare the damaged parts you listed with the claim description. Does the visible damage match the claim (Yes/No/Partially)? Is the severity described in the claim accurate (Underestimated/Accurate/Overestimated)? Are there any contradictions between the claim and image? End with a consistency rating on a 0-10 scale written as "N/10" (0=completely inconsistent, 10=perfectly consistent)]""" if consistency_score else ""
         
         prompt = f"""You are an expert insurance claim assessor. Analyze the damage in this vehicle image and provide a detailed assessment.
 
@@ -137,7 +208,7 @@ CONSISTENCY CHECK:
 [State if the visible damage matches the claim description. Answer "Consistent" or "Inconsistent" and explain why in 1-2 sentences]
 
 ADDITIONAL OBSERVATIONS:
-[Note any suspicious elements, unusual patterns, or important details]
+[Note any suspicious elements, unusual patterns, or important details]{consistency_section}
 
 Provide clear, specific observations based solely on what you see in the image."""
         
@@ -228,11 +299,70 @@ Provide clear, specific observations based solely on what you see in the image."
     def check_consistency(self, 
                          image_path: str,
                          claim_description: str,
-                         detected_damage: str) -> Dict[str, Any]:
+                         detected_damage: str,
+                         image_base64: Optional[str] = None) -> Dict[str, Any]:
         """Specific consistency check between claim and visual evidence"""
         
         print(f"🔍 Checking consistency with {self.model_name}...")
         
+        # Encode image (unless the caller already holds it encoded)
+        if image_base64 is None:
+            image_base64 = self._encode_image_to_base64(image_path)
+        
+        payload = self._consistency_payload(claim_description, detected_damage, image_base64)
+        
+        try:
+            response = requests.post(
+                self.api_endpoint,
+                json=payload,
+                timeout=300  # 5 minutes timeout
+            )
+            
+            if response.status_code != 200:
+                raise Exception(f"Ollama API error: {response.status_code}")
+            
+            result = response.json()
+            consistency_response = result.get('response', '')
+            
+            print(f"✅ Consistency check complete")
+            
+            return self._consistency_result(consistency_response)
+            
+        except Exception as e:
+            print(f"❌ Consistency check error: {e}")
+            return self._consistency_error(e)
+    
+    async def check_consistency_async(self,
+                                      image_path: str,
+                                      claim_description: str,
+                                      detected_damage: str,
+                                      image_base64: Optional[str] = None) -> Dict[str, Any]:
+        """check_consistency through the shared, slot-limited Ollama client"""
+        
+        print(f"🔍 Checking consistency with {self.model_name}...")
+        
+        if image_base64 is None:
+            image_base64 = await self.executor.run_thread(self._encode_image_to_base64, image_path)
+        
+        try:
+            result, timing = await self.client.generate(
+                self._consistency_payload(claim_description, detected_damage, image_base64)
+            )
+            
+            print(f"✅ Consistency check complete "
+                  f"(queued {timing['queue_wait_ms']:.0f} ms, generated in {timing['generation_ms']:.0f} ms)")
+            
+            consistency = self._consistency_result(result.get('response', ''))
+            consistency["ollama_timing"] = timing
+            return consistency
+            
+        except Exception as e:
+            print(f"❌ Consistency check error: {e}")
+            return self._consistency_error(e)
+    
+    def _consistency_payload(self, claim_description: str, detected_damage: str, image_base64: str) -> Dict[str, Any]:
+        """Ollama generate request for check_consistency"""
+        
         prompt = f"""Compare the claim description with the visible damage in the image.
 
 CLAIM DESCRIPTION:
@@ -250,10 +380,7 @@ Please answer these questions clearly and concisely:
 
 Provide a brief, direct answer."""
         
-        # Encode image
-        image_base64 = self._encode_image_to_base64(image_path)
-        
-        payload = {
+        return {
             "model": self.model_name,
             "prompt": prompt,
             "images": [image_base64],
@@ -263,39 +390,128 @@ Provide a brief, direct answer."""
                 "num_predict": 256
             }
         }
+    
+    def _consistency_error(self, error: Exception) -> Dict[str, Any]:
+        """Default values when the consistency check fails"""
+        return {
+            "consistency_response": f"Error during consistency check: {str(error)}",
+            "consistency_score": 5.0,
+            "is_consistent": False
+        }
+    
+    def _consistency_result(self, consistency_response: str) -> Dict[str, Any]:
+        """check_consistency's result from the model's answer (score 5 if it gave none)"""
+        consistency_score = 5.0  # Default
+        score_match = re.search(r'(\d+)\s*[/:]?\s*10|(\d+)\s*out of\s*10', consistency_response)
+        if score_match:
+            consistency_score = float(score_match.group(1) or score_match.group(2))
+        
+        return {
+            "consistency_response": consistency_response,
+            "consistency_score": consistency_score,
+            "is_consistent": consistency_score >= 7
+        }
+    
+    def analyze_claim(self,
+                      image_path: str,
+                      claim_description: str,
+                      metadata: Dict[str, Any],
+                      image_base64: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """analyze_damage and check_consistency from a single generate request
+        
+        The analysis prompt gets a closing CONSISTENCY SCORE section that asks
+        the check_consistency questions about the parts the model has just
+        listed. Returns the same two results as the separate calls.
+        """
+        
+        print(f"🔍 Analyzing damage and consistency with {self.model_name} (single pass)...")
+        
+        # Encode image (unless the caller already holds it encoded)
+        if image_base64 is None:
+            image_base64 = self._encode_image_to_base64(image_path)
+        
+        payload = self._claim_payload(claim_description, metadata, image_base64)
         
         try:
             response = requests.post(
                 self.api_endpoint,
                 json=payload,
-                timeout=300  # 5 minutes timeout
+                timeout=300  # 5 minutes timeout for LLaVA 13B
             )
             
             if response.status_code != 200:
-                raise Exception(f"Ollama API error: {response.status_code}")
+                raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
             
             result = response.json()
-            consistency_response = result.get('response', '')
+            generated_text = result.get('response', '')
             
-            print(f"✅ Consistency check complete")
+            print(f"✅ Analysis complete. Generated {len(generated_text)} characters")
             
-            # Parse consistency score
-            consistency_score = 5.0  # Default
-            score_match = re.search(r'(\d+)\s*[/:]?\s*10|(\d+)\s*out of\s*10', consistency_response)
-            if score_match:
-                consistency_score = float(score_match.group(1) or score_match.group(2))
+        except requests.exceptions.Timeout:
+            print("❌ Request timeout - Ollama took too long")
+            raise Exception("Analysis timeout - please try again")
+        except Exception as e:
+            print(f"❌ Error during analysis: {e}")
+            raise
+        
+        return self._claim_result(generated_text)
+    
+    async def analyze_claim_async(self,
+                                  image_path: str,
+                                  claim_description: str,
+                                  metadata: Dict[str, Any],
+                                  image_base64: Optional[str] = None) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """analyze_claim through the shared, slot-limited Ollama client (timing on the analysis only)"""
+        
+        print(f"🔍 Analyzing damage and consistency with {self.model_name} (single pass)...")
+        
+        if image_base64 is None:
+            image_base64 = await self.executor.run_thread(self._encode_image_to_base64, image_path)
+        
+        try:
+            result, timing = await self.client.generate(
+                self._claim_payload(claim_description, metadata, image_base64)
+            )
+            generated_text = result.get('response', '')
             
-            return {
-                "consistency_response": consistency_response,
-                "consistency_score": consistency_score,
-                "is_consistent": consistency_score >= 7
-            }
+            print(f"✅ Analysis complete. Generated {len(generated_text)} characters "
+                  f"(queued {timing['queue_wait_ms']:.0f} ms, generated in {timing['generation_ms']:.0f} ms)")
             
+        except httpx.TimeoutException:
+            print("❌ Request timeout - Ollama took too long")
+            raise Exception("Analysis timeout - please try again")
         except Exception as e:
-            print(f"❌ Consistency check error: {e}")
-            # Return default values on error
-            return {
-                "consistency_response": f"Error during consistency check: {str(e)}",
-                "consistency_score": 5.0,
-                "is_consistent": False
-            }
\ No newline at end of file
+            print(f"❌ Error during analysis: {e}")
+            raise
+        
+        llava_analysis, consistency_check = self._claim_result(generated_text)
+        llava_analysis["ollama_timing"] = timing
+        return llava_analysis, consistency_check
+    
+    def _claim_payload(self, claim_description: str, metadata: Dict[str, Any], image_base64: str) -> Dict[str, Any]:
+        """Ollama generate request for analyze_claim"""
+        return {
+            "model": self.model_name,
+            "prompt": self._create_analysis_prompt(claim_description, metadata, consistency_score=True),
+            "images": [image_base64],
+            "stream": False,
+            "options": {
+                "temperature": 0.7,
+                "num_predict": 768  # Room for both answers (512 + 256)
+            }
+        }
+    
+    def _claim_result(self, generated_text: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+        """analyze_claim's two results from the model's answer"""
+        
+        # The consistency answer is the last section; the rest parses as analyze_damage's response
+        match = re.search(r"CONSISTENCY SCORE:?", generated_text, re.IGNORECASE)
+        analysis_text = generated_text[:match.start()] if match else generated_text
+        consistency_response = generated_text[match.end():].strip() if match else ""
+        
+        llava_analysis = self._damage_result(analysis_text)
+        llava_analysis["raw_response"] = generated_text
+        return llava_analysis, self._consistency_result(consistency_response)
+    
+    async def close(self):
+        await self.client.close()
@@ -1,8 +1,9 @@
 from ultralytics import YOLO
 import cv2
 import numpy as np
-from typing import List, Dict, Any, Tuple
+from typing import List, Dict, Any, Optional, Tuple
 import os
+import threading
 
 class YOLODamageDetector:
     def __init__(self, model_path: str = "yolov10m.pt"):
@@ -29,13 +30,65 @@ class YOLODamageDetector:
             'missing': ['missing', 'detached', 'fallen']
         }
         
+        # Optional image embedding pooled from backbone features in the same forward pass
+        self.extract_embeddings = os.getenv("YOLO_EMBEDDINGS", "false").lower() == "true"
+        self.embedding_layer = None
+        self._captured = threading.local()
+        # Ultralytics predictors are not thread-safe: claims in the stage pool take turns
+        self._inference_lock = threading.Lock()
+        if self.extract_embeddings:
+            layer = os.getenv("YOLO_EMBEDDING_LAYER")
+            self._register_embedding_hook(int(layer) if layer else None)
+        
         print("✅ YOLO model loaded successfully")
     
+    def _register_embedding_hook(self, layer: Optional[int] = None):
+        """Keep the output of one backbone layer (SPPF by default) from every forward pass"""
+        layers = self.model.model.model
+        if layer is None:
+            layer = next(
+                (i for i, module in enumerate(layers) if type(module).__name__ == "SPPF"),
+                len(layers) // 2
+            )
+        
+        def capture(module, inputs, output):
+            self._captured.features = output[0] if isinstance(output, (list, tuple)) else output
+        
+        layers[layer].register_forward_hook(capture)
+        self.embedding_layer = layer
+        print(f"   Embeddings from layer {layer} ({type(layers[layer]).__name__})")
+    
+    def _pooled_embedding(self) -> Optional[np.ndarray]:
+        """L2-normalized global average pool of the captured feature map"""
+        features = getattr(self._captured, "features", None)
+        if features is None:
+            return None
+        self._captured.features = None
+        
+        embedding = features[-1].float().mean(dim=(1, 2)).cpu().numpy().astype(np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm > 0 else embedding
+    
     def detect_objects(self, image_path: str, conf_threshold: float = 0.25) -> List[Dict[str, Any]]:
         """Detect objects and potential damage in image"""
+        return self.detect_objects_with_embedding(image_path, conf_threshold)[0]
+    
+    def detect_objects_with_embedding(self,
+                                      image_path: str,
+                                      conf_threshold: float = 0.25,
+                                      image: Optional[np.ndarray] = None,
+                                      scale: float = 1.0) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray]]:
+        """Detections plus the backbone embedding of the same inference (None unless YOLO_EMBEDDINGS)
+        
+        image is an already decoded BGR array; when given, image_path is not read.
+        Boxes are multiplied by scale, to report them in the coordinates of a
+        larger image that image was downscaled from.
+        """
         
         # Run inference
-        results = self.model(image_path, conf=conf_threshold)
+        with self._inference_lock:
+            results = self.model(image if image is not None else image_path, conf=conf_threshold)
+            embedding = self._pooled_embedding() if self.extract_embeddings else None
         
         detections = []
         
@@ -44,7 +97,7 @@ class YOLODamageDetector:
             
             for box in boxes:
                 # Extract detection info
-                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy()
+                x1, y1, x2, y2 = box.xyxy[0].cpu().numpy() * scale
                 confidence = float(box.conf[0])
                 class_id = int(box.cls[0])
                 class_name = self.model.names[class_id]
@@ -59,16 +112,17 @@ class YOLODamageDetector:
                 
                 detections.append(detection)
         
-        return detections
+        return detections, embedding
     
     def generate_annotated_image(self, 
                                  image_path: str, 
                                  detections: List[Dict[str, Any]], 
-                                 output_path: str) -> str:
-        """Generate image with bounding boxes and labels"""
+                                 output_path: str,
+                                 image: Optional[np.ndarray] = None) -> str:
+        """Generate image with bounding boxes and labels (on a copy of image, if given)"""
         
         # Load image
-        image = cv2.imread(image_path)
+        image = image.copy() if image is not None else cv2.imread(image_path)
         
         # Draw detections
         for det in detections:
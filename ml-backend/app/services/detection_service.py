@@ -1,79 +1,176 @@
 from app.models.yolo_detector import YOLODamageDetector
 from app.models.llava_analyzer import LLaVADamageAnalyzer
 from app.models.fraud_detector import FraudDetector
-from typing import Dict, Any
+from app.utils.image_bundle import ImageBundle
+from app.utils.stage_executor import StageExecutor
+from typing import Dict, Any, List, Optional, Tuple
+import asyncio
 import os
+import numpy as np
 
 class DetectionService:
-    def __init__(self):
+    def __init__(self, executor: Optional[StageExecutor] = None):
+        # YOLO and the header checks run here, off the event loop (the Ollama calls are async)
+        self.executor = executor or StageExecutor()
         self.yolo_detector = YOLODamageDetector()
         # Initialize with Ollama LLaVA 13B
         self.llava_analyzer = LLaVADamageAnalyzer(
             model_name="llava:13b",
-            ollama_host="http://localhost:11434"
+            ollama_host="http://localhost:11434",
+            executor=self.executor
         )
         # Initialize fraud detector - will auto-detect Qdrant from environment
         # Set USE_QDRANT=true in environment to enable Qdrant
-        self.fraud_detector = FraudDetector()
+        self.fraud_detector = FraudDetector(executor=self.executor)
+        
+        # Claims whose ELA tamper score reaches this skip LLaVA and go to manual review (0 = never)
+        self.ela_gate_score = float(os.getenv("ELA_GATE_SCORE", "0"))
     
     async def complete_claim_analysis(self, 
-                                       image_path: str, 
+                                       image_path: Optional[str], 
                                        job_id: str,
                                        claim_description: str,
                                        metadata: Dict[str, Any],
-                                       validation_result: Dict[str, Any]) -> Dict[str, Any]:
-        """Complete end-to-end claim analysis with fraud detection"""
+                                       validation_result: Dict[str, Any],
+                                       policy_id: str = "",
+                                       claim_location: str = "",
+                                       original_path: str = "",
+                                       tamper_screen: Optional[Dict[str, Any]] = None,
+                                       bundle: Optional[ImageBundle] = None) -> Dict[str, Any]:
+        """Complete end-to-end claim analysis with fraud detection
+        
+        With the preprocessing ImageBundle, no stage reads image_path (which may
+        then be None) and each takes the view sized for it: YOLO its 640 px
+        input (boxes come back in processed-image coordinates), the annotation
+        the processed array, LLaVA the compact VLM JPEG and the duplicate check
+        the processed JPEG bytes, and the header checks the uploaded bytes (so
+        original_path may be empty too).
+        """
         
         print(f"\n{'='*60}")
         print(f"Starting complete analysis for job {job_id}")
         print(f"{'='*60}")
         
-        # Step 1: YOLO Detection
-        print("\n[1/5] Running YOLO detection...")
-        detections = self.yolo_detector.detect_objects(image_path)
-        analysis = self.yolo_detector.analyze_damage_regions(detections)
+        # The stages form a graph, not a chain: YOLO, LLaVA (then the consistency
+        # check), the duplicate hashing and the header checks are independent and
+        # run concurrently in the stage pool; only the fraud scores wait for their
+        # inputs. Wall time follows the longest path. The stages only read: the
+        # claim's hashes and embedding go into the indexes once all of them succeeded.
+        async def yolo_stage():
+            print("\n[1/5] Running YOLO detection...")
+            result = await self.executor.run_thread(self._run_yolo, image_path, job_id, bundle)
+            print(f"✓ Detected {len(result[0])} objects")
+            return result
         
-        # Generate annotated image
-        annotated_path = f"data/uploads/annotated/{job_id}_annotated.jpg"
-        os.makedirs("data/uploads/annotated", exist_ok=True)
+        async def vlm_stage():
+            gated = bool(
+                tamper_screen and self.ela_gate_score > 0
+                and tamper_screen["tamper_score"] >= self.ela_gate_score
+            )
+            
+            if gated:
+                # Likely manipulated: skip the expensive VLM stages and leave it to a reviewer
+                print(f"\n[2-3/5] Skipping LLaVA: ELA tamper score {tamper_screen['tamper_score']}/10")
+                llava_analysis = self.llava_analyzer.empty_result("tamper_screen")
+                consistency_check = {
+                    "consistency_response": "Skipped: image failed the tamper screen",
+                    "consistency_score": 5.0,
+                    "is_consistent": False
+                }
+                return llava_analysis, consistency_check
+            
+            # Bundle views are encoded on first use: build this one in the pool, not on the event loop
+            image_base64 = await self.executor.run_thread(lambda: bundle.vlm_base64) if bundle else None
+            
+            if self.llava_analyzer.single_pass:
+                # Steps 2-3 in one generate request (LLAVA_SINGLE_PASS=true)
+                print("\n[2-3/5] Running LLaVA damage analysis and consistency check...")
+                llava_analysis, consistency_check = await self.llava_analyzer.analyze_claim_async(
+                    image_path,
+                    claim_description,
+                    metadata,
+                    image_base64=image_base64
+                )
+                print(f"✓ Severity: {llava_analysis['severity_level']}, Score: {llava_analysis['damage_score']}/10, "
+                      f"consistency score: {consistency_check['consistency_score']}/10")
+                return llava_analysis, consistency_check
+            
+            # Step 2: LLaVA Damage Analysis
+            print("\n[2/5] Running LLaVA damage analysis...")
+            llava_analysis = await self.llava_analyzer.analyze_damage_async(
+                image_path,
+                claim_description,
+                metadata,
+                image_base64=image_base64
+            )
+            print(f"✓ Severity: {llava_analysis['severity_level']}, Score: {llava_analysis['damage_score']}/10")
+            
+            # Step 3: Consistency Check (needs the damaged parts LLaVA found)
+            print("\n[3/5] Checking claim consistency...")
+            detected_parts_text = ", ".join(llava_analysis["parsed_analysis"].get("damaged_parts", []))
+            consistency_check = await self.llava_analyzer.check_consistency_async(
+                image_path,
+                claim_description,
+                detected_parts_text,
+                image_base64=image_base64
+            )
+            print(f"✓ Consistency score: {consistency_check['consistency_score']}/10")
+            return llava_analysis, consistency_check
         
-        self.yolo_detector.generate_annotated_image(
-            image_path,
-            detections,
-            annotated_path
-        )
-        print(f"✓ Detected {len(detections)} objects")
+        async def duplicate_stage():
+            # 4a. Duplicate check, read-only half: hashes (and tiles / ORB features if enabled)
+            image_bytes = await self.executor.run_thread(lambda: bundle.processed_jpeg) if bundle else None
+            return await self.fraud_detector.prepare_duplicate_check(
+                image_path,
+                policy_id=policy_id,
+                claim_location=claim_location,
+                original_path=original_path,
+                image_bytes=image_bytes,
+                original_bytes=bundle.data if bundle else None
+            )
         
-        # Step 2: LLaVA Damage Analysis
-        print("\n[2/5] Running LLaVA damage analysis...")
-        llava_analysis = self.llava_analyzer.analyze_damage(
-            image_path,
-            claim_description,
-            metadata
-        )
-        print(f"✓ Severity: {llava_analysis['severity_level']}, Score: {llava_analysis['damage_score']}/10")
-        
-        # Step 3: Consistency Check
-        print("\n[3/5] Checking claim consistency...")
-        detected_parts_text = ", ".join(llava_analysis["parsed_analysis"].get("damaged_parts", []))
-        consistency_check = self.llava_analyzer.check_consistency(
-            image_path,
-            claim_description,
-            detected_parts_text
-        )
-        print(f"✓ Consistency score: {consistency_check['consistency_score']}/10")
+        async def metadata_fraud_stage():
+            # 4b. Metadata fraud score, including the header-only JPEG fingerprint
+            # (of the uploaded file: the processed copy is always re-encoded)
+            jpeg_fingerprint = await self.executor.run_thread(
+                self.fraud_detector.analyze_jpeg_fingerprint,
+                original_path or image_path,
+                metadata,
+                data=bundle.data if bundle else None
+            )
+            metadata_fraud = self.fraud_detector.calculate_metadata_fraud_score(
+                metadata,
+                validation_result,
+                jpeg_fingerprint
+            )
+            return jpeg_fingerprint, metadata_fraud
         
-        # Step 4: Fraud Detection
         print("\n[4/5] Running fraud detection...")
+        stages = [
+            asyncio.ensure_future(stage())
+            for stage in (yolo_stage, vlm_stage, duplicate_stage, metadata_fraud_stage)
+        ]
+        try:
+            (
+                (detections, embedding, analysis, annotated_path),
+                (llava_analysis, consistency_check),
+                duplicate_prepared,
+                (jpeg_fingerprint, metadata_fraud)
+            ) = await asyncio.gather(*stages)
+        except BaseException:
+            # One stage failed (or the request was cancelled): stop the rest; nothing was stored
+            for stage in stages:
+                stage.cancel()
+            raise
         
-        # 4a. Duplicate check
-        duplicate_check = self.fraud_detector.check_duplicate(image_path, job_id)
-        
-        # 4b. Metadata fraud score
-        metadata_fraud = self.fraud_detector.calculate_metadata_fraud_score(
-            metadata,
-            validation_result
-        )
+        # 4a. Every stage succeeded: check-and-insert the claim's hashes, then
+        # 4a'. semantic near-duplicates from the YOLO backbone embedding (YOLO_EMBEDDINGS=true)
+        duplicate_check = await self.fraud_detector.record_duplicate_check(duplicate_prepared, job_id)
+        similar_claims = None
+        if embedding is not None:
+            similar_claims = await self.executor.run_thread(
+                self.fraud_detector.check_similar_embedding, embedding, job_id
+            )
         
         # 4c. Consistency fraud score
         consistency_fraud = self.fraud_detector.calculate_consistency_fraud_score(
@@ -105,6 +202,9 @@ class DetectionService:
             "consistency_check": consistency_check,
             "fraud_detection": {
                 "duplicate_check": duplicate_check,
+                "similar_claims": similar_claims,
+                "jpeg_fingerprint": jpeg_fingerprint,
+                "tamper_screen": tamper_screen,
                 "metadata_fraud": metadata_fraud,
                 "consistency_fraud": consistency_fraud,
                 "overall_fraud": overall_fraud
@@ -123,4 +223,28 @@ class DetectionService:
                 "fraud_score": overall_fraud["overall_fraud_score"],
                 "fraud_risk_level": overall_fraud["risk_level"]
             }
-        }
\ No newline at end of file
+        }
+    
+    def _run_yolo(self,
+                  image_path: Optional[str],
+                  job_id: str,
+                  bundle: Optional[ImageBundle]) -> Tuple[List[Dict[str, Any]], Optional[np.ndarray], Dict[str, Any], str]:
+        """YOLO detections, embedding and region analysis, and the annotated image (blocking)"""
+        detections, embedding = self.yolo_detector.detect_objects_with_embedding(
+            image_path,
+            image=bundle.yolo_input if bundle else None,
+            scale=bundle.yolo_scale if bundle else 1.0
+        )
+        analysis = self.yolo_detector.analyze_damage_regions(detections)
+        
+        # Generate annotated image
+        annotated_path = f"data/uploads/annotated/{job_id}_annotated.jpg"
+        os.makedirs("data/uploads/annotated", exist_ok=True)
+        
+        self.yolo_detector.generate_annotated_image(
+            image_path,
+            detections,
+            annotated_path,
+            image=bundle.processed_bgr if bundle else None
+        )
+        return detections, embedding, analysis, annotated_path
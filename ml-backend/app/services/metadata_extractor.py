@@ -2,10 +2,25 @@ import exifread
 from PIL import Image
 from PIL.ExifTags import TAGS, GPSTAGS
 from datetime import datetime
-from typing import Dict, Optional, Any
+from typing import Dict, Optional, Any, Union
+import io
 import os
+import struct
+
+from app.utils.jpeg_header import (
+    HeaderParseError, exifread_text, parse_exif, pil_text, rationals, read_jpeg_header
+)
 
 class MetadataExtractor:
+    # EXIF tag id -> metadata field, for the text tags read from IFD0 and the Exif IFD
+    TEXT_TAGS = {
+        271: "camera_make",
+        272: "camera_model",
+        305: "software",
+        306: "timestamp",
+        36867: "date_time_original"
+    }
+    
     def __init__(self):
         self.default_metadata = {
             "has_exif": False,
@@ -29,48 +44,126 @@ class MetadataExtractor:
             # Get file size
             metadata["file_size_mb"] = os.path.getsize(image_path) / (1024 * 1024)
             
-            # Open image with PIL for EXIF
-            with Image.open(image_path) as img:
-                metadata["image_width"] = img.width
-                metadata["image_height"] = img.height
-                
-                # Extract EXIF data
-                exif_data = img._getexif()
-                
-                if exif_data:
-                    metadata["has_exif"] = True
-                    
-                    for tag_id, value in exif_data.items():
-                        tag = TAGS.get(tag_id, tag_id)
-                        
-                        if tag == "Make":
-                            metadata["camera_make"] = str(value)
-                        elif tag == "Model":
-                            metadata["camera_model"] = str(value)
-                        elif tag == "Software":
-                            metadata["software"] = str(value)
-                        elif tag == "DateTime":
-                            metadata["timestamp"] = str(value)
-                        elif tag == "DateTimeOriginal":
-                            metadata["date_time_original"] = str(value)
-                        elif tag == "GPSInfo":
-                            gps_data = self._parse_gps(value)
-                            metadata.update(gps_data)
+            # Fast path: read only the JPEG markers and the Exif segment
+            try:
+                with open(image_path, 'rb') as f:
+                    metadata.update(self._read_jpeg_header(f))
+                return metadata
+            except (HeaderParseError, struct.error):
+                # Not a JPEG, or a header layout the full readers should interpret
+                pass
             
-            # Additional extraction using exifread for more details
-            with open(image_path, 'rb') as f:
-                tags = exifread.process_file(f, details=False)
-                
-                # Check for editing software
-                if 'Image Software' in tags:
-                    metadata["software"] = str(tags['Image Software'])
+            return self._extract_with_readers(image_path, metadata)
             
+        except Exception as e:
+            print(f"Error extracting metadata: {e}")
             return metadata
+    
+    def extract_metadata_from_bytes(self, data: bytes, header: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """extract_metadata for a file held in memory
+        
+        header is the result of parse_header if it already ran on the first
+        bytes of the upload.
+        """
+        metadata = self.default_metadata.copy()
+        
+        try:
+            metadata["file_size_mb"] = len(data) / (1024 * 1024)
+            
+            if header is None:
+                header = self.parse_header(data)
+            if header is not None:
+                metadata.update(header)
+                return metadata
+            
+            return self._extract_with_readers(data, metadata)
             
         except Exception as e:
             print(f"Error extracting metadata: {e}")
             return metadata
     
+    def parse_header(self, data: bytes) -> Optional[Dict[str, Any]]:
+        """Header fields of a JPEG from its first bytes (None until every marker before the scan is in)"""
+        try:
+            return self._read_jpeg_header(io.BytesIO(data))
+        except (HeaderParseError, struct.error):
+            return None
+    
+    def _read_jpeg_header(self, f) -> Dict[str, Any]:
+        """Same fields as _extract_with_readers, from a single pass over the JPEG header"""
+        width, height, payload = read_jpeg_header(f)
+        fields: Dict[str, Any] = {"image_width": width, "image_height": height}
+        if payload is None:
+            return fields
+        
+        endian, ifd0, exif_ifd, gps_ifd = parse_exif(payload)
+        merged = {**ifd0, **exif_ifd}
+        if merged:
+            fields["has_exif"] = True
+        
+        for tag_id, key in self.TEXT_TAGS.items():
+            if tag_id in merged:
+                fields[key] = pil_text(merged[tag_id])
+        
+        if gps_ifd is not None:
+            gps_info = {}
+            for tag_id in (1, 3):  # GPSLatitudeRef, GPSLongitudeRef
+                if tag_id in gps_ifd:
+                    gps_info[tag_id] = pil_text(gps_ifd[tag_id])
+            for tag_id in (2, 4):  # GPSLatitude, GPSLongitude
+                if tag_id in gps_ifd:
+                    gps_info[tag_id] = rationals(gps_ifd[tag_id], endian)
+            fields.update(self._parse_gps(gps_info))
+        
+        # exifread's reading of Image Software takes precedence, as in _extract_with_readers
+        if 305 in ifd0:
+            fields["software"] = exifread_text(ifd0[305])
+        
+        return fields
+    
+    def _extract_with_readers(self, image: Union[str, bytes], metadata: Dict[str, Any]) -> Dict[str, Any]:
+        """Extract metadata with PIL and exifread (any format PIL can open), from a path or the file's bytes"""
+        def open_file():
+            return io.BytesIO(image) if isinstance(image, bytes) else open(image, 'rb')
+        
+        # Open image with PIL for EXIF
+        with open_file() as f, Image.open(f) as img:
+            metadata["image_width"] = img.width
+            metadata["image_height"] = img.height
+            
+            # Extract EXIF data
+            exif_data = img._getexif()
+            
+            if exif_data:
+                metadata["has_exif"] = True
+                
+                for tag_id, value in exif_data.items():
+                    tag = TAGS.get(tag_id, tag_id)
+                    
+                    if tag == "Make":
+                        metadata["camera_make"] = str(value)
+                    elif tag == "Model":
+                        metadata["camera_model"] = str(value)
+                    elif tag == "Software":
+                        metadata["software"] = str(value)
+                    elif tag == "DateTime":
+                        metadata["timestamp"] = str(value)
+                    elif tag == "DateTimeOriginal":
+                        metadata["date_time_original"] = str(value)
+                    elif tag == "GPSInfo":
+                        gps_data = self._parse_gps(value)
+                        metadata.update(gps_data)
+        
+        # Additional extraction using exifread for more details
+        with open_file() as f:
+            tags = exifread.process_file(f, details=False)
+            
+            # Check for editing software
+            if 'Image Software' in tags:
+                metadata["software"] = str(tags['Image Software'])
+        
+        return metadata
+    
     def _parse_gps(self, gps_info: Dict) -> Dict[str, Optional[float]]:
         """Parse GPS coordinates from EXIF"""
         gps_data = {
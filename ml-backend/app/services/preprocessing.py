@@ -1,31 +1,70 @@
+from app.utils.image_bundle import VLM_IMAGE_SIZE, VLM_JPEG_QUALITY, ImageBundle
 from app.utils.image_utils import ImageProcessor
+from app.utils.stage_executor import StageExecutor
 from app.services.metadata_extractor import MetadataExtractor
 import os
 import uuid
-from typing import Dict, Any
+from typing import Dict, Any, Optional, Tuple
 import shutil
 
 class PreprocessingService:
-    def __init__(self, upload_dir: str = "data/uploads"):
+    def __init__(self, upload_dir: str = "data/uploads", executor: Optional[StageExecutor] = None):
         self.upload_dir = upload_dir
-        self.image_processor = ImageProcessor()
+        # Decoding, resizing, ELA and the writes run here, off the event loop
+        self.executor = executor or StageExecutor()
+        # Oversized JPEGs decode straight at 1/2, 1/4 or 1/8 scale (still >= 1024 px)
+        self.image_processor = ImageProcessor(
+            reduced_decode=os.getenv("REDUCED_DECODE", "true").lower() == "true"
+        )
         self.metadata_extractor = MetadataExtractor()
         
+        # The processed JPEG only needs to exist on disk for tools outside the pipeline;
+        # every stage reads the in-memory ImageBundle
+        self.write_processed = os.getenv("WRITE_PROCESSED_IMAGES", "true").lower() == "true"
+        # The ELA heatmap is a debugging aid (nothing serves it): only written on request
+        self.write_ela_heatmaps = os.getenv("WRITE_ELA_HEATMAPS", "false").lower() == "true"
+        
+        # Long side and quality of the JPEG sent to the VLM (its native input resolution)
+        self.vlm_image_size = int(os.getenv("VLM_IMAGE_SIZE", str(VLM_IMAGE_SIZE)))
+        self.vlm_jpeg_quality = int(os.getenv("VLM_JPEG_QUALITY", str(VLM_JPEG_QUALITY)))
+        
         # Create directories
         os.makedirs(upload_dir, exist_ok=True)
         os.makedirs(f"{upload_dir}/processed", exist_ok=True)
+        if self.write_ela_heatmaps:
+            os.makedirs(f"{upload_dir}/ela", exist_ok=True)
+        os.makedirs(f"{upload_dir}/thumbnails", exist_ok=True)
     
     async def process_claim_image(self, 
-                                  image_path: str, 
+                                  image_path: Optional[str], 
                                   claim_date: str,
-                                  claim_description: str) -> Dict[str, Any]:
-        """Complete preprocessing pipeline for a claim image"""
+                                  claim_description: str,
+                                  image_bytes: Optional[bytes] = None,
+                                  header: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Complete preprocessing pipeline for a claim image
+        
+        image_bytes is the upload held in memory (image_path is then only
+        reported, and may be None); header is MetadataExtractor.parse_header's
+        result if the EXIF was already parsed while the upload arrived.
+        """
         
         # Generate unique ID for this processing job
         job_id = str(uuid.uuid4())
         
-        # Step 1: Extract metadata
-        metadata = self.metadata_extractor.extract_metadata(image_path)
+        # The only read of the upload, unless it arrived in memory
+        if image_bytes is None:
+            image_bytes = await self.executor.run_thread(self._read_file, image_path)
+        
+        # Step 1: Extract metadata (a parsed JPEG header is only copied; other
+        # formats go through PIL and exifread, pure Python, in a worker process)
+        if header is None:
+            header = self.metadata_extractor.parse_header(image_bytes)
+        if header is not None:
+            metadata = self.metadata_extractor.extract_metadata_from_bytes(image_bytes, header)
+        else:
+            metadata = await self.executor.run_process(
+                self.metadata_extractor.extract_metadata_from_bytes, image_bytes
+            )
         
         # Step 2: Validate metadata
         validation = self.metadata_extractor.validate_metadata(
@@ -33,19 +72,10 @@ class PreprocessingService:
             claim_date
         )
         
-        # Step 3: Load and process image
-        image = self.image_processor.load_image(image_path)
-        
-        # Step 4: Resize image
-        resized_image = self.image_processor.resize_image(image)
-        
-        # Step 5: Optional privacy protection
-        # processed_image = self.image_processor.blur_faces_plates(resized_image)
-        processed_image = resized_image  # Skip for prototype
-        
-        # Step 6: Save processed image
-        processed_path = f"{self.upload_dir}/processed/{job_id}.jpg"
-        self.image_processor.save_image(processed_image, processed_path)
+        # Steps 3-6: Decode, resize, tamper screen and bundle
+        bundle, tamper_screen, processed_path, thumbnail_path = await self.executor.run_thread(
+            self._process_image, job_id, image_bytes, image_path
+        )
         
         # Step 7: Create structured prompt for VLM
         prompt = self._create_vlm_prompt(claim_description, metadata)
@@ -54,15 +84,70 @@ class PreprocessingService:
             "job_id": job_id,
             "original_path": image_path,
             "processed_path": processed_path,
+            "thumbnail_path": thumbnail_path,
+            "bundle": bundle,
             "metadata": metadata,
             "validation": validation,
+            "tamper_screen": tamper_screen,
             "prompt": prompt,
             "image_dimensions": {
-                "width": resized_image.shape[1],
-                "height": resized_image.shape[0]
+                "width": bundle.width,
+                "height": bundle.height
             }
         }
     
+    @staticmethod
+    def _read_file(path: str) -> bytes:
+        with open(path, "rb") as f:
+            return f.read()
+    
+    def _process_image(self,
+                       job_id: str,
+                       image_bytes: bytes,
+                       image_path: Optional[str]) -> Tuple[ImageBundle, Dict[str, Any], Optional[str], str]:
+        """Decode and resize the upload, screen it with ELA and write the processed files (blocking)"""
+        
+        # Step 3: Decode the image (the only decode of the upload)
+        image = self.image_processor.decode_image(image_bytes)
+        
+        # Step 4: Resize image
+        resized_image = self.image_processor.resize_image(image)
+        
+        # Step 4b: Error level analysis tamper screen (cheap gate before the VLM)
+        tamper_screen = self.image_processor.error_level_analysis(resized_image)
+        heatmap = tamper_screen.pop("heatmap")
+        heatmap_path = None
+        if self.write_ela_heatmaps:
+            heatmap_path = f"{self.upload_dir}/ela/{job_id}_ela.png"
+            self.image_processor.save_heatmap(
+                heatmap,
+                heatmap_path,
+                (resized_image.shape[1], resized_image.shape[0])
+            )
+        tamper_screen["heatmap_path"] = heatmap_path
+        
+        # Step 5: Optional privacy protection
+        # processed_image = self.image_processor.blur_faces_plates(resized_image)
+        processed_image = resized_image  # Skip for prototype
+        
+        # Step 6: Bundle the decoded views for the detection stages; optionally save to disk
+        bundle = ImageBundle(
+            image_bytes, image, processed_image,
+            path=image_path or "",
+            vlm_size=self.vlm_image_size,
+            vlm_quality=self.vlm_jpeg_quality
+        )
+        processed_path = None
+        if self.write_processed:
+            processed_path = f"{self.upload_dir}/processed/{job_id}.jpg"
+            bundle.write_processed(processed_path)
+        
+        # Small preview for the claims UI
+        thumbnail_path = f"{self.upload_dir}/thumbnails/{job_id}.jpg"
+        bundle.write_ui_thumbnail(thumbnail_path)
+        
+        return bundle, tamper_screen, processed_path, thumbnail_path
+    
     def _create_vlm_prompt(self, claim_description: str, metadata: Dict) -> str:
         """Create structured prompt for Vision-Language Model"""
         prompt = f"""You are an expert insurance claim assessor analyzing damage from submitted photos.
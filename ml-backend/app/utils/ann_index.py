@@ -0,0 +1,206 @@
+import numpy as np
+from typing import Optional, Tuple
+
+
+def nearest_centroids(vectors: np.ndarray, centroids: np.ndarray, chunk_size: int = 16384) -> np.ndarray:
+    """Index of the closest centroid (squared L2) for every row"""
+    centroid_norms = (centroids * centroids).sum(axis=1)
+    labels = np.empty(len(vectors), dtype=np.int64)
+    for start in range(0, len(vectors), chunk_size):
+        chunk = np.asarray(vectors[start:start + chunk_size], dtype=np.float32)
+        # ||x||^2 is the same for every centroid, so it can be left out of the argmin
+        labels[start:start + len(chunk)] = np.argmin(centroid_norms - 2 * chunk @ centroids.T, axis=1)
+    return labels
+
+
+def kmeans(vectors: np.ndarray, k: int, iterations: int = 15, seed: int = 0) -> np.ndarray:
+    """Lloyd's k-means; empty clusters are reseeded from random vectors"""
+    rng = np.random.default_rng(seed)
+    vectors = np.asarray(vectors, dtype=np.float32)
+    centroids = vectors[rng.choice(len(vectors), k, replace=len(vectors) < k)].copy()
+
+    for _ in range(iterations):
+        labels = nearest_centroids(vectors, centroids)
+        order = np.argsort(labels, kind="stable")
+        counts = np.bincount(labels, minlength=k)
+        present = np.flatnonzero(counts)
+
+        # Sum each cluster's members with one reduceat over the label-sorted rows
+        sums = np.add.reduceat(vectors[order], np.concatenate(([0], np.cumsum(counts)[:-1]))[present], axis=0)
+        centroids[present] = sums / counts[present, None]
+
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centroids[empty] = vectors[rng.choice(len(vectors), len(empty))]
+
+    return centroids
+
+
+class IVFPQIndex:
+    """Inverted-file index with product-quantized residuals (IVF-PQ)
+
+    Each vector goes to the list of its nearest of `nlist` coarse centroids.
+    The residual to that centroid is split into `m` subvectors, each stored
+    as the 1-byte id of its nearest codeword, so a vector costs m bytes. A
+    query only scans the `nprobe` closest lists and scores their codes with
+    per-subspace lookup tables (asymmetric distance), so search cost grows
+    with nprobe / nlist of the collection rather than all of it.
+
+    Positions are assigned in insertion order, like MultiIndexHashIndex;
+    recent additions are scanned linearly until merged into the lists.
+    """
+
+    def __init__(self, dim: int, nlist: int = 1024, m: int = 16, nprobe: int = 32, max_pending: int = 4096):
+        if dim % m != 0:
+            raise ValueError("m must divide the vector dimension")
+
+        self.dim = dim
+        self.nlist = nlist
+        self.m = m
+        self.nprobe = nprobe
+        self.max_pending = max_pending
+
+        self.centroids: Optional[np.ndarray] = None
+        self.codebooks: Optional[np.ndarray] = None
+
+        self._codes = np.empty((1024, m), dtype=np.uint8)
+        self._lists = np.empty(1024, dtype=np.int32)
+        self._size = 0
+        # Positions grouped by list (CSR) for the first _indexed vectors
+        self._order = np.empty(0, dtype=np.int64)
+        self._sorted_codes = np.empty((m, 0), dtype=np.uint8)
+        self._offsets = np.zeros(nlist + 1, dtype=np.int64)
+        self._indexed = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def is_trained(self) -> bool:
+        return self.codebooks is not None
+
+    def train(self, vectors: np.ndarray, iterations: int = 15, seed: int = 0) -> None:
+        """Fit the coarse centroids and the residual codebooks on a sample"""
+        vectors = np.asarray(vectors, dtype=np.float32)
+        self.nlist = min(self.nlist, len(vectors))
+        self.centroids = kmeans(vectors, self.nlist, iterations, seed)
+
+        residuals = vectors - self.centroids[nearest_centroids(vectors, self.centroids)]
+        subvectors = residuals.reshape(len(vectors), self.m, -1)
+        self.codebooks = np.stack([
+            kmeans(subvectors[:, j], 256, iterations, seed + j + 1) for j in range(self.m)
+        ])
+        self._offsets = np.zeros(self.nlist + 1, dtype=np.int64)
+
+    def add(self, vectors: np.ndarray) -> np.ndarray:
+        """Encode and add vectors; returns their positions"""
+        if not self.is_trained:
+            raise RuntimeError("IVFPQIndex must be trained before adding vectors")
+
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        lists, codes = self._encode(vectors)
+
+        needed = self._size + len(vectors)
+        if needed > len(self._lists):
+            capacity = max(needed, len(self._lists) * 2)
+            self._codes = np.resize(self._codes, (capacity, self.m))
+            self._lists = np.resize(self._lists, capacity)
+
+        positions = np.arange(self._size, needed)
+        self._codes[positions] = codes
+        self._lists[positions] = lists
+        self._size = needed
+
+        if self._size - self._indexed >= self.max_pending:
+            self._merge_pending()
+        return positions
+
+    def search(self, query: np.ndarray, k: int = 10, nprobe: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(positions, approximate squared L2 distances) of the k nearest stored vectors"""
+        if not self._size:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+
+        query = np.asarray(query, dtype=np.float32).ravel()
+        nprobe = min(nprobe or self.nprobe, self.nlist)
+        coarse = ((self.centroids - query) ** 2).sum(axis=1)
+        probed = np.argpartition(coarse, nprobe - 1)[:nprobe] if nprobe < self.nlist else np.arange(self.nlist)
+
+        # Lookup tables: distance from each probed residual subvector to every codeword
+        residuals = (query - self.centroids[probed]).reshape(nprobe, self.m, -1)
+        tables = (
+            (residuals ** 2).sum(axis=2)[:, :, None]
+            - 2 * np.einsum("pjd,jkd->pjk", residuals, self.codebooks)
+            + (self.codebooks ** 2).sum(axis=2)[None]
+        ).astype(np.float32)
+
+        # Score each probed list from its contiguous run of list-sorted, subspace-major codes
+        positions, distances = [], []
+        for probe, (start, end) in enumerate(zip(self._offsets[probed].tolist(), self._offsets[probed + 1].tolist())):
+            if end > start:
+                positions.append(self._order[start:end])
+                distances.append(self._score(tables[probe], self._sorted_codes[:, start:end]))
+
+        if self._indexed < self._size:
+            pending = np.arange(self._indexed, self._size)
+            slot = np.full(self.nlist, -1)
+            slot[probed] = np.arange(nprobe)
+            pending_probes = slot[self._lists[pending]]
+            for probe in np.unique(pending_probes[pending_probes >= 0]).tolist():
+                members = pending[pending_probes == probe]
+                positions.append(members)
+                distances.append(self._score(tables[probe], self._codes[members].T))
+
+        if not positions:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float32)
+        positions, distances = np.concatenate(positions), np.concatenate(distances)
+
+        k = min(k, len(positions))
+        top = np.argpartition(distances, k - 1)[:k]
+        top = top[np.argsort(distances[top], kind="stable")]
+        return positions[top], distances[top]
+
+    def save(self, path: str) -> None:
+        """Write codebooks and codes to an .npz file"""
+        np.savez(
+            path,
+            centroids=self.centroids,
+            codebooks=self.codebooks,
+            codes=self._codes[:self._size],
+            lists=self._lists[:self._size],
+            nprobe=self.nprobe
+        )
+
+    @classmethod
+    def load(cls, path: str, max_pending: int = 4096) -> "IVFPQIndex":
+        with np.load(path) as saved:
+            centroids, codebooks = saved["centroids"], saved["codebooks"]
+            index = cls(centroids.shape[1], len(centroids), len(codebooks), int(saved["nprobe"]), max_pending)
+            index.centroids, index.codebooks = centroids, codebooks
+            index._codes = np.array(saved["codes"])
+            index._lists = np.array(saved["lists"])
+        index._size = len(index._lists)
+        index._merge_pending()
+        return index
+
+    def _score(self, table: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """Sum of per-subspace table entries for (m, n) codes"""
+        distances = table[0].take(codes[0])
+        for j in range(1, self.m):
+            distances += table[j].take(codes[j])
+        return distances
+
+    def _encode(self, vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        lists = nearest_centroids(vectors, self.centroids)
+        subvectors = (vectors - self.centroids[lists]).reshape(len(vectors), self.m, -1)
+        codes = np.empty((len(vectors), self.m), dtype=np.uint8)
+        for j in range(self.m):
+            codes[:, j] = nearest_centroids(subvectors[:, j], self.codebooks[j])
+        return lists.astype(np.int32), codes
+
+    def _merge_pending(self) -> None:
+        """Regroup all positions by list"""
+        lists = self._lists[:self._size]
+        self._order = np.argsort(lists, kind="stable")
+        self._sorted_codes = np.ascontiguousarray(self._codes[self._order].T)
+        self._offsets = np.concatenate(([0], np.cumsum(np.bincount(lists, minlength=self.nlist))))
+        self._indexed = self._size
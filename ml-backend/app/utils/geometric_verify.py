@@ -0,0 +1,137 @@
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+# Images are downscaled to this long side before ORB; more pixels add time, not matches
+MAX_SIDE = 1024
+
+# FLANN index for binary descriptors (locality-sensitive hashing)
+FLANN_INDEX_LSH = 6
+
+Features = Tuple[np.ndarray, np.ndarray]
+
+
+class OrbVerifier:
+    """Confirms a duplicate candidate by geometry, not appearance
+
+    Two photos of different cars of the same model can share perceptual
+    hashes, but they do not share hundreds of keypoints arranged by one
+    projective transform. ORB descriptors are matched with FLANN LSH and
+    Lowe's ratio test, and a RANSAC homography counts the matches that agree
+    on one geometry; enough inliers confirm a reuse of the same photo
+    (including crops, rescales and recompression).
+    """
+
+    def __init__(self,
+                 max_features: int = 500,
+                 ratio: float = 0.75,
+                 min_inliers: int = 15,
+                 ransac_threshold: float = 5.0):
+        import cv2
+
+        self.min_inliers = min_inliers
+        self.ratio = ratio
+        self.ransac_threshold = ransac_threshold
+        self._orb = cv2.ORB_create(nfeatures=max_features)
+        self._matcher = cv2.FlannBasedMatcher(
+            dict(algorithm=FLANN_INDEX_LSH, table_number=6, key_size=12, multi_probe_level=1),
+            dict(checks=32)
+        )
+        # cv2 detectors and matchers are not safe to share between threads
+        self._lock = threading.Lock()
+
+    def describe(self, image) -> Features:
+        """(keypoint coordinates N x 2, ORB descriptors N x 32) for a PIL image or array"""
+        import cv2
+
+        if not isinstance(image, np.ndarray):
+            image = np.asarray(image.convert("L"))
+        elif image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        scale = MAX_SIDE / max(image.shape)
+        if scale < 1:
+            image = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+
+        with self._lock:
+            keypoints, descriptors = self._orb.detectAndCompute(image, None)
+
+        if descriptors is None:
+            return np.empty((0, 2), dtype=np.float32), np.empty((0, 32), dtype=np.uint8)
+        return np.array([keypoint.pt for keypoint in keypoints], dtype=np.float32), descriptors
+
+    def verify(self, query: Features, stored: Features) -> Dict[str, Any]:
+        """Ratio-test matches and RANSAC homography inliers between two feature sets"""
+        import cv2
+
+        query_points, query_descriptors = query
+        stored_points, stored_descriptors = stored
+        result = {"matches": 0, "inliers": 0, "verified": False}
+        if len(query_descriptors) < 2 or len(stored_descriptors) < 2:
+            return result
+
+        with self._lock:
+            pairs = self._matcher.knnMatch(query_descriptors, stored_descriptors, k=2)
+
+        # LSH can return fewer than two neighbours for a descriptor
+        good = [pair[0] for pair in pairs if len(pair) == 2 and pair[0].distance < self.ratio * pair[1].distance]
+        result["matches"] = len(good)
+        if len(good) < max(4, self.min_inliers):
+            return result
+
+        source = query_points[[match.queryIdx for match in good]]
+        target = stored_points[[match.trainIdx for match in good]]
+        # USAC (OpenCV's newer RANSAC) stops early on low inlier ratios, where classic
+        # RANSAC runs all 2000 iterations (~40 ms) before rejecting a lookalike
+        _, mask = cv2.findHomography(source, target, getattr(cv2, "USAC_DEFAULT", cv2.RANSAC),
+                                     self.ransac_threshold)
+        if mask is not None:
+            result["inliers"] = int(mask.sum())
+            result["verified"] = result["inliers"] >= self.min_inliers
+        return result
+
+
+class FeatureCache:
+    """ORB features per stored image: .npz files plus an in-memory LRU"""
+
+    def __init__(self, directory: str, max_entries: int = 2048):
+        self.directory = directory
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, Features]" = OrderedDict()
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def get(self, key: str) -> Optional[Features]:
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+
+        with np.load(path) as saved:
+            features = (saved["points"], saved["descriptors"])
+        self._remember(key, features)
+        return features
+
+    def put(self, key: str, features: Features) -> None:
+        # Write beside the target and rename, so readers never see half a file
+        temp_path = f"{self._path(key)}.tmp.npz"
+        np.savez(temp_path, points=features[0], descriptors=features[1])
+        os.replace(temp_path, self._path(key))
+        self._remember(key, features)
+
+    def _remember(self, key: str, features: Features) -> None:
+        with self._lock:
+            self._entries[key] = features
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.npz")
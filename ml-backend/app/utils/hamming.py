@@ -0,0 +1,148 @@
+import numpy as np
+from typing import Iterable, List, Sequence, Tuple
+
+HASH_FIELDS = ("phash", "dhash", "whash", "average_hash")
+
+# SWAR popcount constants for numpy builds without np.bitwise_count (< 2.0)
+_M1 = np.uint64(0x5555555555555555)
+_M2 = np.uint64(0x3333333333333333)
+_M4 = np.uint64(0x0F0F0F0F0F0F0F0F)
+_H01 = np.uint64(0x0101010101010101)
+
+# Lowest bit of every hex digit (4-bit nibble)
+_NIBBLE_LOW = np.uint64(0x1111111111111111)
+
+
+def popcount64(values: np.ndarray) -> np.ndarray:
+    """Number of set bits in each uint64 element"""
+    values = np.asarray(values, dtype=np.uint64)
+
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(values)
+
+    x = values - ((values >> np.uint64(1)) & _M1)
+    x = (x & _M2) + ((x >> np.uint64(2)) & _M2)
+    x = (x + (x >> np.uint64(4))) & _M4
+    return ((x * _H01) >> np.uint64(56)).astype(np.uint8)
+
+
+def nibble_count64(values: np.ndarray) -> np.ndarray:
+    """Number of non-zero hex digits in each uint64 element"""
+    values = np.asarray(values, dtype=np.uint64)
+    folded = values | (values >> np.uint64(1))
+    folded |= folded >> np.uint64(2)
+    return popcount64(folded & _NIBBLE_LOW)
+
+
+# How a distance is counted from the XOR of two hashes: differing bits, or
+# differing hex digits (the character comparison of the hex strings)
+DISTANCE_COUNTS = {"bits": popcount64, "hex": nibble_count64}
+
+
+def hamming_distances(hashes: np.ndarray, query: int) -> np.ndarray:
+    """Bit distance between one query and every stored hash (XOR + popcount)"""
+    return popcount64(np.bitwise_xor(hashes, np.uint64(query)))
+
+
+def hash_distances(hashes: np.ndarray, query: int, metric: str = "bits") -> np.ndarray:
+    """Distance between one query and every stored hash in the given metric ("bits" or "hex")"""
+    return DISTANCE_COUNTS[metric](np.bitwise_xor(hashes, np.uint64(query)))
+
+
+def hex_to_uint64(hex_hashes: Iterable[str]) -> np.ndarray:
+    """Convert imagehash hex strings to packed uint64 values"""
+    return np.fromiter((int(h, 16) for h in hex_hashes), dtype=np.uint64)
+
+
+class PackedHashColumns:
+    """Growable uint64 matrix holding one contiguous column per hash type"""
+
+    def __init__(self, fields: Sequence[str] = HASH_FIELDS, capacity: int = 1024):
+        self.fields = tuple(fields)
+        self._field_index = {field: i for i, field in enumerate(self.fields)}
+        self._data = np.zeros((len(self.fields), max(capacity, 1)), dtype=np.uint64)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @classmethod
+    def from_records(cls, records: np.ndarray, fields: Sequence[str] = HASH_FIELDS) -> "PackedHashColumns":
+        """Copy the hash fields of a structured (e.g. memory-mapped) record array"""
+        columns = cls(fields, capacity=len(records))
+        for i, field in enumerate(columns.fields):
+            columns._data[i, :len(records)] = records[field]
+        columns._size = len(records)
+        return columns
+
+    def column(self, field: str) -> np.ndarray:
+        """Contiguous view over one hash type"""
+        return self._data[self._field_index[field], :self._size]
+
+    def append(self, values: Sequence[int]) -> int:
+        """Append one row (a value per field) and return its position"""
+        if self._size == self._data.shape[1]:
+            grown = np.zeros((len(self.fields), self._data.shape[1] * 2), dtype=np.uint64)
+            grown[:, :self._size] = self._data[:, :self._size]
+            self._data = grown
+
+        self._data[:, self._size] = np.array(values, dtype=np.uint64)
+        self._size += 1
+        return self._size - 1
+
+    def search(self, field: str, query: int, max_distance: int, metric: str = "bits") -> Tuple[np.ndarray, np.ndarray]:
+        """Linear scan of one column; returns (positions, distances) by position"""
+        return self.search_batch(field, [query], max_distance, metric=metric)[0]
+
+    def search_batch(self,
+                     field: str,
+                     queries: Sequence[int],
+                     max_distance: int,
+                     block_size: int = 1 << 16,
+                     metric: str = "bits") -> List[Tuple[np.ndarray, np.ndarray]]:
+        """Scan one column for many queries at once
+
+        The column is walked in cache-sized blocks and every query is scored
+        against a block while it is hot, reusing scratch buffers so the scan
+        never allocates per element. metric "hex" counts differing hex digits
+        instead of bits.
+        """
+        column = self.column(field)
+        queries = np.asarray(queries, dtype=np.uint64)
+
+        xor_buffer = np.empty(block_size, dtype=np.uint64)
+        shift_buffer = np.empty(block_size, dtype=np.uint64) if metric == "hex" else None
+        count_buffer = np.empty(block_size, dtype=np.uint8)
+        found_positions = [[] for _ in queries]
+        found_distances = [[] for _ in queries]
+
+        for start in range(0, len(column), block_size):
+            block = column[start:start + block_size]
+            xor = xor_buffer[:len(block)]
+            counts = count_buffer[:len(block)]
+
+            for query_id, query in enumerate(queries):
+                np.bitwise_xor(block, query, out=xor)
+                if shift_buffer is not None:
+                    # Fold each differing hex digit onto its lowest bit
+                    shifted = shift_buffer[:len(block)]
+                    np.right_shift(xor, np.uint64(1), out=shifted)
+                    np.bitwise_or(xor, shifted, out=xor)
+                    np.right_shift(xor, np.uint64(2), out=shifted)
+                    np.bitwise_or(xor, shifted, out=xor)
+                    np.bitwise_and(xor, _NIBBLE_LOW, out=xor)
+                if hasattr(np, "bitwise_count"):
+                    np.bitwise_count(xor, out=counts)
+                else:
+                    counts[:] = popcount64(xor)
+
+                hits = np.flatnonzero(counts <= max_distance)
+                if len(hits):
+                    found_positions[query_id].append(hits + start)
+                    found_distances[query_id].append(counts[hits])
+
+        return [
+            (np.concatenate(positions) if positions else np.empty(0, dtype=np.intp),
+             np.concatenate(distances) if distances else np.empty(0, dtype=np.uint8))
+            for positions, distances in zip(found_positions, found_distances)
+        ]
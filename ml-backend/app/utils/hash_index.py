@@ -0,0 +1,313 @@
+import numpy as np
+from itertools import combinations, product
+from typing import Dict, Iterable, List, Tuple
+from app.utils.hamming import DISTANCE_COUNTS
+
+class MultiIndexHashIndex:
+    """Multi-index hashing over 64-bit perceptual hashes
+
+    Each hash is split into `num_chunks` disjoint substrings. If two hashes are
+    within `r` bits of each other, at least one substring differs by at most
+    `r // num_chunks` bits (pigeonhole), so a radius query only has to probe the
+    buckets near the query's substrings and verify the candidates found there.
+
+    With metric "hex" distances count differing hex digits instead of bits;
+    the same pigeonhole argument holds per digit, so buckets are probed with
+    every substring that differs in at most `r // num_chunks` digits.
+
+    Positions are assigned in insertion order, so callers can keep a parallel
+    list of records and map search results straight back to them.
+    """
+
+    def __init__(self, num_chunks: int = 4, max_pending: int = 4096, metric: str = "bits"):
+        if 64 % num_chunks != 0:
+            raise ValueError("num_chunks must divide 64")
+        if metric not in DISTANCE_COUNTS:
+            raise ValueError(f"unknown metric: {metric}")
+        if metric == "hex" and (64 // num_chunks) % 4 != 0:
+            raise ValueError("hex chunks must hold whole hex digits")
+
+        self.num_chunks = num_chunks
+        self.chunk_bits = 64 // num_chunks
+        self.chunk_mask = (1 << self.chunk_bits) - 1
+        self.max_pending = max_pending
+        self.metric = metric
+        self._count = DISTANCE_COUNTS[metric]
+
+        # Indexed hashes plus one CSR table (order, offsets) per chunk
+        self._hashes = np.empty(0, dtype=np.uint64)
+        self._tables: List[Tuple[np.ndarray, np.ndarray]] = []
+        # Recently added hashes, scanned linearly until merged into the tables
+        self._pending: List[int] = []
+        self._probe_masks: Dict[int, np.ndarray] = {}
+
+        self.build([])
+
+    def __len__(self) -> int:
+        return len(self._hashes) + len(self._pending)
+
+    def build(self, hashes: Iterable[int]) -> None:
+        """Rebuild the index from scratch; positions follow iteration order"""
+        if isinstance(hashes, np.ndarray):
+            self._hashes = np.array(hashes, dtype=np.uint64)
+        else:
+            self._hashes = np.fromiter(hashes, dtype=np.uint64)
+        self._pending = []
+        self._tables = []
+
+        for chunk in range(self.num_chunks):
+            keys = self._chunk_keys(self._hashes, chunk)
+            order = np.argsort(keys, kind="stable").astype(np.uint32)
+            counts = np.bincount(keys, minlength=1 << self.chunk_bits)
+            offsets = np.concatenate(([0], np.cumsum(counts))).astype(np.int64)
+            self._tables.append((order, offsets))
+
+    def add(self, hash_value: int) -> int:
+        """Add a hash and return its position"""
+        position = len(self)
+        self._pending.append(hash_value)
+
+        if len(self._pending) >= self.max_pending:
+            self._merge_pending()
+
+        return position
+
+    def search(self, query: int, max_distance: int) -> List[Tuple[int, int]]:
+        """Return (position, distance) for every hash within max_distance, by position"""
+        if max_distance < 0:
+            return []
+
+        matches = []
+
+        if len(self._hashes):
+            chunk_radius = max_distance // self.num_chunks
+            if self._probes_exceed_scan(chunk_radius):
+                # Radius too wide for bucket probing to beat a vectorized scan
+                candidates = np.arange(len(self._hashes))
+            else:
+                candidates = self._candidates(query, chunk_radius)
+
+            distances = self._count(np.bitwise_xor(self._hashes[candidates], np.uint64(query)))
+            within = distances <= max_distance
+            matches.extend(zip(candidates[within].tolist(), distances[within].tolist()))
+
+        if self._pending:
+            distances = self._count(np.bitwise_xor(np.array(self._pending, dtype=np.uint64), np.uint64(query)))
+            base = len(self._hashes)
+            for offset in np.flatnonzero(distances <= max_distance).tolist():
+                matches.append((base + offset, int(distances[offset])))
+
+        return matches
+
+    def search_batch(self, queries: np.ndarray, max_distance: int) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Radius search for many queries at once
+
+        Returns flat (query_ids, positions, distances) arrays with one entry per
+        match. Candidates from all queries are verified in a single XOR +
+        count pass instead of one small pass per query.
+        """
+        queries = np.asarray(queries, dtype=np.uint64)
+        empty = (np.empty(0, dtype=np.intp), np.empty(0, dtype=np.intp), np.empty(0, dtype=np.uint8))
+        if max_distance < 0 or not len(queries):
+            return empty
+
+        query_ids = []
+        positions = []
+
+        if len(self._hashes):
+            chunk_radius = max_distance // self.num_chunks
+            if self._probes_exceed_scan(chunk_radius):
+                for query_id in range(len(queries)):
+                    positions.append(np.arange(len(self._hashes)))
+                    query_ids.append(np.full(len(self._hashes), query_id))
+            else:
+                masks = self._masks_for_radius(chunk_radius)
+                for chunk, (order, offsets) in enumerate(self._tables):
+                    keys = self._chunk_keys(queries, chunk)
+                    probes = np.bitwise_xor(keys[:, None], masks[None, :])
+                    starts = offsets[probes].ravel()
+                    lengths = offsets[probes + 1].ravel() - starts
+                    hit = lengths > 0
+                    if not hit.any():
+                        continue
+
+                    # Expand every non-empty bucket range into its member positions
+                    starts, lengths = starts[hit], lengths[hit]
+                    bucket_queries = np.repeat(np.arange(len(queries)), len(masks))[hit]
+                    run_starts = np.repeat(starts - np.cumsum(lengths) + lengths, lengths)
+                    positions.append(order[np.arange(lengths.sum()) + run_starts].astype(np.intp))
+                    query_ids.append(np.repeat(bucket_queries, lengths))
+
+        if self._pending:
+            pending = np.arange(len(self._hashes), len(self))
+            for query_id in range(len(queries)):
+                positions.append(pending)
+                query_ids.append(np.full(len(pending), query_id))
+
+        if not positions:
+            return empty
+
+        positions = np.concatenate(positions)
+        query_ids = np.concatenate(query_ids)
+
+        indexed = positions < len(self._hashes)
+        stored = np.empty(len(positions), dtype=np.uint64)
+        stored[indexed] = self._hashes[positions[indexed]]
+        if not indexed.all():
+            stored[~indexed] = np.array(self._pending, dtype=np.uint64)[positions[~indexed] - len(self._hashes)]
+
+        distances = self._count(np.bitwise_xor(stored, queries[query_ids]))
+        within = distances <= max_distance
+
+        # A hash can sit in the probed bucket of several chunks; keep each pair once
+        pair_keys, first = np.unique(query_ids[within] * len(self) + positions[within], return_index=True)
+        return pair_keys // len(self), pair_keys % len(self), distances[within][first]
+
+    def _probes_exceed_scan(self, chunk_radius: int) -> bool:
+        """True when probing would visit a quarter or more of all stored hashes"""
+        probes = len(self._masks_for_radius(chunk_radius)) * self.num_chunks
+        return probes * 4 >= (1 << self.chunk_bits)
+
+    def _candidates(self, query: int, chunk_radius: int) -> np.ndarray:
+        """Collect positions whose substring is within chunk_radius in any chunk"""
+        masks = self._masks_for_radius(chunk_radius)
+        buckets = []
+
+        for chunk, (order, offsets) in enumerate(self._tables):
+            query_key = (query >> (chunk * self.chunk_bits)) & self.chunk_mask
+            probes = np.bitwise_xor(masks, query_key)
+            starts = offsets[probes]
+            ends = offsets[probes + 1]
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                if end > start:
+                    buckets.append(order[start:end])
+
+        if not buckets:
+            return np.empty(0, dtype=np.uint32)
+
+        return np.unique(np.concatenate(buckets))
+
+    def _masks_for_radius(self, radius: int) -> np.ndarray:
+        """All chunk-width masks within `radius`: bits set, or non-zero hex digits"""
+        if self.metric == "hex":
+            radius = min(radius, self.chunk_bits // 4)
+        else:
+            radius = min(radius, self.chunk_bits)
+
+        if radius not in self._probe_masks:
+            masks = [0]
+            if self.metric == "hex":
+                for digits in range(1, radius + 1):
+                    for positions in combinations(range(self.chunk_bits // 4), digits):
+                        for values in product(range(1, 16), repeat=digits):
+                            masks.append(sum(value << (4 * p) for p, value in zip(positions, values)))
+            else:
+                for bits in range(1, radius + 1):
+                    for positions in combinations(range(self.chunk_bits), bits):
+                        masks.append(sum(1 << p for p in positions))
+            self._probe_masks[radius] = np.array(masks, dtype=np.int64)
+
+        return self._probe_masks[radius]
+
+    def _merge_pending(self) -> None:
+        """Fold pending hashes into the chunk tables without a full rebuild"""
+        if not self._pending:
+            return
+
+        new_hashes = np.array(self._pending, dtype=np.uint64)
+        new_positions = np.arange(
+            len(self._hashes), len(self._hashes) + len(new_hashes), dtype=np.uint32
+        )
+
+        tables = []
+        for chunk, (order, offsets) in enumerate(self._tables):
+            keys = self._chunk_keys(new_hashes, chunk)
+            key_order = np.argsort(keys, kind="stable")
+            keys = keys[key_order]
+
+            # Insert at the end of each bucket so positions stay ascending
+            order = np.insert(order, offsets[keys + 1], new_positions[key_order])
+            counts = np.bincount(keys, minlength=1 << self.chunk_bits)
+            offsets = offsets + np.concatenate(([0], np.cumsum(counts)))
+            tables.append((order, offsets))
+
+        self._tables = tables
+        self._hashes = np.concatenate((self._hashes, new_hashes))
+        self._pending = []
+
+    def _chunk_keys(self, hashes: np.ndarray, chunk: int) -> np.ndarray:
+        """Extract one substring of every hash as a bucket key"""
+        shift = np.uint64(chunk * self.chunk_bits)
+        return ((hashes >> shift) & np.uint64(self.chunk_mask)).astype(np.intp)
+
+
+class ExactHashIndex:
+    """Exact-match set over 64-bit keys (e.g. a SHA-256 prefix) mapping to positions
+
+    Keys are kept as a sorted uint64 array searched with binary search, plus a
+    small dict of recent additions merged in batches. A zero key means
+    "unknown" and is never indexed.
+    """
+
+    def __init__(self, max_pending: int = 4096):
+        self.max_pending = max_pending
+        self._keys = np.empty(0, dtype=np.uint64)
+        self._positions = np.empty(0, dtype=np.uint32)
+        self._pending: Dict[int, List[int]] = {}
+        self._pending_count = 0
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def build(self, keys: np.ndarray) -> None:
+        """Rebuild from a key per position (zero keys are skipped)"""
+        keys = np.asarray(keys, dtype=np.uint64)
+        positions = np.flatnonzero(keys).astype(np.uint32)
+        order = np.argsort(keys[positions], kind="stable")
+
+        self._keys = keys[positions][order]
+        self._positions = positions[order]
+        self._pending = {}
+        self._pending_count = 0
+        self._size = len(keys)
+
+    def add(self, key: int) -> int:
+        """Add the key for the next position and return that position"""
+        position = self._size
+        self._size += 1
+
+        if key:
+            self._pending.setdefault(key, []).append(position)
+            self._pending_count += 1
+            if self._pending_count >= self.max_pending:
+                self._merge_pending()
+
+        return position
+
+    def lookup(self, key: int) -> List[int]:
+        """Positions stored under key, ascending"""
+        if not key:
+            return []
+
+        start = np.searchsorted(self._keys, np.uint64(key), side="left")
+        end = np.searchsorted(self._keys, np.uint64(key), side="right")
+        return self._positions[start:end].tolist() + self._pending.get(key, [])
+
+    def _merge_pending(self) -> None:
+        keys = []
+        positions = []
+        for key, key_positions in self._pending.items():
+            keys.extend([key] * len(key_positions))
+            positions.extend(key_positions)
+
+        keys = np.array(keys, dtype=np.uint64)
+        positions = np.array(positions, dtype=np.uint32)
+        order = np.argsort(keys, kind="stable")
+
+        # Insert after equal keys so positions stay ascending within a key
+        insert_at = np.searchsorted(self._keys, keys[order], side="right")
+        self._keys = np.insert(self._keys, insert_at, keys[order])
+        self._positions = np.insert(self._positions, insert_at, positions[order])
+        self._pending = {}
+        self._pending_count = 0
@@ -0,0 +1,353 @@
+import numpy as np
+import json
+import os
+import struct
+import threading
+from typing import Any, Dict, List, Optional
+from app.utils.hamming import HASH_FIELDS
+
+# Fixed-size record layout; hashes are the 64-bit integers behind the hex strings.
+# sha256 is the raw content digest (all zeros when unknown, e.g. migrated records).
+RECORD_DTYPE = np.dtype([
+    ("phash", "<u8"),
+    ("dhash", "<u8"),
+    ("whash", "<u8"),
+    ("average_hash", "<u8"),
+    ("sha256", "u1", (32,)),
+    ("timestamp", "S32"),
+    ("job_id", "S64"),
+])
+
+# Version 1 logs predate the sha256 field and are upgraded on open
+RECORD_DTYPE_V1 = np.dtype([
+    ("phash", "<u8"),
+    ("dhash", "<u8"),
+    ("whash", "<u8"),
+    ("average_hash", "<u8"),
+    ("timestamp", "S32"),
+    ("job_id", "S64"),
+])
+
+# Header: magic, format version, record size
+MAGIC = b"CLMHASH\x00"
+FORMAT_VERSION = 2
+HEADER_FORMAT = "<8sII16x"
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+
+class HashLogStore:
+    """Append-only binary log of image hash records
+
+    Records are fixed-size and appended to the end of the file, so storing a
+    hash costs one small write regardless of history size. Reads go through a
+    read-only memory map that is refreshed lazily after appends. Compaction
+    rewrites the log keeping only the latest record per job_id.
+
+    With group_commit, appends are held in memory (and readable by position)
+    until sync() writes them all with a single write and fsync.
+
+    Subclasses can store other fixed-size records by overriding the class
+    attributes below together with _encode and _decode.
+    """
+
+    record_dtype = RECORD_DTYPE
+    magic = MAGIC
+    format_version = FORMAT_VERSION
+
+    def __init__(self,
+                 path: str,
+                 legacy_json_path: Optional[str] = None,
+                 compact_every: int = 100_000,
+                 group_commit: bool = False):
+        self.path = path
+        self.compact_every = compact_every
+        self.group_commit = group_commit
+        self._appends_since_compaction = 0
+        self._map = None
+        self._pending: List[np.ndarray] = []
+        self._lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        if not os.path.exists(path):
+            # Build the new log beside the target so a crash never leaves half a migration
+            temp_path = f"{path}.tmp"
+            self._write_header(temp_path)
+            migrated = legacy_json_path and os.path.exists(legacy_json_path) \
+                and self.migrate_json(legacy_json_path, temp_path)
+            os.replace(temp_path, path)
+            if migrated:
+                os.replace(legacy_json_path, f"{legacy_json_path}.migrated")
+
+        self._validate_header()
+        self._count = self._truncate_partial_record()
+
+    def __len__(self) -> int:
+        return self._count + len(self._pending)
+
+    @property
+    def pending_count(self) -> int:
+        """Appended records not yet written by sync()"""
+        return len(self._pending)
+
+    def records(self) -> np.ndarray:
+        """Memory-mapped, read-only view of all records written to disk"""
+        if self._map is None or len(self._map) != self._count:
+            if self._count == 0:
+                self._map = np.empty(0, dtype=self.record_dtype)
+            else:
+                self._map = np.memmap(self.path, dtype=self.record_dtype, mode="r",
+                                      offset=HEADER_SIZE, shape=(self._count,))
+        return self._map
+
+    def row(self, position: int):
+        """Raw record at a position, including appends still pending a sync"""
+        with self._lock:
+            if position >= self._count:
+                return self._pending[position - self._count][0]
+        return self.records()[position]
+
+    def get(self, position: int) -> Dict[str, Any]:
+        """Decode one record back into the JSON-style dict"""
+        return self._decode(self.row(position))
+
+    def append(self, record: Dict[str, Any]) -> int:
+        """Append one record and return its position"""
+        encoded = self._encode(record)
+
+        if self.group_commit:
+            with self._lock:
+                self._pending.append(encoded)
+                self._appends_since_compaction += 1
+                return self._count + len(self._pending) - 1
+
+        with open(self.path, "ab") as f:
+            f.write(encoded.tobytes())
+
+        position = self._count
+        self._count += 1
+        self._appends_since_compaction += 1
+        return position
+
+    def sync(self) -> int:
+        """Write all pending appends with one write and fsync; returns how many"""
+        with self._sync_lock:
+            with self._lock:
+                batch = list(self._pending)
+            if not batch:
+                return 0
+
+            with open(self.path, "ab") as f:
+                f.write(np.concatenate(batch).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+
+            # Records stay readable from memory until the file covers them
+            with self._lock:
+                del self._pending[:len(batch)]
+                self._count += len(batch)
+            return len(batch)
+
+    def should_compact(self) -> bool:
+        """True once enough records have been appended since the last compaction"""
+        return self._appends_since_compaction >= self.compact_every
+
+    def compact(self) -> bool:
+        """Rewrite the log keeping the latest record per job_id
+
+        Returns True when the file was rewritten (positions have changed).
+        Callers must not append concurrently.
+        """
+        self.sync()
+        self._appends_since_compaction = 0
+        records = self.records()
+        total = len(records)
+        if total == 0:
+            return False
+
+        # np.unique keeps the first occurrence, so search the reversed column
+        reversed_ids = records["job_id"][::-1]
+        _, first_in_reversed = np.unique(reversed_ids, return_index=True)
+        if len(first_in_reversed) == total:
+            return False
+
+        keep = np.sort(total - 1 - first_in_reversed)
+        live = np.array(records[keep])
+        # Release the map before replacing the file underneath it
+        del records, reversed_ids
+        self._map = None
+
+        temp_path = f"{self.path}.compact"
+        self._write_header(temp_path)
+        with open(temp_path, "ab") as f:
+            f.write(live.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, self.path)
+        self._count = len(live)
+        print(f"🗜️  Compacted hash log: {total} → {self._count} records")
+        return True
+
+    def migrate_json(self, json_path: str, target_path: str) -> int:
+        """One-time import of the legacy image_hashes.json list into target_path"""
+        try:
+            with open(json_path, "r") as f:
+                stored_hashes = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"⚠️  Could not read legacy hash file {json_path}: {e}")
+            return 0
+
+        encoded = np.concatenate([self._encode(stored) for stored in stored_hashes]) \
+            if stored_hashes else np.empty(0, dtype=self.record_dtype)
+
+        with open(target_path, "ab") as f:
+            f.write(encoded.tobytes())
+
+        print(f"📦 Migrated {len(stored_hashes)} hash records from {json_path}")
+        return len(stored_hashes)
+
+    def _encode(self, record: Dict[str, Any]) -> np.ndarray:
+        encoded = np.zeros(1, dtype=self.record_dtype)
+        for field in HASH_FIELDS:
+            encoded[field] = int(record[field], 16)
+        if record.get("sha256"):
+            encoded["sha256"] = np.frombuffer(bytes.fromhex(record["sha256"]), dtype=np.uint8)
+        encoded["timestamp"] = record["timestamp"].encode("utf-8")
+        encoded["job_id"] = record["job_id"].encode("utf-8")
+        return encoded
+
+    def _decode(self, row) -> Dict[str, Any]:
+        decoded = {
+            "job_id": row["job_id"].decode("utf-8"),
+            "timestamp": row["timestamp"].decode("utf-8"),
+        }
+        for field in HASH_FIELDS:
+            decoded[field] = format(int(row[field]), "016x")
+        sha256 = bytes(row["sha256"])
+        decoded["sha256"] = sha256.hex() if any(sha256) else None
+        return decoded
+
+    def _write_header(self, path: str) -> None:
+        with open(path, "wb") as f:
+            f.write(struct.pack(HEADER_FORMAT, self.magic, self.format_version, self.record_dtype.itemsize))
+
+    def _validate_header(self) -> None:
+        with open(self.path, "rb") as f:
+            header = f.read(HEADER_SIZE)
+
+        if len(header) < HEADER_SIZE:
+            raise ValueError(f"Hash log {self.path} has a truncated header")
+
+        magic, version, record_size = struct.unpack(HEADER_FORMAT, header)
+        if magic == MAGIC == self.magic and version == 1 and record_size == RECORD_DTYPE_V1.itemsize:
+            self._upgrade_from_v1()
+        elif magic != self.magic or version != self.format_version or record_size != self.record_dtype.itemsize:
+            raise ValueError(f"Unsupported hash log format in {self.path}")
+
+    def _upgrade_from_v1(self) -> None:
+        """Rewrite a version 1 log in the current layout with empty sha256 digests"""
+        body_size = os.path.getsize(self.path) - HEADER_SIZE
+        count = body_size // RECORD_DTYPE_V1.itemsize
+        old = np.fromfile(self.path, dtype=RECORD_DTYPE_V1, count=count, offset=HEADER_SIZE)
+
+        upgraded = np.zeros(count, dtype=self.record_dtype)
+        for field in RECORD_DTYPE_V1.names:
+            upgraded[field] = old[field]
+
+        temp_path = f"{self.path}.upgrade"
+        self._write_header(temp_path)
+        with open(temp_path, "ab") as f:
+            f.write(upgraded.tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.replace(temp_path, self.path)
+        print(f"📦 Upgraded hash log {self.path} to format {FORMAT_VERSION} ({count} records)")
+
+    def _truncate_partial_record(self) -> int:
+        """Drop a torn trailing record left by an interrupted write"""
+        body_size = os.path.getsize(self.path) - HEADER_SIZE
+        count, remainder = divmod(body_size, self.record_dtype.itemsize)
+
+        if remainder:
+            with open(self.path, "r+b") as f:
+                f.truncate(HEADER_SIZE + count * self.record_dtype.itemsize)
+
+        return count
+
+
+# Per-image record of the tile hashes indexed for region-level matching
+MAX_STORED_TILES = 16
+TILE_RECORD_DTYPE = np.dtype([
+    ("tile_hashes", "<u8", (MAX_STORED_TILES,)),
+    ("tile_count", "u1"),
+    ("timestamp", "S32"),
+    ("job_id", "S64"),
+])
+
+
+class TileLogStore(HashLogStore):
+    """Append-only log of per-image tile hashes (same layout rules as HashLogStore)"""
+
+    record_dtype = TILE_RECORD_DTYPE
+    magic = b"CLMTILE\x00"
+    format_version = 1
+
+    def _encode(self, record: Dict[str, Any]) -> np.ndarray:
+        tile_hashes = np.asarray(record["tile_hashes"], dtype=np.uint64)[:MAX_STORED_TILES]
+        encoded = np.zeros(1, dtype=self.record_dtype)
+        encoded["tile_hashes"][0, :len(tile_hashes)] = tile_hashes
+        encoded["tile_count"] = len(tile_hashes)
+        encoded["timestamp"] = record["timestamp"].encode("utf-8")
+        encoded["job_id"] = record["job_id"].encode("utf-8")
+        return encoded
+
+    def _decode(self, row) -> Dict[str, Any]:
+        return {
+            "job_id": row["job_id"].decode("utf-8"),
+            "timestamp": row["timestamp"].decode("utf-8"),
+            "tile_hashes": np.array(row["tile_hashes"][:row["tile_count"]]),
+        }
+
+
+def embedding_record_dtype(dim: int) -> np.dtype:
+    return np.dtype([
+        ("embedding", "<f2", (dim,)),
+        ("timestamp", "S32"),
+        ("job_id", "S64"),
+    ])
+
+
+class EmbeddingLogStore(HashLogStore):
+    """Append-only log of per-image float16 embeddings
+
+    The record size follows the embedding dimension, so a log written by a
+    different model layer fails the header check instead of being misread.
+    Positions never change (callers do not compact this log), which keeps
+    them aligned with the codes of an ANN index saved alongside it.
+    """
+
+    magic = b"CLMEMBD\x00"
+    format_version = 1
+
+    def __init__(self, path: str, dim: int, **kwargs):
+        self.record_dtype = embedding_record_dtype(dim)
+        super().__init__(path, **kwargs)
+
+    def _encode(self, record: Dict[str, Any]) -> np.ndarray:
+        encoded = np.zeros(1, dtype=self.record_dtype)
+        encoded["embedding"] = np.asarray(record["embedding"], dtype=np.float16)
+        encoded["timestamp"] = record["timestamp"].encode("utf-8")
+        encoded["job_id"] = record["job_id"].encode("utf-8")
+        return encoded
+
+    def _decode(self, row) -> Dict[str, Any]:
+        return {
+            "job_id": row["job_id"].decode("utf-8"),
+            "timestamp": row["timestamp"].decode("utf-8"),
+            "embedding": np.array(row["embedding"], dtype=np.float32),
+        }
@@ -0,0 +1,113 @@
+import base64
+import threading
+from typing import Any, Callable, Optional
+
+import cv2
+import numpy as np
+
+# Long side of each consumer's view of the processed image:
+# YOLO letterboxes to 640 itself, LLaVA 1.6 tiles at most 672 px (2 x 336 CLIP patches)
+YOLO_INPUT_SIZE = 640
+VLM_IMAGE_SIZE = 672
+VLM_JPEG_QUALITY = 90
+UI_THUMBNAIL_SIZE = 320
+
+
+def fit_long_side(image: np.ndarray, size: int) -> np.ndarray:
+    """Downscale (never upscale) so the long side is at most size"""
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (max(1, round(width * scale)), max(1, round(height * scale))),
+                      interpolation=cv2.INTER_AREA)
+
+
+class ImageBundle:
+    """One claim image, decoded once and shared by every pipeline stage
+
+    Holds the uploaded bytes, the decoded RGB array (at a reduced JPEG scale
+    for oversized uploads) and the processed (resized) RGB array. Each
+    consumer takes the view sized for it, built from the processed image on
+    first use and cached: YOLO's input, a compact JPEG at the VLM's native
+    resolution, and a UI thumbnail. The processed JPEG is exactly what
+    ImageProcessor.save_image writes; perceptual hashes are taken from it,
+    not from a smaller view, so they stay comparable with stored hashes.
+    """
+
+    def __init__(self,
+                 data: bytes,
+                 rgb: np.ndarray,
+                 processed: np.ndarray,
+                 path: str = "",
+                 vlm_size: int = VLM_IMAGE_SIZE,
+                 vlm_quality: int = VLM_JPEG_QUALITY):
+        self.data = data
+        self.rgb = rgb
+        self.processed = processed
+        self.path = path
+        self.vlm_size = vlm_size
+        self.vlm_quality = vlm_quality
+        self._views = {}
+        # Stages run in worker threads; each view is built once (views build on each other)
+        self._lock = threading.RLock()
+
+    @property
+    def width(self) -> int:
+        return self.processed.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.processed.shape[0]
+
+    @property
+    def processed_bgr(self) -> np.ndarray:
+        """Processed image in OpenCV channel order, for the annotation (do not draw on it)"""
+        return self._view("bgr", lambda: cv2.cvtColor(self.processed, cv2.COLOR_RGB2BGR))
+
+    @property
+    def processed_jpeg(self) -> bytes:
+        """Processed image as the JPEG ImageProcessor.save_image writes"""
+        return self._view("jpeg", lambda: cv2.imencode(".jpg", self.processed_bgr)[1].tobytes())
+
+    @property
+    def yolo_input(self) -> np.ndarray:
+        """BGR view at YOLO's input size; boxes found on it scale back by yolo_scale"""
+        return self._view("yolo", lambda: fit_long_side(self.processed_bgr, YOLO_INPUT_SIZE))
+
+    @property
+    def yolo_scale(self) -> float:
+        """Processed-image pixels per yolo_input pixel"""
+        return self.width / self.yolo_input.shape[1]
+
+    @property
+    def vlm_base64(self) -> str:
+        """Compact JPEG at the VLM's native resolution, base64 for the Ollama API"""
+        def build():
+            view = fit_long_side(self.processed_bgr, self.vlm_size)
+            encoded = cv2.imencode(".jpg", view, [cv2.IMWRITE_JPEG_QUALITY, self.vlm_quality])[1]
+            return base64.b64encode(encoded.tobytes()).decode("utf-8")
+        return self._view("vlm", build)
+
+    @property
+    def ui_thumbnail_jpeg(self) -> bytes:
+        return self._view("ui", lambda: cv2.imencode(
+            ".jpg", fit_long_side(self.processed_bgr, UI_THUMBNAIL_SIZE), [cv2.IMWRITE_JPEG_QUALITY, 85]
+        )[1].tobytes())
+
+    def write_processed(self, output_path: str) -> None:
+        with open(output_path, "wb") as f:
+            f.write(self.processed_jpeg)
+
+    def write_ui_thumbnail(self, output_path: str) -> None:
+        with open(output_path, "wb") as f:
+            f.write(self.ui_thumbnail_jpeg)
+
+    def _view(self, name: str, build: Callable[[], Any]) -> Any:
+        view: Optional[Any] = self._views.get(name)
+        if view is None:
+            with self._lock:
+                view = self._views.get(name)
+                if view is None:
+                    view = self._views[name] = build()
+        return view
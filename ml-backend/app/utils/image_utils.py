@@ -1,20 +1,79 @@
 import cv2
+import io
 import numpy as np
+import struct
 from PIL import Image
 import os
-from typing import Tuple
+import time
+from typing import Any, Dict, Tuple
+
+from app.utils.image_bundle import ImageBundle
+from app.utils.jpeg_header import HeaderParseError, read_jpeg_header
+
+# libjpeg can decode straight to 1/2, 1/4 or 1/8 size by dropping DCT coefficients
+REDUCED_DECODE_FLAGS = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Error level analysis: re-encode quality, block size and the residual level below which
+# a block is too flat to say anything (sky, paint) and is left out of the statistics
+ELA_QUALITY = 75
+ELA_BLOCK_SIZE = 16
+ELA_FLAT_RESIDUAL = 0.5
+# Robust z-scores of a block's error level: up to ELA_Z_CLEAN is normal variation,
+# ELA_Z_STRONG and above maps to the maximum tamper score
+ELA_Z_CLEAN = 6.0
+ELA_Z_STRONG = 11.0
 
 class ImageProcessor:
-    def __init__(self, max_size: int = 1024):
+    def __init__(self, max_size: int = 1024, reduced_decode: bool = True):
         self.max_size = max_size
+        self.reduced_decode = reduced_decode
     
     def load_image(self, image_path: str) -> np.ndarray:
-        """Load image using OpenCV"""
-        img = cv2.imread(image_path)
+        """Load image using OpenCV, at reduced resolution when it is far above max_size"""
+        with open(image_path, "rb") as f:
+            flag = self._decode_flag(f)
+        img = cv2.imread(image_path, flag) if flag != cv2.IMREAD_COLOR else None
+        if img is None:
+            img = cv2.imread(image_path)
         if img is None:
             raise ValueError(f"Failed to load image: {image_path}")
         return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
     
+    def decode_image(self, data: bytes) -> np.ndarray:
+        """Decode encoded image bytes already in memory (as load_image does a file)"""
+        buffer = np.frombuffer(data, dtype=np.uint8)
+        flag = self._decode_flag(io.BytesIO(data))
+        img = cv2.imdecode(buffer, flag) if flag != cv2.IMREAD_COLOR else None
+        if img is None:
+            img = cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+        if img is None:
+            raise ValueError("Failed to decode image")
+        return cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    
+    def _decode_flag(self, fp) -> int:
+        """imread flag with the largest JPEG scale factor that still leaves max_size to resize to
+        
+        The scaled decode skips most of the IDCT work and never allocates the
+        full-resolution frame; resize_image then brings it to the same size as
+        before. Anything but a readable JPEG header decodes at full size.
+        """
+        if not self.reduced_decode:
+            return cv2.IMREAD_COLOR
+        try:
+            width, height, _ = read_jpeg_header(fp)
+        except (HeaderParseError, struct.error):
+            return cv2.IMREAD_COLOR
+        
+        for factor, flag in REDUCED_DECODE_FLAGS:
+            # libjpeg rounds scaled dimensions up
+            if max(-(-width // factor), -(-height // factor)) >= self.max_size:
+                return flag
+        return cv2.IMREAD_COLOR
+    
     def resize_image(self, image: np.ndarray) -> np.ndarray:
         """Resize image maintaining aspect ratio"""
         h, w = image.shape[:2]
@@ -32,6 +91,11 @@ class ImageProcessor:
         resized = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_AREA)
         return resized
     
+    def processed_jpeg(self, data: bytes) -> bytes:
+        """The processed JPEG the claim pipeline hashes: decode, resize and encode as preprocessing does"""
+        image = self.decode_image(data)
+        return ImageBundle(data, image, self.resize_image(image)).processed_jpeg
+    
     def normalize_image(self, image: np.ndarray) -> np.ndarray:
         """Normalize image for consistent processing"""
         # Convert to float32 and normalize to [0, 1]
@@ -59,4 +123,62 @@ class ImageProcessor:
     def save_image(self, image: np.ndarray, output_path: str) -> None:
         """Save processed image"""
         image_bgr = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
-        cv2.imwrite(output_path, image_bgr)
\ No newline at end of file
+        cv2.imwrite(output_path, image_bgr)
+    
+    def error_level_analysis(self, image: np.ndarray) -> Dict[str, Any]:
+        """Tamper screen: error level inconsistencies between blocks of an RGB image
+        
+        The luminance is re-encoded once in memory and the per-block mean error
+        is compared with the rest of the image. A pasted or retouched region has
+        a different compression history, so its error level stands out from
+        blocks of similar texture (above or below).
+        """
+        start = time.perf_counter()
+        gray = cv2.cvtColor(self.resize_image(image), cv2.COLOR_RGB2GRAY)
+        
+        encoded = cv2.imencode(".jpg", gray, [cv2.IMWRITE_JPEG_QUALITY, ELA_QUALITY])[1]
+        error = cv2.absdiff(gray, cv2.imdecode(encoded, cv2.IMREAD_GRAYSCALE)).astype(np.float32)
+        residual = np.abs(gray.astype(np.float32) - cv2.GaussianBlur(gray.astype(np.float32), (3, 3), 0))
+        
+        rows, cols = gray.shape[0] // ELA_BLOCK_SIZE, gray.shape[1] // ELA_BLOCK_SIZE
+        if rows == 0 or cols == 0:
+            # Narrower than one block: nothing to compare, so not assessed (score 0)
+            return {
+                "assessed": False,
+                "tamper_score": 0.0,
+                "max_zscore": 0.0,
+                "suspicious_fraction": 0.0,
+                "heatmap": np.zeros((max(rows, 1), max(cols, 1)), dtype=np.uint8),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+            }
+        
+        def block_means(values: np.ndarray) -> np.ndarray:
+            cropped = values[:rows * ELA_BLOCK_SIZE, :cols * ELA_BLOCK_SIZE]
+            return cropped.reshape(rows, ELA_BLOCK_SIZE, cols, ELA_BLOCK_SIZE).mean(axis=(1, 3))
+        
+        # 3x3-block smoothing: a tampered region spans several blocks, noise does not
+        levels = cv2.blur(np.log(block_means(error) + 0.1), (3, 3))
+        textured = cv2.blur(block_means(residual), (3, 3)) >= ELA_FLAT_RESIDUAL
+        
+        zscores = np.zeros((rows, cols), dtype=np.float32)
+        if textured.sum() >= 16:
+            median = np.median(levels[textured])
+            spread = max(1.4826 * np.median(np.abs(levels[textured] - median)), 0.15)
+            zscores[textured] = np.abs(levels[textured] - median) / spread
+        
+        max_zscore = float(zscores.max()) if zscores.size else 0.0
+        tamper_score = 10 * min(max(max_zscore - ELA_Z_CLEAN, 0) / (ELA_Z_STRONG - ELA_Z_CLEAN), 1)
+        
+        return {
+            "assessed": True,
+            "tamper_score": round(tamper_score, 2),
+            "max_zscore": round(max_zscore, 2),
+            "suspicious_fraction": round(float((zscores > ELA_Z_CLEAN).mean()) if zscores.size else 0.0, 4),
+            "heatmap": (np.clip(zscores / ELA_Z_STRONG, 0, 1) * 255).astype(np.uint8),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 2)
+        }
+    
+    def save_heatmap(self, heatmap: np.ndarray, output_path: str, size: Tuple[int, int]) -> None:
+        """Save a block heatmap as a color image of the given (width, height)"""
+        scaled = cv2.resize(heatmap, size, interpolation=cv2.INTER_NEAREST)
+        cv2.imwrite(output_path, cv2.applyColorMap(scaled, cv2.COLORMAP_JET))
@@ -0,0 +1,236 @@
+import hashlib
+import io
+import json
+import os
+import struct
+from typing import Any, BinaryIO, Dict, List, Optional
+
+from app.utils.jpeg_header import (
+    APP1_MARKER, EXIF_PREFIX, SOF_MARKERS, HeaderParseError, iter_segments, next_ifd_offset,
+    read_ifd, read_sof, tiff_block
+)
+
+DQT_MARKER = 0xDB
+DHT_MARKER = 0xC4
+APP_MARKERS = range(0xE0, 0xF0)
+PROGRESSIVE_SOF = frozenset([0xC2, 0xC6, 0xCA, 0xCE])
+
+# Bytes of an APPn payload read to identify the writer ("JFIF", "Exif", "Photoshop 3.0", ...)
+APP_ID_BYTES = 32
+
+# Curated camera table signatures shipped with the app (read-only at runtime)
+CAMERA_SIGNATURES_PATH = os.path.join(os.path.dirname(__file__), "jpeg_signatures.json")
+
+# APPn identifiers only Adobe software writes
+EDITOR_SEGMENTS = {
+    (0xED, "Photoshop 3.0"): "Photoshop APP13",
+    (0xEC, "Ducky"): "Photoshop Save for Web APP12",
+    (0xEE, "Adobe"): "Adobe APP14",
+}
+
+# Zigzag scan position -> natural (row-major) position in an 8x8 block
+ZIGZAG = [
+    0, 1, 8, 16, 9, 2, 3, 10, 17, 24, 32, 25, 18, 11, 4, 5,
+    12, 19, 26, 33, 40, 48, 41, 34, 27, 20, 13, 6, 7, 14, 21, 28,
+    35, 42, 49, 56, 57, 50, 43, 36, 29, 22, 15, 23, 30, 37, 44, 51,
+    58, 59, 52, 45, 38, 31, 39, 46, 53, 60, 61, 54, 47, 55, 62, 63,
+]
+
+# JPEG Annex K tables, natural order; libjpeg scales them by the quality setting
+STANDARD_LUMINANCE = [
+    16, 11, 10, 16, 24, 40, 51, 61,
+    12, 12, 14, 19, 26, 58, 60, 55,
+    14, 13, 16, 24, 40, 57, 69, 56,
+    14, 17, 22, 29, 51, 87, 80, 62,
+    18, 22, 37, 56, 68, 109, 103, 77,
+    24, 35, 55, 64, 81, 104, 113, 92,
+    49, 64, 78, 87, 103, 121, 120, 101,
+    72, 92, 95, 98, 112, 100, 103, 99,
+]
+STANDARD_CHROMINANCE = (
+    [17, 18, 24, 47] + [99] * 4 +
+    [18, 21, 26, 66] + [99] * 4 +
+    [24, 26, 56] + [99] * 5 +
+    [47, 66] + [99] * 6 +
+    [99] * 32
+)
+
+# Annex K Huffman code-length counts (DC/AC x luminance/chrominance); cameras use these,
+# encoders that optimize Huffman coding (Photoshop, mozjpeg, PIL optimize=True) do not
+STANDARD_HUFFMAN_BITS = {
+    (0, 0): (0, 1, 5, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0, 0, 0),
+    (0, 1): (0, 3, 1, 1, 1, 1, 1, 1, 1, 1, 1, 0, 0, 0, 0, 0),
+    (1, 0): (0, 2, 1, 3, 3, 2, 4, 3, 5, 5, 4, 4, 0, 0, 1, 0x7D),
+    (1, 1): (0, 2, 1, 2, 4, 4, 3, 4, 7, 5, 4, 4, 0, 1, 2, 0x77),
+}
+
+
+def libjpeg_table(base: List[int], quality: int) -> List[int]:
+    """Quantization table libjpeg writes for a quality setting, in zigzag order"""
+    scale = 5000 // quality if quality < 50 else 200 - 2 * quality
+    return [min(255, max(1, (base[position] * scale + 50) // 100)) for position in ZIGZAG]
+
+
+def table_signature(tables: Dict[int, List[int]]) -> str:
+    """Stable id of a set of quantization tables"""
+    digest = hashlib.sha1()
+    for table_id in sorted(tables):
+        digest.update(struct.pack(">B64H", table_id, *tables[table_id]))
+    return digest.hexdigest()[:16]
+
+
+def estimate_quality(tables: Dict[int, List[int]]) -> Optional[int]:
+    """libjpeg-equivalent quality (1-100) of the luminance table"""
+    luminance = tables.get(0)
+    if not luminance:
+        return None
+    base = [STANDARD_LUMINANCE[position] for position in ZIGZAG]
+    scale = 100.0 * sum(luminance) / sum(base)
+    quality = (200 - scale) / 2 if scale <= 100 else 5000 / scale
+    return int(min(100, max(1, round(quality))))
+
+
+def read_jpeg_structure(fp: BinaryIO) -> Dict[str, Any]:
+    """Encoder fingerprint from the segments before the first scan, without decoding pixels"""
+    structure: Dict[str, Any] = {
+        "width": 0,
+        "height": 0,
+        "progressive": False,
+        "quant_tables": {},
+        "standard_huffman": True,
+        "app_segments": [],
+        "exif": None,
+    }
+
+    for marker, length in iter_segments(fp):
+        if marker in SOF_MARKERS:
+            structure["width"], structure["height"] = read_sof(fp.read(length))
+            structure["progressive"] = marker in PROGRESSIVE_SOF
+        elif marker == DQT_MARKER:
+            structure["quant_tables"].update(_read_dqt(fp.read(length)))
+        elif marker == DHT_MARKER:
+            if not _has_standard_huffman(fp.read(length)):
+                structure["standard_huffman"] = False
+        elif marker in APP_MARKERS:
+            if marker == APP1_MARKER and structure["exif"] is None:
+                payload = fp.read(length)
+                if payload.startswith(EXIF_PREFIX):
+                    structure["exif"] = payload
+            else:
+                payload = fp.read(min(length, APP_ID_BYTES))
+            identifier = payload.split(b"\x00", 1)[0][:APP_ID_BYTES].decode("latin-1")
+            structure["app_segments"].append((marker, identifier))
+
+    if not structure["width"]:
+        raise HeaderParseError("no SOF segment")
+    return structure
+
+
+def exif_thumbnail(payload: bytes) -> Optional[bytes]:
+    """Embedded JPEG thumbnail (IFD1) of an Exif APP1 payload"""
+    tiff, endian = tiff_block(payload)
+    ifd0_offset = struct.unpack(f"{endian}L", tiff[4:8])[0]
+    if ifd0_offset + 2 > len(tiff):
+        return None
+    ifd1_offset = next_ifd_offset(tiff, ifd0_offset, endian)
+    if not ifd1_offset:
+        return None
+
+    ifd1 = read_ifd(tiff, ifd1_offset, endian)
+    if 0x0201 not in ifd1 or 0x0202 not in ifd1:
+        return None
+    start, size = _ifd_integer(ifd1[0x0201], endian), _ifd_integer(ifd1[0x0202], endian)
+    thumbnail = tiff[start:start + size]
+    return thumbnail if len(thumbnail) == size and thumbnail[:2] == b"\xff\xd8" else None
+
+
+def thumbnail_structure(payload: bytes) -> Optional[Dict[str, Any]]:
+    """Size and quantization tables of the Exif thumbnail, if it is a readable JPEG"""
+    thumbnail = exif_thumbnail(payload)
+    if thumbnail is None:
+        return None
+    try:
+        return read_jpeg_structure(io.BytesIO(thumbnail))
+    except (HeaderParseError, struct.error):
+        return None
+
+
+def _ifd_integer(entry, endian: str) -> int:
+    field_type, data = entry
+    if field_type == 3:  # SHORT
+        return struct.unpack(f"{endian}H", data[:2])[0]
+    if field_type == 4:  # LONG
+        return struct.unpack(f"{endian}L", data[:4])[0]
+    raise HeaderParseError("unexpected integer tag type")
+
+
+def _read_dqt(segment: bytes) -> Dict[int, List[int]]:
+    tables = {}
+    position = 0
+    while position < len(segment):
+        precision, table_id = segment[position] >> 4, segment[position] & 0x0F
+        size = 128 if precision else 64
+        values = segment[position + 1:position + 1 + size]
+        if len(values) != size:
+            raise HeaderParseError("truncated DQT segment")
+        tables[table_id] = list(struct.unpack(">64H", values) if precision else values)
+        position += 1 + size
+    return tables
+
+
+def _has_standard_huffman(segment: bytes) -> bool:
+    position = 0
+    while position + 17 <= len(segment):
+        table_class, table_id = segment[position] >> 4, segment[position] & 0x0F
+        bits = tuple(segment[position + 1:position + 17])
+        if STANDARD_HUFFMAN_BITS.get((table_class, table_id)) != bits:
+            return False
+        position += 17 + sum(bits)
+    return True
+
+
+class QuantTableIndex:
+    """Known quantization-table signatures: which encoders and cameras produce them
+
+    Every libjpeg quality setting (used by PIL, OpenCV, GIMP, ImageMagick and
+    most web tools) is built in. Cameras use their own tables; signatures for
+    a make/model come from a curated JSON file, built offline from vetted
+    camera originals (curate_jpeg_signatures.py) and never written at runtime,
+    so uploads cannot teach it a forged signature.
+    """
+
+    def __init__(self, path: Optional[str] = CAMERA_SIGNATURES_PATH):
+        self.path = path
+        self._software: Dict[str, int] = {}
+        for quality in range(1, 101):
+            tables = {
+                0: libjpeg_table(STANDARD_LUMINANCE, quality),
+                1: libjpeg_table(STANDARD_CHROMINANCE, quality),
+            }
+            self._software[table_signature(tables)] = quality
+            # Grayscale files carry only the luminance table
+            self._software[table_signature({0: tables[0]})] = quality
+
+        self._cameras: Dict[str, List[str]] = {}
+        if path and os.path.exists(path):
+            self._cameras = load_camera_signatures(path)
+
+    def __len__(self) -> int:
+        return len(self._cameras)
+
+    def software_quality(self, signature: str) -> Optional[int]:
+        """libjpeg quality that produces these tables, if any"""
+        return self._software.get(signature)
+
+    def camera_signatures(self, make: str, model: str) -> List[str]:
+        """Curated signatures of a make/model (empty when it is not curated)"""
+        return self._cameras.get(camera_key(make, model), [])
+
+
+def camera_key(make: str, model: str) -> str:
+    return f"{make.strip().lower()}|{model.strip().lower()}"
+
+
+def load_camera_signatures(path: str) -> Dict[str, List[str]]:
+    with open(path) as f:
+        return json.load(f).get("cameras", {})
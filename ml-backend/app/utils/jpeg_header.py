@@ -0,0 +1,202 @@
+import struct
+from typing import Any, BinaryIO, Dict, Iterator, Optional, Tuple
+
+# Start-of-frame markers carry the image size; C4 (DHT), C8 (JPG) and CC (DAC) share the range
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+# Markers without a length field: TEM, RST0-7, SOI, EOI
+STANDALONE_MARKERS = frozenset([0x01, *range(0xD0, 0xDA)])
+SOS_MARKER = 0xDA
+APP1_MARKER = 0xE1
+EXIF_PREFIX = b"Exif\x00\x00"
+
+# TIFF field type -> bytes per value, as read by Pillow
+TIFF_TYPE_SIZES = {1: 1, 2: 1, 3: 2, 4: 4, 5: 8, 6: 1, 7: 1, 8: 2, 9: 4, 10: 8, 11: 4, 12: 8, 13: 4, 16: 8}
+ASCII, LONG, RATIONAL = 2, 4, 5
+
+EXIF_IFD_TAG = 0x8769
+GPS_IFD_TAG = 0x8825
+
+# tag -> (field type, raw value bytes)
+IFDEntries = Dict[int, Tuple[int, bytes]]
+
+
+class HeaderParseError(ValueError):
+    """The header could not be read the way Pillow would read it"""
+
+
+def iter_segments(fp: BinaryIO) -> Iterator[Tuple[int, int]]:
+    """(marker, payload length) of each segment before the first scan
+
+    fp is left at the start of the payload; callers may read some or all of
+    it, and the next step seeks past the rest.
+    """
+    if fp.read(3) != b"\xff\xd8\xff":
+        raise HeaderParseError("not a JPEG file")
+    fp.seek(-1, 1)
+
+    while True:
+        byte = fp.read(1)
+        if not byte:
+            raise HeaderParseError("end of file before the first scan")
+        if byte != b"\xff":
+            continue  # stray data between segments
+
+        marker = fp.read(1)
+        while marker == b"\xff":  # fill bytes
+            marker = fp.read(1)
+        if not marker:
+            raise HeaderParseError("end of file before the first scan")
+
+        marker = marker[0]
+        if marker == 0x00 or marker in STANDALONE_MARKERS:
+            continue
+        if marker == SOS_MARKER:
+            return
+
+        length_bytes = fp.read(2)
+        if len(length_bytes) != 2:
+            raise HeaderParseError("truncated segment length")
+        length = struct.unpack(">H", length_bytes)[0] - 2
+        if length < 0:
+            raise HeaderParseError("invalid segment length")
+
+        start = fp.tell()
+        yield marker, length
+        fp.seek(start + length)
+
+
+def read_sof(segment: bytes) -> Tuple[int, int]:
+    """(width, height) from an SOF payload"""
+    if len(segment) < 5:
+        raise HeaderParseError("truncated SOF segment")
+    height, width = struct.unpack(">HH", segment[1:5])
+    return width, height
+
+
+def read_jpeg_header(fp: BinaryIO) -> Tuple[int, int, Optional[bytes]]:
+    """(width, height, first Exif APP1 payload) from the markers before the first scan
+
+    Only the SOF and APP1 segments are read; everything else is skipped with
+    a seek, so the cost does not depend on the image resolution.
+    """
+    size = None
+    exif = None
+    for marker, length in iter_segments(fp):
+        if marker in SOF_MARKERS:
+            size = read_sof(fp.read(length))
+        elif marker == APP1_MARKER and exif is None:
+            segment = fp.read(length)
+            if segment[:6] == EXIF_PREFIX:
+                exif = segment
+
+    if size is None:
+        raise HeaderParseError("no SOF segment")
+    return size[0], size[1], exif
+
+
+def read_ifd(tiff: bytes, offset: int, endian: str) -> IFDEntries:
+    """Raw entries of the IFD at offset
+
+    Entries with unknown types or data outside the block are skipped and a
+    truncated directory keeps what was read before it, as Pillow does.
+    """
+    entries: IFDEntries = {}
+    if offset + 2 > len(tiff):
+        return entries
+
+    count = struct.unpack(f"{endian}H", tiff[offset:offset + 2])[0]
+    position = offset + 2
+    for _ in range(count):
+        if position + 12 > len(tiff):
+            break
+        tag, field_type, value_count, inline = struct.unpack(f"{endian}HHL4s", tiff[position:position + 12])
+        position += 12
+
+        unit_size = TIFF_TYPE_SIZES.get(field_type)
+        if unit_size is None:
+            continue
+        size = value_count * unit_size
+        if size > 4:
+            data_offset = struct.unpack(f"{endian}L", inline)[0]
+            data = tiff[data_offset:data_offset + size]
+        else:
+            data = inline[:size]
+        if len(data) != size or not data:
+            continue
+        entries[tag] = (field_type, data)
+    return entries
+
+
+def tiff_block(payload: bytes) -> Tuple[bytes, str]:
+    """(TIFF block, struct byte order) of an Exif APP1 payload"""
+    tiff = payload[len(EXIF_PREFIX):] if payload.startswith(EXIF_PREFIX) else payload
+    if tiff[:4] == b"II*\x00":
+        return tiff, "<"
+    if tiff[:4] == b"MM\x00*":
+        return tiff, ">"
+    raise HeaderParseError("not a TIFF header")
+
+
+def next_ifd_offset(tiff: bytes, offset: int, endian: str) -> int:
+    """Offset of the IFD chained after the one at offset (0 if none)"""
+    count = struct.unpack(f"{endian}H", tiff[offset:offset + 2])[0]
+    link = offset + 2 + 12 * count
+    if link + 4 > len(tiff):
+        return 0
+    return struct.unpack(f"{endian}L", tiff[link:link + 4])[0]
+
+
+def parse_exif(payload: bytes) -> Tuple[str, IFDEntries, IFDEntries, Optional[IFDEntries]]:
+    """(byte order, IFD0, Exif IFD, GPS IFD or None) from an Exif APP1 payload"""
+    tiff, endian = tiff_block(payload)
+    ifd0 = read_ifd(tiff, struct.unpack(f"{endian}L", tiff[4:8])[0], endian)
+    exif_ifd = {}
+    if EXIF_IFD_TAG in ifd0:
+        exif_ifd = read_ifd(tiff, ifd_offset(ifd0[EXIF_IFD_TAG], endian), endian)
+    gps_ifd = None
+    if GPS_IFD_TAG in ifd0:
+        gps_ifd = read_ifd(tiff, ifd_offset(ifd0[GPS_IFD_TAG], endian), endian)
+    return endian, ifd0, exif_ifd, gps_ifd
+
+
+def ifd_offset(entry: Tuple[int, bytes], endian: str) -> int:
+    field_type, data = entry
+    if field_type != LONG or len(data) != 4:
+        raise HeaderParseError("unexpected IFD pointer type")
+    return struct.unpack(f"{endian}L", data)[0]
+
+
+def pil_text(entry: Tuple[int, bytes]) -> str:
+    """str() of the value Pillow returns for a single-valued text tag"""
+    field_type, data = entry
+    if field_type == ASCII:
+        # Pillow drops one trailing NUL and decodes Latin-1
+        return (data[:-1] if data.endswith(b"\x00") else data).decode("latin-1")
+    if field_type in (1, 7):  # BYTE / UNDEFINED come back as bytes
+        return str(data)
+    raise HeaderParseError("unexpected text tag type")
+
+
+def exifread_text(entry: Tuple[int, bytes]) -> str:
+    """str() of the tag exifread returns for an ASCII field"""
+    field_type, data = entry
+    if field_type != ASCII:
+        raise HeaderParseError("unexpected text tag type")
+    value: Any = data.split(b"\x00", 1)[0]
+    try:
+        value = value.decode("utf-8")
+    except UnicodeDecodeError:
+        pass
+    return str(value)
+
+
+def rationals(entry: Tuple[int, bytes], endian: str) -> Tuple[float, ...]:
+    """Unsigned rationals as floats; a zero denominator gives nan, as in Pillow"""
+    field_type, data = entry
+    if field_type != RATIONAL:
+        raise HeaderParseError("unexpected rational tag type")
+    values = struct.unpack(f"{endian}{len(data) // 4}L", data)
+    return tuple(
+        numerator / denominator if denominator else float("nan")
+        for numerator, denominator in zip(values[::2], values[1::2])
+    )
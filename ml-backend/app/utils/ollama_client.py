@@ -0,0 +1,160 @@
+import asyncio
+import collections
+import os
+import time
+from typing import Any, Deque, Dict, Optional, Tuple
+
+import httpx
+import numpy as np
+
+
+class FifoLimiter:
+    """At most `limit` holders at once; waiters get a freed slot in arrival order
+
+    A released slot is handed straight to the oldest waiter, so a request
+    arriving just as a slot frees up cannot overtake the queue.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = max(1, limit)
+        self.in_use = 0
+        self._waiters: Deque[asyncio.Future] = collections.deque()
+
+    @property
+    def waiting(self) -> int:
+        return len(self._waiters)
+
+    async def acquire(self):
+        if self.in_use < self.limit and not self._waiters:
+            self.in_use += 1
+            return
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # Cancelled just after being handed the slot: pass it on to the next waiter
+                self.release()
+            elif waiter in self._waiters:
+                # release() may already have popped (and skipped) this cancelled waiter
+                self._waiters.remove(waiter)
+            raise
+
+    def release(self):
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)  # the slot moves to the waiter; in_use is unchanged
+                return
+        self.in_use -= 1
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        self.release()
+
+
+class OllamaClient:
+    """Shared keep-alive client for Ollama's generate API
+
+    At most `parallel` requests are in flight (the server's OLLAMA_NUM_PARALLEL
+    slots); the rest queue here in arrival order instead of piling up in
+    Ollama, and the timeout only starts once a request is sent. Keeps the
+    queue wait and generation time of recent requests for metrics().
+    """
+
+    def __init__(self,
+                 host: str,
+                 parallel: Optional[int] = None,
+                 timeout: Optional[float] = None,
+                 window: int = 500):
+        if parallel is None:
+            parallel = int(os.getenv("OLLAMA_PARALLEL", "1"))
+        if timeout is None:
+            timeout = float(os.getenv("OLLAMA_TIMEOUT", "300"))
+        self.host = host
+        self.parallel = max(1, parallel)
+        self.timeout = httpx.Timeout(timeout, connect=10.0)
+
+        self._limiter = FifoLimiter(self.parallel)
+        self._client: Optional[httpx.AsyncClient] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        self.requests = 0
+        self.errors = 0
+        self._recent: Deque[Tuple[float, float]] = collections.deque(maxlen=window)
+
+    def _http(self) -> httpx.AsyncClient:
+        """The shared client (a new one if the event loop changed, e.g. across asyncio.run calls)"""
+        loop = asyncio.get_running_loop()
+        if self._client is None or self._loop is not loop:
+            self._client = httpx.AsyncClient(
+                base_url=self.host,
+                timeout=self.timeout,
+                limits=httpx.Limits(max_connections=self.parallel, max_keepalive_connections=self.parallel)
+            )
+            self._loop = loop
+        return self._client
+
+    async def generate(self, payload: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """POST /api/generate; returns Ollama's JSON response and this request's timing
+
+        Raises Exception on a non-200 answer and httpx.TimeoutException if
+        generation outlasts the timeout.
+        """
+        queued = time.perf_counter()
+        async with self._limiter:
+            sent = time.perf_counter()
+            try:
+                response = await self._http().post("/api/generate", json=payload)
+            except httpx.HTTPError:
+                self.errors += 1
+                raise
+            finally:
+                finished = time.perf_counter()
+                self.requests += 1
+
+        timing = {
+            "queue_wait_ms": round((sent - queued) * 1000, 1),
+            "generation_ms": round((finished - sent) * 1000, 1)
+        }
+        self._recent.append((timing["queue_wait_ms"], timing["generation_ms"]))
+
+        if response.status_code != 200:
+            self.errors += 1
+            raise Exception(f"Ollama API error: {response.status_code} - {response.text}")
+
+        result = response.json()
+        # Ollama's own split of the generation time (nanoseconds), when it reports it
+        for key in ("load_duration", "prompt_eval_duration", "eval_duration"):
+            if key in result:
+                timing[key.replace("duration", "ms")] = round(result[key] / 1e6, 1)
+        return result, timing
+
+    def metrics(self) -> Dict[str, Any]:
+        """Slots, queue and the wait / generation time percentiles of recent requests"""
+        summary: Dict[str, Any] = {
+            "parallel": self.parallel,
+            "in_flight": self._limiter.in_use,
+            "queued": self._limiter.waiting,
+            "requests": self.requests,
+            "errors": self.errors
+        }
+        if self._recent:
+            recent = np.array(self._recent)
+            for column, name in enumerate(("queue_wait_ms", "generation_ms")):
+                summary[name] = {
+                    "p50": round(float(np.percentile(recent[:, column], 50)), 1),
+                    "p95": round(float(np.percentile(recent[:, column], 95)), 1),
+                    "max": round(float(recent[:, column].max()), 1)
+                }
+        return summary
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
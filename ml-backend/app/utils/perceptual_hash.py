@@ -0,0 +1,105 @@
+import io
+import numpy as np
+from PIL import Image
+from typing import Dict
+
+# imagehash resizes with ANTIALIAS, which is LANCZOS in current Pillow
+RESAMPLE = Image.Resampling.LANCZOS if hasattr(Image, "Resampling") else Image.LANCZOS
+
+
+class PerceptualHasher:
+    """Computes phash, dhash, whash and average_hash from a single decode
+
+    imagehash decodes the image and converts it to grayscale once per hash
+    type. Here the grayscale base is built once and every hash size is
+    resampled from it, which keeps the output bit-identical to imagehash
+    (resampling from an intermediate level would not be). whash is computed
+    from exact integer block sums instead of two pywt round trips; pywt is
+    only used when block sums tie at the median, where imagehash's float
+    noise decides the bit.
+    """
+
+    def __init__(self, hash_size: int = 8, highfreq_factor: int = 4):
+        if hash_size < 2 or hash_size & (hash_size - 1):
+            raise ValueError("hash_size must be a power of 2 and at least 2")
+
+        self.hash_size = hash_size
+        self.highfreq_factor = highfreq_factor
+
+    def hash_file(self, image_path: str) -> Dict[str, str]:
+        """Open an image file once and compute all four hashes"""
+        with Image.open(image_path) as image:
+            return self.hash_image(image)
+
+    def hash_bytes(self, data: bytes) -> Dict[str, str]:
+        """Compute all four hashes from encoded image bytes already in memory"""
+        with Image.open(io.BytesIO(data)) as image:
+            return self.hash_image(image)
+
+    def hash_image(self, image: Image.Image) -> Dict[str, str]:
+        """Compute all four hashes as imagehash-compatible hex strings"""
+        gray = image.convert("L")
+
+        return {
+            "phash": self._to_hex(self._phash(gray)),
+            "dhash": self._to_hex(self._dhash(gray)),
+            "whash": self._to_hex(self._whash(gray)),
+            "average_hash": self._to_hex(self._average_hash(gray)),
+        }
+
+    def _resized(self, gray: Image.Image, width: int, height: int) -> np.ndarray:
+        return np.asarray(gray.resize((width, height), RESAMPLE))
+
+    def _average_hash(self, gray: Image.Image) -> np.ndarray:
+        pixels = self._resized(gray, self.hash_size, self.hash_size)
+        return pixels > np.mean(pixels)
+
+    def _dhash(self, gray: Image.Image) -> np.ndarray:
+        pixels = self._resized(gray, self.hash_size + 1, self.hash_size)
+        return pixels[:, 1:] > pixels[:, :-1]
+
+    def _phash(self, gray: Image.Image) -> np.ndarray:
+        import scipy.fftpack
+
+        img_size = self.hash_size * self.highfreq_factor
+        pixels = self._resized(gray, img_size, img_size)
+        dct = scipy.fftpack.dct(scipy.fftpack.dct(pixels, axis=0), axis=1)
+        dctlowfreq = dct[:self.hash_size, :self.hash_size]
+        return dctlowfreq > np.median(dctlowfreq)
+
+    def _whash(self, gray: Image.Image) -> np.ndarray:
+        image_scale = max(2 ** int(np.log2(min(gray.size))), self.hash_size)
+        pixels = self._resized(gray, image_scale, image_scale)
+
+        # With haar and the max-level LL removed, the LL band at hash_size is
+        # each block's sum minus a constant, so block sums order identically.
+        block = image_scale // self.hash_size
+        sums = pixels.reshape(self.hash_size, block, self.hash_size, block) \
+            .sum(axis=(1, 3), dtype=np.int64)
+
+        ordered = np.sort(sums, axis=None)
+        middle = len(ordered) // 2
+        if ordered[middle - 1] == ordered[middle]:
+            return self._whash_pywt(pixels, image_scale)
+
+        return sums > np.median(sums)
+
+    def _whash_pywt(self, pixels: np.ndarray, image_scale: int) -> np.ndarray:
+        """imagehash's float whash path, for inputs with median ties"""
+        import pywt
+
+        ll_max_level = int(np.log2(image_scale))
+        dwt_level = ll_max_level - int(np.log2(self.hash_size))
+
+        coeffs = list(pywt.wavedec2(pixels / 255., "haar", level=ll_max_level))
+        coeffs[0] *= 0
+        reconstructed = pywt.waverec2(coeffs, "haar")
+
+        dwt_low = pywt.wavedec2(reconstructed, "haar", level=dwt_level)[0]
+        return dwt_low > np.median(dwt_low)
+
+    def _to_hex(self, bits: np.ndarray) -> str:
+        """Same hex layout as imagehash.ImageHash.__str__"""
+        flat = bits.flatten()
+        value = int.from_bytes(np.packbits(flat).tobytes(), "big") >> ((-len(flat)) % 8)
+        return format(value, f"0{(len(flat) + 3) // 4}x")
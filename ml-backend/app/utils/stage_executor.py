@@ -0,0 +1,89 @@
+import asyncio
+import functools
+import multiprocessing
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+
+def _ready() -> int:
+    return os.getpid()
+
+
+def fork_context() -> Optional[multiprocessing.context.BaseContext]:
+    """The fork start method where it is available and safe, else None
+
+    Windows has no fork, and macOS may crash forked children of a process
+    that already loaded system frameworks. spawn/forkserver would re-run the
+    app's main module in every worker, so those platforms get no workers.
+    """
+    if sys.platform == "darwin" or "fork" not in multiprocessing.get_all_start_methods():
+        return None
+    return multiprocessing.get_context("fork")
+
+
+class StageExecutor:
+    """Runs the blocking stages of a claim off the event loop
+
+    The thread pool takes work that releases the GIL while it runs (OpenCV,
+    torch inference, HTTP calls to Ollama), so /health and the claims
+    endpoints stay responsive while claims are analysed and several claims
+    overlap. The process pool takes pure-Python CPU work, which threads would
+    only serialise on the GIL; its functions and arguments must be picklable.
+    With no process workers (or no safe fork on this platform) that work runs
+    in the thread pool as well.
+    """
+
+    def __init__(self, thread_workers: Optional[int] = None, process_workers: Optional[int] = None):
+        if thread_workers is None:
+            thread_workers = int(os.getenv("STAGE_THREAD_WORKERS", "4"))
+        if process_workers is None:
+            process_workers = int(os.getenv("STAGE_PROCESS_WORKERS", "1"))
+        self.thread_workers = max(1, thread_workers)
+        self.process_workers = max(0, process_workers)
+
+        self._mp_context = fork_context()
+        if self.process_workers and self._mp_context is None:
+            print(f"⚠️  No safe fork on {sys.platform}: process stages run in the thread pool")
+            self.process_workers = 0
+
+        self._threads = ThreadPoolExecutor(max_workers=self.thread_workers, thread_name_prefix="stage")
+        self._processes: Optional[ProcessPoolExecutor] = None
+
+    def start(self):
+        """Fork the process workers now, before stage threads are busy
+
+        Forking copies the parent as it is. Before any stage thread runs, no
+        lock can be held mid-operation in the copy; before the services load
+        model weights, the workers do not carry them (imported libraries they
+        do). Without a call, the pool starts on the first run_process.
+        """
+        if self.process_workers and self._processes is None:
+            self._processes = ProcessPoolExecutor(
+                max_workers=self.process_workers,
+                mp_context=self._mp_context
+            )
+            # Workers are launched on the first submit; wait until all of them are up
+            for future in [self._processes.submit(_ready) for _ in range(self.process_workers)]:
+                future.result()
+
+    async def run_thread(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """fn(*args, **kwargs) in the stage thread pool"""
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._threads, functools.partial(fn, *args, **kwargs))
+
+    async def run_process(self, fn: Callable[..., Any], *args, **kwargs) -> Any:
+        """fn(*args, **kwargs) in a worker process (in the thread pool if there are none)"""
+        if not self.process_workers:
+            return await self.run_thread(fn, *args, **kwargs)
+        if self._processes is None:
+            self.start()
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._processes, functools.partial(fn, *args, **kwargs))
+
+    def shutdown(self, wait: bool = True):
+        self._threads.shutdown(wait=wait)
+        if self._processes is not None:
+            self._processes.shutdown(wait=wait)
+            self._processes = None
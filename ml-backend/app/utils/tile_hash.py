@@ -0,0 +1,190 @@
+import numpy as np
+from typing import List, Tuple
+from app.utils.hash_index import MultiIndexHashIndex
+
+# Tiles are cut from a grayscale copy with this short side and resampled to TILE_PIXELS
+WORK_SIZE = 256
+TILE_PIXELS = 32
+HASH_SIZE = 8
+
+
+def _dct_matrix(n: int, k: int) -> np.ndarray:
+    """First k rows of the (unnormalized) DCT-II basis for length n"""
+    x = np.arange(n)
+    return np.cos(np.pi * (2 * x[None, :] + 1) * np.arange(k)[:, None] / (2 * n))
+
+
+_DCT = _dct_matrix(TILE_PIXELS, HASH_SIZE)
+_BIT_WEIGHTS = (1 << np.arange(63, -1, -1, dtype=np.uint64)).astype(np.uint64)
+
+
+class TileHasher:
+    """64-bit DCT hashes of overlapping square tiles anchored at scale-space keypoints
+
+    A fixed grid of tiles stops lining up as soon as a photo is cropped or
+    rescaled: shifting a tile by a few percent already flips 6-10 hash bits.
+    Tiles are therefore centred on SIFT keypoints and sized from the
+    keypoint scale, so the same scene region is cut out wherever the crop
+    puts it, and rotated to the keypoint's dominant orientation, which makes
+    them rotation invariant.
+
+    Mirroring is handled on the query side: the query is tiled both as given
+    and flipped, so a mirrored copy meets its original's tiles unchanged.
+    Queries also use more keypoints than are stored, so the stored ones are
+    still found after a crop shifts the keypoint ranking.
+    """
+
+    def __init__(self,
+                 stored_tiles: int = 16,
+                 query_tiles: int = 64,
+                 tile_scale: float = 2.0,
+                 min_keypoint_size: float = 6.0,
+                 min_contrast: float = 6.0):
+        self.stored_tiles = stored_tiles
+        self.query_tiles = query_tiles
+        self.tile_scale = tile_scale
+        self.min_keypoint_size = min_keypoint_size
+        self.min_contrast = min_contrast
+
+    def stored_hashes(self, image) -> np.ndarray:
+        """Tile hashes to index for an image (PIL image, BGR or grayscale array)"""
+        return self.hash_image(image)[0]
+
+    def query_hashes(self, image) -> np.ndarray:
+        """Tile hashes to search with, covering the image and its mirror"""
+        return self.hash_image(image)[1]
+
+    def hash_image(self, image) -> Tuple[np.ndarray, np.ndarray]:
+        """(stored, query) tile hashes; the stored tiles are the strongest keypoints' tiles"""
+        gray = self._work_array(image)
+        tiles = self._tiles(gray, max(self.stored_tiles, self.query_tiles))
+        mirrored = self._tiles(np.ascontiguousarray(gray[:, ::-1]), self.query_tiles)
+
+        stored = self._hash_tiles(tiles[:self.stored_tiles])
+        query = self._hash_tiles(np.concatenate((tiles[:self.query_tiles], mirrored)))
+        return np.unique(stored), np.unique(query)
+
+    def _work_array(self, image) -> np.ndarray:
+        import cv2
+
+        if not isinstance(image, np.ndarray):
+            image = np.asarray(image.convert("L"))
+        elif image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+
+        height, width = image.shape
+        scale = WORK_SIZE / min(height, width)
+        size = (max(1, round(width * scale)), max(1, round(height * scale)))
+        return cv2.resize(image, size, interpolation=cv2.INTER_AREA)
+
+    def _tiles(self, gray: np.ndarray, count: int) -> np.ndarray:
+        """Strongest keypoints' tiles, rotated to their orientation and resampled"""
+        import cv2
+
+        keypoints = [
+            keypoint for keypoint in cv2.SIFT_create().detect(gray, None)
+            if keypoint.size >= self.min_keypoint_size
+        ]
+        keypoints.sort(key=lambda keypoint: -keypoint.response)
+
+        tiles = []
+        centre = np.array([TILE_PIXELS / 2, TILE_PIXELS / 2])
+        for keypoint in keypoints[:count]:
+            radius = keypoint.size * self.tile_scale
+            transform = cv2.getRotationMatrix2D(keypoint.pt, keypoint.angle, TILE_PIXELS / (2 * radius))
+            transform[:, 2] += centre - np.array(keypoint.pt)
+            tiles.append(cv2.warpAffine(
+                gray, transform, (TILE_PIXELS, TILE_PIXELS),
+                flags=cv2.INTER_AREA, borderMode=cv2.BORDER_REFLECT
+            ))
+
+        if not tiles:
+            return np.empty((0, TILE_PIXELS, TILE_PIXELS), dtype=np.float32)
+        return np.stack(tiles).astype(np.float32)
+
+    def _hash_tiles(self, tiles: np.ndarray) -> np.ndarray:
+        # Flat tiles (sky, walls, blown highlights) hash alike across unrelated photos
+        tiles = tiles[tiles.reshape(len(tiles), -1).std(axis=1) >= self.min_contrast]
+        if not len(tiles):
+            return np.empty(0, dtype=np.uint64)
+
+        # Batched 2D DCT restricted to the HASH_SIZE x HASH_SIZE low frequencies
+        low = np.einsum("ij,njk,lk->nil", _DCT, tiles, _DCT, optimize=True).reshape(len(tiles), -1)
+        bits = low > np.median(low, axis=1, keepdims=True)
+        return (bits.astype(np.uint64) * _BIT_WEIGHTS).sum(axis=1, dtype=np.uint64)
+
+
+class TileHashIndex:
+    """Region-level duplicate index: tile hashes voting for the image they came from
+
+    Tile hashes live in one MultiIndexHashIndex, with a parallel array holding
+    the owning image's position. A query looks up each of its tiles within a
+    small radius and counts, per image, how many distinct tiles matched on
+    both sides; only images with enough votes become candidates. That keeps
+    partial reuse findable without comparing every pair of tiles.
+    """
+
+    def __init__(self):
+        self._index = MultiIndexHashIndex()
+        self._owners = np.empty(1024, dtype=np.int64)
+        self._size = 0
+        self._images = 0
+
+    def __len__(self) -> int:
+        """Number of images indexed"""
+        return self._images
+
+    def build(self, tile_hashes: np.ndarray, owners: np.ndarray, image_count: int) -> None:
+        """Rebuild from flat tile hashes and the image position each one belongs to"""
+        self._index.build(np.asarray(tile_hashes, dtype=np.uint64))
+        self._owners = np.array(owners, dtype=np.int64)
+        self._size = len(self._owners)
+        self._images = image_count
+
+    def add(self, tile_hashes: np.ndarray) -> int:
+        """Index one image's tiles and return its position"""
+        owner = self._images
+        self._images += 1
+
+        needed = self._size + len(tile_hashes)
+        if needed > len(self._owners):
+            grown = np.empty(max(needed, len(self._owners) * 2), dtype=np.int64)
+            grown[:self._size] = self._owners[:self._size]
+            self._owners = grown
+
+        for tile_hash in np.asarray(tile_hashes, dtype=np.uint64).tolist():
+            self._index.add(tile_hash)
+        self._owners[self._size:needed] = owner
+        self._size = needed
+        return owner
+
+    def search(self,
+               query_hashes: np.ndarray,
+               max_distance: int = 3,
+               min_votes: int = 3,
+               max_images_per_tile: int = 8) -> List[Tuple[int, int]]:
+        """(image position, votes) for images with at least min_votes matching tiles, most votes first
+
+        Query tiles that match more than max_images_per_tile images are generic
+        (edges, corners, texture) and do not vote.
+        """
+        query_ids, positions, _ = self._index.search_batch(query_hashes, max_distance)
+        if not len(positions):
+            return []
+
+        # One (query tile, image) pair per vote, dropping tiles that hit too many images
+        owners = self._owners[positions]
+        pairs = np.unique(query_ids * self._images + owners)
+        pair_queries, pair_owners = pairs // self._images, pairs % self._images
+        specific = np.bincount(pair_queries, minlength=len(query_hashes)) <= max_images_per_tile
+        keep_pairs = specific[pair_queries]
+        keep_matches = specific[query_ids]
+
+        # A vote needs a distinct query tile and a distinct stored tile
+        candidates, query_counts = np.unique(pair_owners[keep_pairs], return_counts=True)
+        stored_counts = np.unique(self._owners[np.unique(positions[keep_matches])], return_counts=True)[1]
+
+        votes = np.minimum(query_counts, stored_counts)
+        keep = votes >= min_votes
+        order = np.argsort(-votes[keep], kind="stable")
+        return list(zip(candidates[keep][order].tolist(), votes[keep][order].tolist()))
@@ -0,0 +1,92 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, List, Optional, Set
+
+
+class WriteBehindBuffer:
+    """Collects writes in memory and flushes them in batches by size or age
+
+    Items stay visible through `pending()` until the flush that carries them
+    has completed, so readers can serve read-your-writes for in-flight items
+    from the buffer. Flushes run in the background; a failed flush is logged
+    and its batch put back for the next attempt, so writers never see it.
+    """
+
+    def __init__(self,
+                 flush_fn: Callable[[List[Any]], Awaitable[None]],
+                 max_size: int = 64,
+                 max_delay: float = 1.0):
+        self.flush_fn = flush_fn
+        self.max_size = max(1, max_size)
+        self.max_delay = max_delay
+
+        self._buffer: Dict[Hashable, Any] = {}
+        self._flushing: Dict[Hashable, Any] = {}
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        self._tasks: Set[asyncio.Task] = set()
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def pending(self) -> List[Any]:
+        """Items not yet confirmed by a completed flush (newest write per key wins)"""
+        return list({**self._flushing, **self._buffer}.values())
+
+    def add(self, key: Hashable, item: Any):
+        """Buffer one item without waiting; a later add with the same key replaces it
+
+        A full buffer starts a flush in the background, so a caller can snapshot
+        pending() and add its own item with no await in between.
+        """
+        self._buffer[key] = item
+
+        if len(self._buffer) >= self.max_size:
+            self._start(self._flush_logged())
+        elif self._timer is None or self._timer.done():
+            self._timer = self._start(self._flush_after_delay())
+
+    async def flush(self):
+        """Write everything buffered so far in one batch (raises if the write fails)"""
+        async with self._lock:
+            if not self._buffer:
+                return
+
+            batch, self._buffer = self._buffer, {}
+            self._flushing = batch
+            try:
+                await self.flush_fn(list(batch.values()))
+            except Exception:
+                # Keep newer adds for the same key ahead of the failed batch
+                self._buffer = {**batch, **self._buffer}
+                raise
+            finally:
+                self._flushing = {}
+
+    async def close(self):
+        """Stop the timer, wait for background flushes and flush whatever is left"""
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self.flush()
+
+    def _start(self, coroutine) -> asyncio.Task:
+        # Hold a reference so the background flush is not garbage-collected mid-write
+        task = asyncio.create_task(coroutine)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+        return task
+
+    async def _flush_after_delay(self):
+        await asyncio.sleep(self.max_delay)
+        await self._flush_logged()
+
+    async def _flush_logged(self):
+        try:
+            await self.flush()
+        except Exception as e:
+            print(f"⚠️  Write-behind flush failed, retrying with the next batch: {e}")
+            # Nothing else may arrive to trigger the retry
+            if self._timer is None or self._timer.done():
+                self._timer = self._start(self._flush_after_delay())
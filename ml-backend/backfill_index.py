@@ -0,0 +1,201 @@
+"""
+Backfill: load an existing claim photo archive into the duplicate index
+Walks a directory (or reads a manifest), hashes images in a process pool after
+the same decode, resize and re-encode as a claim upload, and bulk-inserts
+them into the file store or Qdrant (USE_QDRANT) in batches.
+Progress is checkpointed after every batch, so an interrupted run resumes
+where it stopped.
+
+Manifest: a .csv with a "path" column and optional job_id, timestamp,
+policy_id and claim_location columns, or a plain text file with one path per
+line. Without a job_id the path relative to the archive root is used; without
+a timestamp, the file's modification time. A job_id (given or derived) longer
+than the stored 64 bytes is replaced by a stable UUIDv5 of it.
+
+Usage:
+    python backfill_index.py /archive/claims
+    python backfill_index.py --manifest archive.csv --workers 8 --batch-size 1000
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import os
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+from app.models.fraud_detector import FraudDetector
+from app.utils.image_utils import ImageProcessor
+from app.utils.perceptual_hash import PerceptualHasher
+
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".tif", ".tiff", ".webp"}
+
+# job_id is stored in a 64-byte field; longer ones get a stable UUIDv5
+MAX_JOB_ID_BYTES = 64
+BACKFILL_NAMESPACE = uuid.UUID("0e3f6a52-8d4b-4c71-b2a9-7f5c1d9e6b20")
+
+_hasher = None
+_processor = None
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+def hash_image(path):
+    """Worker: the hashes a claim upload of this file would store
+
+    The live pipeline takes the perceptual hashes from the processed JPEG
+    (decoded, resized to 1024 px and re-encoded by preprocessing), so the
+    archive file goes through the same steps first. The SHA-256 is of the
+    file itself, as for an upload.
+    """
+    global _hasher, _processor
+    if _hasher is None:
+        _hasher = PerceptualHasher()
+        _processor = ImageProcessor(reduced_decode=os.getenv("REDUCED_DECODE", "true").lower() == "true")
+
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+        hashes = _hasher.hash_bytes(_processor.processed_jpeg(data))
+        hashes["sha256"] = hashlib.sha256(data).hexdigest()
+        return hashes, None
+    except Exception as e:
+        return None, str(e)
+
+
+def stored_job_id(job_id):
+    """job_id as stored: one that would be truncated maps to its UUIDv5 instead"""
+    if len(job_id.encode("utf-8")) > MAX_JOB_ID_BYTES:
+        return str(uuid.uuid5(BACKFILL_NAMESPACE, job_id))
+    return job_id
+
+
+def default_job_id(path, root):
+    return stored_job_id(os.path.relpath(path, root) if root else path)
+
+
+def walk_archive(root):
+    """Image files under root in a stable order, so checkpoints stay valid"""
+    entries = []
+    for directory, subdirectories, files in os.walk(root):
+        subdirectories.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                entries.append({"path": os.path.join(directory, name)})
+    return entries
+
+
+def read_manifest(manifest_path):
+    with open(manifest_path, "r", newline="") as f:
+        if manifest_path.lower().endswith(".csv"):
+            return [dict(row) for row in csv.DictReader(f)]
+        return [{"path": line.strip()} for line in f if line.strip()]
+
+
+def load_checkpoint(checkpoint_path, source):
+    if not os.path.exists(checkpoint_path):
+        return 0
+
+    with open(checkpoint_path, "r") as f:
+        checkpoint = json.load(f)
+
+    if checkpoint.get("source") != source:
+        raise SystemExit(f"❌ Checkpoint {checkpoint_path} belongs to {checkpoint.get('source')}; "
+                         f"use --checkpoint or --restart")
+    return checkpoint["done"]
+
+
+def save_checkpoint(checkpoint_path, source, done, stats):
+    temp_path = f"{checkpoint_path}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"source": source, "done": done, "updated": datetime.now().isoformat(), **stats}, f)
+    os.replace(temp_path, checkpoint_path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("archive", nargs="?", help="Directory of historic claim images")
+    parser.add_argument("--manifest", help="CSV or text manifest instead of walking a directory")
+    parser.add_argument("--root", help="Base for relative manifest paths and default job IDs")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--checkpoint", default="data/backfill_checkpoint.json")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    if not args.archive and not args.manifest:
+        parser.error("give an archive directory or --manifest")
+
+    load_dotenv()
+
+    source = os.path.abspath(args.manifest or args.archive)
+    root = args.root or args.archive or os.path.dirname(source)
+    if args.manifest:
+        entries = read_manifest(args.manifest)
+        for entry in entries:
+            if not os.path.isabs(entry["path"]):
+                entry["path"] = os.path.join(root, entry["path"])
+    else:
+        entries = walk_archive(args.archive)
+
+    print_section("📦 Backfilling duplicate index")
+
+    detector = FraudDetector()
+    os.makedirs(os.path.dirname(args.checkpoint) or ".", exist_ok=True)
+    done = 0 if args.restart else load_checkpoint(args.checkpoint, source)
+
+    print(f"  • Source: {source}")
+    print(f"  • Images: {len(entries):,} ({done:,} already indexed)")
+    print(f"  • Backend: {'Qdrant' if detector.use_qdrant else 'file store'}, {args.workers} workers")
+
+    stats = {"indexed": 0, "failed": 0}
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers) as executor:
+        for batch_start in range(done, len(entries), args.batch_size):
+            batch = entries[batch_start:batch_start + args.batch_size]
+            results = executor.map(hash_image, [entry["path"] for entry in batch],
+                                   chunksize=max(1, len(batch) // (args.workers * 4)))
+
+            to_index = []
+            for entry, (hashes, error) in zip(batch, results):
+                if error:
+                    stats["failed"] += 1
+                    print(f"  ⚠️  {entry['path']}: {error}")
+                    continue
+                to_index.append({
+                    "hashes": hashes,
+                    "job_id": stored_job_id(entry["job_id"]) if entry.get("job_id")
+                        else default_job_id(entry["path"], root),
+                    "timestamp": entry.get("timestamp") or
+                        datetime.fromtimestamp(os.path.getmtime(entry["path"])).isoformat(),
+                    "policy_id": entry.get("policy_id", ""),
+                    "claim_location": entry.get("claim_location", "")
+                })
+
+            stats["indexed"] += detector.index_hashes(to_index)
+            done = batch_start + len(batch)
+            save_checkpoint(args.checkpoint, source, done, stats)
+
+            elapsed = time.perf_counter() - start
+            rate = (stats["indexed"] + stats["failed"]) / elapsed if elapsed else 0.0
+            print(f"  • {done:,}/{len(entries):,} images  |  {rate:,.1f} images/sec")
+
+    elapsed = time.perf_counter() - start
+    processed = stats["indexed"] + stats["failed"]
+    print_section("✅ Backfill complete")
+    print(f"  • Indexed: {stats['indexed']:,}  |  Failed: {stats['failed']:,}")
+    print(f"  • Time: {elapsed:.1f}s  |  Throughput: {processed / elapsed if elapsed else 0:,.1f} images/sec")
+
+
+if __name__ == "__main__":
+    main()
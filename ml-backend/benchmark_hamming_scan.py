@@ -0,0 +1,77 @@
+"""
+Benchmark: vectorized XOR + popcount linear scan over packed uint64 hash columns
+Compares single-query and batched scans of PackedHashColumns against the
+legacy per-record hex-string comparison.
+
+Usage:
+    python benchmark_hamming_scan.py
+    python benchmark_hamming_scan.py --size 2000000 --batch 256
+"""
+
+import argparse
+import time
+import numpy as np
+
+from app.utils.hamming import HASH_FIELDS, PackedHashColumns, popcount64
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+def timed(fn, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=5_000_000)
+    parser.add_argument("--batch", type=int, default=100)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--legacy-sample", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    max_hamming = int((1 - args.threshold) * 64)
+
+    print_section(f"🧮 Linear scan over {args.size:,} hashes (radius {max_hamming} bits)")
+    print(f"  • Popcount backend: {'np.bitwise_count' if hasattr(np, 'bitwise_count') else 'SWAR fallback'}")
+
+    records = np.zeros(args.size, dtype=[(field, "<u8") for field in HASH_FIELDS])
+    for field in HASH_FIELDS:
+        records[field] = rng.integers(0, 2**64 - 1, size=args.size, dtype=np.uint64, endpoint=True)
+    columns = PackedHashColumns.from_records(records)
+
+    query = int(columns.column("phash")[0])
+    single_ms = timed(lambda: columns.search("phash", query, max_hamming), repeat=5)
+    print(f"  • Single query: {single_ms:.1f} ms")
+
+    queries = rng.integers(0, 2**64 - 1, size=args.batch, dtype=np.uint64, endpoint=True)
+    batch_ms = timed(lambda: columns.search_batch("phash", queries, max_hamming), repeat=2)
+    print(f"  • Batch of {args.batch}: {batch_ms:.1f} ms ({batch_ms / args.batch:.2f} ms/query)")
+
+    all_columns_ms = timed(
+        lambda: [popcount64(columns.column(field) ^ np.uint64(query)) for field in HASH_FIELDS], repeat=3
+    )
+    print(f"  • All four hash columns, one query: {all_columns_ms:.1f} ms")
+
+    sample = [format(int(h), "016x") for h in columns.column("phash")[:args.legacy_sample]]
+    query_hex = format(query, "016x")
+    start = time.perf_counter()
+    for stored in sample:
+        sum(c1 != c2 for c1, c2 in zip(query_hex, stored))
+    legacy_ms = (time.perf_counter() - start) / len(sample) * args.size * 1000
+    print(f"  • Legacy hex comparison (extrapolated): {legacy_ms:,.0f} ms")
+    print(f"  • Speedup (single query): {legacy_ms / single_ms:,.0f}x")
+
+
+if __name__ == "__main__":
+    main()
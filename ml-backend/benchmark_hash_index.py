@@ -0,0 +1,109 @@
+"""
+Benchmark: phash radius search with MultiIndexHashIndex vs the legacy linear scan
+Builds indexes of random 64-bit hashes (1M and 10M by default), plants
+near-duplicates and reports build time, query latency and candidate counts.
+
+Usage:
+    python benchmark_hash_index.py
+    python benchmark_hash_index.py --sizes 1000000 --queries 500
+"""
+
+import argparse
+import time
+import numpy as np
+
+from app.utils.hash_index import MultiIndexHashIndex
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+def legacy_scan(stored_hex, query_hex, max_hamming):
+    """Per-record Python loop as in the original _check_duplicate_file"""
+    matches = []
+    for position, stored in enumerate(stored_hex):
+        distance = sum(c1 != c2 for c1, c2 in zip(query_hex, stored))
+        if distance <= max_hamming:
+            matches.append((position, distance))
+    return matches
+
+
+def flip_bits(value, rng, bits):
+    for bit in rng.choice(64, size=bits, replace=False):
+        value ^= 1 << int(bit)
+    return value
+
+
+def benchmark_size(size, num_queries, max_hamming, legacy_sample, rng):
+    print_section(f"📦 {size:,} stored hashes (radius {max_hamming} bits)")
+
+    hashes = rng.integers(0, 2**63, size=size, dtype=np.int64).astype(np.uint64)
+    hashes ^= rng.integers(0, 2, size=size, dtype=np.int64).astype(np.uint64) << np.uint64(63)
+
+    start = time.perf_counter()
+    index = MultiIndexHashIndex()
+    index.build(hashes.tolist())
+    print(f"  • Build time: {time.perf_counter() - start:.2f}s")
+
+    # Half the queries are near-duplicates of stored hashes, half are random
+    queries = []
+    for i in range(num_queries):
+        if i % 2 == 0:
+            source = int(hashes[rng.integers(0, size)])
+            queries.append(flip_bits(source, rng, int(rng.integers(0, max_hamming + 1))))
+        else:
+            queries.append(int(rng.integers(0, 2**63)) | (int(rng.integers(0, 2)) << 63))
+
+    latencies = []
+    found = 0
+    for query in queries:
+        start = time.perf_counter()
+        matches = index.search(query, max_hamming)
+        latencies.append(time.perf_counter() - start)
+        found += len(matches)
+
+    latencies_ms = np.array(latencies) * 1000
+    print(f"  • Query latency: mean {latencies_ms.mean():.2f} ms, "
+          f"p50 {np.percentile(latencies_ms, 50):.2f} ms, "
+          f"p99 {np.percentile(latencies_ms, 99):.2f} ms")
+    print(f"  • Matches found: {found} over {num_queries} queries")
+
+    # Correctness spot-check against an exhaustive scan
+    for query in queries[:5]:
+        xor = hashes ^ np.uint64(query)
+        distances = np.unpackbits(xor.view(np.uint8).reshape(-1, 8), axis=1).sum(axis=1)
+        expected = [(int(p), int(distances[p])) for p in np.nonzero(distances <= max_hamming)[0]]
+        assert index.search(query, max_hamming) == expected, "index disagrees with exhaustive scan"
+    print("  • Spot-check vs exhaustive scan: ✓")
+
+    # Legacy cost measured on a sample and extrapolated to the full size
+    sample = [format(int(h), "016x") for h in hashes[:legacy_sample]]
+    start = time.perf_counter()
+    legacy_scan(sample, format(queries[0], "016x"), max_hamming)
+    per_record = (time.perf_counter() - start) / len(sample)
+    legacy_ms = per_record * size * 1000
+    print(f"  • Legacy linear scan (extrapolated): {legacy_ms:,.0f} ms per query")
+    print(f"  • Speedup (mean): {legacy_ms / latencies_ms.mean():,.0f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000_000, 10_000_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--threshold", type=float, default=0.9)
+    parser.add_argument("--legacy-sample", type=int, default=200_000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    max_hamming = int((1 - args.threshold) * 64)
+    rng = np.random.default_rng(args.seed)
+
+    for size in args.sizes:
+        benchmark_size(size, args.queries, max_hamming, min(args.legacy_sample, size), rng)
+
+
+if __name__ == "__main__":
+    main()
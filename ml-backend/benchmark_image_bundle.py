@@ -0,0 +1,169 @@
+"""
+Benchmark: per-claim image I/O and CPU, path hand-off vs the decode-once ImageBundle
+Replays the image handling of one claim without the models: before, every
+stage took the processed file's path (cv2.imread for preprocessing, YOLO and
+the annotation, two file reads + base64 for LLaVA, a PIL decode for the
+hashes); with the bundle the upload is read and decoded once and each stage
+takes the cached view sized for it (YOLO's 640 px input, a compact JPEG at
+the VLM's resolution). Reports bytes read and written, decodes and encodes,
+base64 sent to LLaVA, wall and CPU time per claim, and checks that the
+hashes do not change.
+
+Usage:
+    python benchmark_image_bundle.py
+    python benchmark_image_bundle.py --width 4000 --height 3000 --claims 20
+"""
+
+import argparse
+import base64
+import hashlib
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app.utils.image_bundle import ImageBundle
+from app.utils.image_utils import ImageProcessor
+from app.utils.perceptual_hash import PerceptualHasher
+from benchmark_tile_index import synthetic_photo
+
+DETECTIONS = [(120, 80, 620, 430), (300, 200, 900, 700)]
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+class Counters:
+    def __init__(self):
+        self.read = self.written = self.decodes = self.encodes = self.payload = 0
+
+    def read_file(self, path):
+        with open(path, "rb") as f:
+            data = f.read()
+        self.read += len(data)
+        return data
+
+    def imread(self, path):
+        self.read += os.path.getsize(path)
+        self.decodes += 1
+        return cv2.imread(path)
+
+    def imwrite(self, path, image):
+        self.encodes += 1
+        cv2.imwrite(path, image)
+        self.written += os.path.getsize(path)
+
+
+def annotate(image, path, counters):
+    """The drawing generate_annotated_image does, then its write"""
+    for x1, y1, x2, y2 in DETECTIONS:
+        cv2.rectangle(image, (x1, y1), (x2, y2), (0, 255, 0), 2)
+    counters.imwrite(path, image)
+
+
+def claim_with_paths(upload_path, directory, processor, hasher, counters):
+    image = cv2.cvtColor(counters.imread(upload_path), cv2.COLOR_BGR2RGB)
+    resized = processor.resize_image(image)
+    processed_path = os.path.join(directory, "processed.jpg")
+    counters.imwrite(processed_path, cv2.cvtColor(resized, cv2.COLOR_RGB2BGR))
+
+    counters.imread(processed_path)  # YOLO loads the path with cv2.imread
+    annotate(counters.imread(processed_path), os.path.join(directory, "annotated.jpg"), counters)
+    for _ in range(2):  # analyze_damage and check_consistency
+        counters.payload += len(base64.b64encode(counters.read_file(processed_path)).decode("utf-8"))
+
+    data = counters.read_file(processed_path)
+    counters.decodes += 1
+    hashes = hasher.hash_bytes(data)
+    hashes["sha256"] = hashlib.sha256(data).hexdigest()
+    return hashes
+
+
+def claim_with_bundle(upload_path, directory, processor, hasher, counters, write_processed):
+    data = counters.read_file(upload_path)
+    counters.decodes += 1
+    image = processor.decode_image(data)
+    bundle = ImageBundle(data, image, processor.resize_image(image), path=upload_path)
+    counters.encodes += 1  # processed_jpeg, built once
+    if write_processed:
+        bundle.write_processed(os.path.join(directory, "processed.jpg"))
+        counters.written += len(bundle.processed_jpeg)
+
+    bundle.yolo_input
+    annotate(bundle.processed_bgr.copy(), os.path.join(directory, "annotated.jpg"), counters)
+    counters.encodes += 1  # the VLM view
+    for _ in range(2):
+        counters.payload += len(bundle.vlm_base64)
+
+    counters.decodes += 1  # the hashes decode the processed JPEG, as they always have
+    hashes = hasher.hash_bytes(bundle.processed_jpeg)
+    hashes["sha256"] = hashlib.sha256(bundle.processed_jpeg).hexdigest()
+    return hashes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=10)
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    # Full-resolution decodes in both variants, so only the hand-off differs
+    processor = ImageProcessor(reduced_decode=False)
+    hasher = PerceptualHasher()
+
+    with tempfile.TemporaryDirectory() as directory:
+        uploads = []
+        for i in range(args.claims):
+            path = os.path.join(directory, f"upload_{i}.jpg")
+            cv2.imwrite(path, synthetic_photo(rng, args.width, args.height), [cv2.IMWRITE_JPEG_QUALITY, 92])
+            uploads.append(path)
+
+        print_section(f"🖼️  {args.claims} claims, {args.width}×{args.height} uploads "
+                      f"({os.path.getsize(uploads[0]) / 1e6:.1f} MB)")
+
+        variants = {
+            "paths": lambda path, counters: claim_with_paths(path, directory, processor, hasher, counters),
+            "bundle + processed file": lambda path, counters: claim_with_bundle(
+                path, directory, processor, hasher, counters, write_processed=True),
+            "bundle, no processed file": lambda path, counters: claim_with_bundle(
+                path, directory, processor, hasher, counters, write_processed=False),
+        }
+
+        # Interleave the variants claim by claim so drift in machine load hits all of them alike
+        counters = {name: Counters() for name in variants}
+        wall = {name: [] for name in variants}
+        cpu = {name: [] for name in variants}
+        same = {name: True for name in variants}
+        for index, path in enumerate([uploads[0]] + uploads):
+            warmup = index == 0  # warms caches and is not counted
+            hashes = {}
+            for name, run in variants.items():
+                claim_counters = Counters() if warmup else counters[name]
+                wall_start, cpu_start = time.perf_counter(), time.process_time()
+                hashes[name] = run(path, claim_counters)
+                if not warmup:
+                    wall[name].append((time.perf_counter() - wall_start) * 1000)
+                    cpu[name].append((time.process_time() - cpu_start) * 1000)
+                    same[name] &= hashes[name] == hashes["paths"]
+
+        for name in variants:
+            print(f"  • {name:<26} wall {np.median(wall[name]):6.1f} ms  CPU {np.median(cpu[name]):6.1f} ms  |  "
+                  f"read {counters[name].read / args.claims / 1e6:5.2f} MB  "
+                  f"written {counters[name].written / args.claims / 1e6:4.2f} MB  "
+                  f"decodes {counters[name].decodes // args.claims}  encodes {counters[name].encodes // args.claims}  "
+                  f"LLaVA {counters[name].payload / args.claims / 1e3:4.0f} kB"
+                  + ("" if name == "paths" else f"  |  hashes {'✅ same' if same[name] else '❌ differ'}"))
+
+        print(f"\n  • CPU per claim without the processed file: "
+              f"{np.median(cpu['bundle, no processed file']) / np.median(cpu['paths']):.0%} of the path hand-off")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark: full-resolution vs DCT-scaled JPEG decoding of oversized uploads
+Writes phone-sized JPEGs (12, 24 and 48 MP by default) and times
+ImageProcessor.load_image + resize_image with reduced_decode off and on.
+Each measurement runs in a fresh process, so peak RSS is that of one claim's
+decode. Also reports how close the 1024 px results are (PSNR).
+
+Usage:
+    python benchmark_reduced_decode.py
+    python benchmark_reduced_decode.py --megapixels 12 50 --repeats 10
+"""
+
+import argparse
+import math
+import multiprocessing
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app.utils.image_utils import ImageProcessor
+from benchmark_tile_index import synthetic_photo
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+def memory_kb(field):
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith(field):
+                return int(line.split()[1])
+    return 0
+
+
+def write_photo(path, megapixels, seed):
+    height = int(math.sqrt(megapixels * 1e6 * 3 / 4))
+    photo = synthetic_photo(np.random.default_rng(seed), height * 4 // 3, height)
+    cv2.imwrite(path, photo, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return photo.shape[1], photo.shape[0]
+
+
+def decode(path, reduced_decode, repeats):
+    """(median ms, peak RSS growth in MB, decoded shape, 1024 px image) in a fresh process"""
+    processor = ImageProcessor(reduced_decode=reduced_decode)
+    baseline = memory_kb("VmRSS")
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        image = processor.load_image(path)
+        resized = processor.resize_image(image)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.median(timings), (memory_kb("VmHWM") - baseline) / 1024, image.shape, resized
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--megapixels", type=float, nargs="+", default=[12, 24, 48])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context("fork")
+
+    def isolated(function, *function_args):
+        with context.Pool(processes=1) as pool:
+            return pool.apply(function, function_args)
+
+    with tempfile.TemporaryDirectory() as directory:
+        print_section(f"🗜️  Decode + resize to 1024 px, median of {args.repeats} runs")
+        for megapixels in args.megapixels:
+            path = os.path.join(directory, f"photo_{megapixels:g}mp.jpg")
+            width, height = isolated(write_photo, path, megapixels, args.seed)
+
+            full_ms, full_mb, full_shape, full = isolated(decode, path, False, args.repeats)
+            reduced_ms, reduced_mb, reduced_shape, reduced = isolated(decode, path, True, args.repeats)
+
+            print(f"  • {width}×{height} ({os.path.getsize(path) / 1e6:.1f} MB): "
+                  f"full {full_ms:6.1f} ms / {full_mb:5.0f} MB peak  |  "
+                  f"scaled to {reduced_shape[1]}×{reduced_shape[0]} {reduced_ms:5.1f} ms / {reduced_mb:4.0f} MB peak  |  "
+                  f"{full_ms / reduced_ms:.1f}x faster, {full_mb / max(reduced_mb, 1):.1f}x less memory, "
+                  f"PSNR {cv2.PSNR(full, reduced):.1f} dB")
+            assert full.shape == reduced.shape, "scaled decode changed the processed size"
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Benchmark: claims run inline on the event loop vs through the StageExecutor pools
+Runs the real PreprocessingService (decode, resize, ELA, processed and
+thumbnail writes) followed by a stand-in for detection: OpenCV work on the
+YOLO input and the annotation, and two blocking sleeps for the Ollama calls
+(requests.post releases the GIL while it waits). Claims are submitted N at a
+time; a heartbeat task on the same event loop measures how long a request
+such as /health would have waited.
+
+Usage:
+    python benchmark_stage_executor.py
+    python benchmark_stage_executor.py --claims 32 --concurrency 1 4 8 --vlm-ms 200
+    python benchmark_stage_executor.py --png   # metadata through PIL/exifread in the process pool
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app.services.preprocessing import PreprocessingService
+from app.utils.stage_executor import StageExecutor
+from benchmark_tile_index import synthetic_photo
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+class InlineExecutor:
+    """Runs every stage on the event loop, as the pipeline did before the pools"""
+
+    async def run_thread(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+    async def run_process(self, fn, *args, **kwargs):
+        return fn(*args, **kwargs)
+
+
+def detect(bundle, vlm_ms):
+    """Stand-in for DetectionService's blocking stages"""
+    edges = cv2.Canny(cv2.GaussianBlur(bundle.yolo_input, (9, 9), 0), 50, 150)
+    annotated = bundle.processed_bgr.copy()
+    for x, y, w, h in [cv2.boundingRect(c) for c in cv2.findContours(edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)[0][:20]]:
+        cv2.rectangle(annotated, (x, y), (x + w, y + h), (0, 255, 0), 2)
+    cv2.imencode(".jpg", annotated)
+    bundle.vlm_base64
+    time.sleep(vlm_ms / 1000)  # analyze_damage
+    time.sleep(vlm_ms / 1000)  # check_consistency
+    bundle.processed_jpeg
+
+
+async def run(uploads, executor, concurrency, vlm_ms, directory):
+    service = PreprocessingService(upload_dir=directory, executor=executor)
+    semaphore = asyncio.Semaphore(concurrency)
+    lags = []
+    done = False
+
+    async def heartbeat(interval=0.005):
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(interval)
+            lags.append((time.perf_counter() - start - interval) * 1000)
+
+    async def claim(data):
+        async with semaphore:
+            result = await service.process_claim_image(None, "2024-01-01", "Rear bumper dented", image_bytes=data)
+            await executor.run_thread(detect, result["bundle"], vlm_ms)
+
+    beat = asyncio.create_task(heartbeat())
+    await asyncio.sleep(0)
+    start = time.perf_counter()
+    await asyncio.gather(*(claim(data) for data in uploads))
+    elapsed = time.perf_counter() - start
+    done = True
+    await beat
+    return elapsed, lags
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--claims", type=int, default=16)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--threads", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=1)
+    parser.add_argument("--vlm-ms", type=float, default=100, help="simulated duration of each Ollama call")
+    parser.add_argument("--width", type=int, default=4000)
+    parser.add_argument("--height", type=int, default=3000)
+    parser.add_argument("--png", action="store_true", help="upload PNGs (no JPEG header fast path)")
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    extension = ".png" if args.png else ".jpg"
+    uploads = [cv2.imencode(extension, synthetic_photo(rng, args.width, args.height))[1].tobytes()
+               for _ in range(min(args.claims, 4))]
+    uploads = [uploads[i % len(uploads)] for i in range(args.claims)]
+
+    executor = StageExecutor(thread_workers=args.threads, process_workers=args.processes)
+    executor.start()
+
+    print_section(f"🧵 {args.claims} claims, {args.width}×{args.height} {extension[1:].upper()} uploads "
+                  f"({len(uploads[0]) / 1e6:.1f} MB), Ollama calls {args.vlm_ms:g} ms each, "
+                  f"{args.threads} threads / {args.processes} processes")
+    baseline = None
+    with tempfile.TemporaryDirectory() as directory:
+        asyncio.run(run(uploads[:1], executor, 1, 0, directory))  # warm-up, not counted
+        for name, stage_executor, levels in [("inline", InlineExecutor(), args.concurrency[-1:]),
+                                             ("stage executor", executor, args.concurrency)]:
+            for concurrency in levels:
+                elapsed, lags = asyncio.run(run(uploads, stage_executor, concurrency, args.vlm_ms, directory))
+                throughput = args.claims / elapsed
+                baseline = baseline or throughput
+                print(f"  • {name:<15} {concurrency:>2} at a time: {throughput:5.2f} claims/s "
+                      f"({throughput / baseline:.1f}x)  |  event loop stalls p99 {np.percentile(lags, 99):7.1f} ms, "
+                      f"max {max(lags):7.1f} ms")
+
+    executor.shutdown()
+    print(f"\n  • CPUs available: {len(os.sched_getaffinity(0))}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Benchmark: error level analysis tamper screen
+Builds clean photos (one JPEG save) and spliced ones (a region pasted from a
+photo with a different compression history, then saved again), runs
+ImageProcessor.error_level_analysis on each and reports the tamper score
+distribution, how many spliced photos each ELA_GATE_SCORE would send to
+manual review, and the per-image cost.
+
+Usage:
+    python benchmark_tamper_screen.py
+    python benchmark_tamper_screen.py --photos 100 --width 4000 --height 3000
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from app.utils.image_utils import ImageProcessor
+from benchmark_tile_index import synthetic_photo
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+def jpeg(image, quality):
+    return cv2.imdecode(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])[1], cv2.IMREAD_COLOR)
+
+
+def donor_region(rng, width, height):
+    """A photo with another history: a low-quality web copy scaled back up, or a q70 camera JPEG"""
+    donor = synthetic_photo(rng, width, height)
+    if rng.random() < 0.5:
+        small = jpeg(cv2.resize(donor, None, fx=0.4, fy=0.4, interpolation=cv2.INTER_AREA), 60)
+        return cv2.resize(small, (width, height), interpolation=cv2.INTER_LINEAR)
+    return jpeg(donor, 70)
+
+
+def spliced_photo(rng, width, height):
+    base = jpeg(synthetic_photo(rng, width, height), 85)
+    donor = donor_region(rng, width, height)
+    region_height = int(rng.uniform(0.15, 0.35) * height)
+    region_width = int(rng.uniform(0.1, 0.3) * width)
+    top, left = int(rng.integers(0, height - region_height)), int(rng.integers(0, width - region_width))
+    base[top:top + region_height, left:left + region_width] = donor[top:top + region_height, left:left + region_width]
+    return jpeg(base, rng.choice([80, 90, 95]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=40, help="Clean and spliced photos each")
+    parser.add_argument("--width", type=int, default=1024)
+    parser.add_argument("--height", type=int, default=768)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    processor = ImageProcessor()
+
+    print_section(f"🔬 ELA tamper screen: {args.photos} clean + {args.photos} spliced, {args.width}×{args.height}")
+
+    scores, latencies = {"clean": [], "spliced": []}, []
+    for _ in range(args.photos):
+        clean = jpeg(synthetic_photo(rng, args.width, args.height), rng.integers(75, 96))
+        for kind, photo in (("clean", clean), ("spliced", spliced_photo(rng, args.width, args.height))):
+            image = cv2.cvtColor(photo, cv2.COLOR_BGR2RGB)
+            start = time.perf_counter()
+            result = processor.error_level_analysis(image)
+            latencies.append((time.perf_counter() - start) * 1000)
+            scores[kind].append(result["tamper_score"])
+
+    for kind, values in scores.items():
+        print(f"  • {kind:<8} tamper score median {np.median(values):.1f}, "
+              f"p90 {np.percentile(values, 90):.1f}, max {np.max(values):.1f}")
+
+    print_section("🚦 Gate (ELA_GATE_SCORE)")
+    for gate in (1, 3, 5):
+        flagged = {kind: sum(score >= gate for score in values) for kind, values in scores.items()}
+        print(f"  • ≥ {gate}: spliced {flagged['spliced']}/{args.photos}, clean {flagged['clean']}/{args.photos}")
+
+    print_section("⏱️  Cost per image")
+    print(f"  • median {np.median(latencies):.1f} ms, p95 {np.percentile(latencies, 95):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Benchmark: EXIF thumbnail prefilter vs full-resolution hashing
+Indexes a file store of camera photos (plus random background hashes), then
+queries it with re-uploads of stored photos and with new photos, all carrying
+a 160×120 EXIF thumbnail (letterboxed for 16:9 frames, as cameras do). Reports
+what FraudDetector.thumbnail_prefilter costs next to hashing the full image,
+how often it already names the stored original, and how many candidates it
+returns for photos that are not duplicates.
+
+Runs in a temporary directory, so the real data/ store is not touched.
+
+Usage:
+    python benchmark_thumbnail_prefilter.py
+    python benchmark_thumbnail_prefilter.py --width 4000 --height 3000 --background 1000000
+"""
+
+import argparse
+import os
+import struct
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from app.models.fraud_detector import FraudDetector
+from benchmark_tile_index import synthetic_photo
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+def exif_with_thumbnail(thumbnail):
+    """Exif APP1 segment whose IFD1 points at a JPEG thumbnail (little-endian TIFF)"""
+    ifd0 = struct.pack("<HL", 0, 14)
+    ifd1 = struct.pack("<H", 2)
+    ifd1 += struct.pack("<HHLL", 0x0201, 4, 1, 44)
+    ifd1 += struct.pack("<HHLL", 0x0202, 4, 1, len(thumbnail))
+    ifd1 += struct.pack("<L", 0)
+    payload = b"Exif\x00\x00" + b"II*\x00" + struct.pack("<L", 8) + ifd0 + ifd1 + thumbnail
+    return b"\xff\xe1" + struct.pack(">H", len(payload) + 2) + payload
+
+
+def camera_jpeg(photo, quality):
+    """JPEG bytes of a BGR frame with a camera-style 160×120 thumbnail"""
+    height, width = photo.shape[:2]
+    scale = min(160 / width, 120 / height)
+    content = cv2.resize(photo, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    canvas = np.zeros((120, 160, 3), dtype=np.uint8)
+    top, left = (120 - content.shape[0]) // 2, (160 - content.shape[1]) // 2
+    canvas[top:top + content.shape[0], left:left + content.shape[1]] = content
+
+    thumbnail = cv2.imencode(".jpg", canvas, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+    main = cv2.imencode(".jpg", photo, [cv2.IMWRITE_JPEG_QUALITY, int(quality)])[1].tobytes()
+    return main[:2] + exif_with_thumbnail(thumbnail) + main[2:]
+
+
+def random_hashes(rng, count):
+    values = rng.integers(0, 2**63, size=(count, 4), dtype=np.int64)
+    return [{field: f"{int(value):016x}" for field, value in zip(("phash", "dhash", "whash", "average_hash"), row)}
+            for row in values]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--photos", type=int, default=40, help="Stored photos; as many re-uploads and new photos")
+    parser.add_argument("--background", type=int, default=100000, help="Random stored hashes around them")
+    parser.add_argument("--width", type=int, default=3000)
+    parser.add_argument("--height", type=int, default=2250)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    workdir = os.getcwd()
+    with tempfile.TemporaryDirectory() as directory:
+        os.chdir(directory)
+        os.makedirs("data")
+        try:
+            detector = FraudDetector(use_qdrant=False)
+
+            def frame():
+                # One in four frames is 16:9, whose thumbnail is letterboxed
+                height = args.width * 9 // 16 if rng.random() < 0.25 else args.height
+                return synthetic_photo(rng, args.width, height)
+
+            print_section(f"📥 Indexing {args.photos} photos + {args.background:,} background hashes")
+            originals = [frame() for _ in range(args.photos)]
+            entries = [{"job_id": f"background-{i}", "hashes": hashes}
+                       for i, hashes in enumerate(random_hashes(rng, args.background))]
+            for i, photo in enumerate(originals):
+                data = camera_jpeg(photo, 92)
+                entries.append({"job_id": f"stored-{i}", "hashes": detector.hasher.hash_bytes(data)})
+            detector.index_hashes(entries)
+            print(f"  • {len(entries):,} records stored")
+
+            queries = [(f"stored-{i}", camera_jpeg(photo, rng.integers(75, 96))) for i, photo in enumerate(originals)]
+            queries += [(None, camera_jpeg(frame(), 92)) for _ in range(args.photos)]
+
+            print_section(f"🔎 {len(queries)} queries ({args.width}px wide)")
+            prefilter_ms, full_ms = [], []
+            found, missed, false_candidates = 0, 0, []
+            for expected, data in queries:
+                path = os.path.join(directory, "query.jpg")
+                with open(path, "wb") as f:
+                    f.write(data)
+
+                prefilter = detector.thumbnail_prefilter(path)
+                prefilter_ms.append(prefilter["elapsed_ms"])
+
+                start = time.perf_counter()
+                detector.compute_perceptual_hash(path)
+                full_ms.append((time.perf_counter() - start) * 1000)
+
+                if expected is None:
+                    false_candidates.append(prefilter["candidate_count"])
+                elif expected in prefilter["candidates"]:
+                    found += 1
+                else:
+                    missed += 1
+
+            print(f"  • Thumbnail prefilter: median {np.median(prefilter_ms):.2f} ms, "
+                  f"p95 {np.percentile(prefilter_ms, 95):.2f} ms")
+            print(f"  • Full-image hashes:   median {np.median(full_ms):.1f} ms, "
+                  f"p95 {np.percentile(full_ms, 95):.1f} ms "
+                  f"({np.median(full_ms) / max(np.median(prefilter_ms), 1e-9):.0f}x)")
+
+            print_section("🎯 Candidates")
+            print(f"  • Re-uploads whose original the thumbnail already names: {found}/{args.photos} "
+                  f"({missed} left to the full-image hashes)")
+            print(f"  • Candidates per new photo: mean {np.mean(false_candidates):.2f}, "
+                  f"max {np.max(false_candidates)}")
+        finally:
+            os.chdir(workdir)
+
+
+if __name__ == "__main__":
+    main()
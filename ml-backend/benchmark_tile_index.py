@@ -0,0 +1,147 @@
+"""
+Benchmark: crop- and transform-invariant duplicate detection with the tile-hash index
+Indexes source photos among --size images (the rest are distractors with
+random tile hashes), then queries with cropped, mirrored, rotated and
+recompressed copies of the sources. Reports recall per transform, false
+positives for unrelated photos, and query latency.
+
+Usage:
+    python benchmark_tile_index.py
+    python benchmark_tile_index.py --size 1000000 --sources 200 --images /path/to/claim/photos
+"""
+
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from app.utils.hash_store import MAX_STORED_TILES
+from app.utils.tile_hash import TileHasher, TileHashIndex
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+def synthetic_photo(rng, width=1024, height=768):
+    """Cluttered scene: gradient background, random shapes, noise and a little blur"""
+    y, x = np.mgrid[0:height, 0:width]
+    base = (x / width * rng.uniform(40, 120) + y / height * rng.uniform(40, 120))[..., None]
+    image = np.clip(base + rng.uniform(0, 80, 3), 0, 255).astype(np.uint8).copy()
+
+    for _ in range(rng.integers(25, 45)):
+        color = tuple(int(c) for c in rng.integers(0, 256, 3))
+        kind = rng.integers(0, 3)
+        cx, cy = int(rng.integers(0, width)), int(rng.integers(0, height))
+        if kind == 0:
+            cv2.circle(image, (cx, cy), int(rng.integers(10, 120)), color, -1)
+        elif kind == 1:
+            cv2.rectangle(image, (cx, cy), (cx + int(rng.integers(20, 250)), cy + int(rng.integers(20, 250))), color, -1)
+        else:
+            points = rng.integers(0, [width, height], size=(int(rng.integers(3, 7)), 2)).astype(np.int32)
+            cv2.fillPoly(image, [points], color)
+
+    noisy = image.astype(np.float32) + rng.normal(0, 6, image.shape)
+    return cv2.GaussianBlur(np.clip(noisy, 0, 255).astype(np.uint8), (3, 3), 0)
+
+
+def jpeg(image, quality):
+    return cv2.imdecode(cv2.imencode(".jpg", image, [cv2.IMWRITE_JPEG_QUALITY, quality])[1], cv2.IMREAD_COLOR)
+
+
+def rotate(image, degrees):
+    height, width = image.shape[:2]
+    transform = cv2.getRotationMatrix2D((width / 2, height / 2), degrees, 1.0)
+    return cv2.warpAffine(image, transform, (width, height), borderMode=cv2.BORDER_REFLECT)
+
+
+def crop(image, top, left, bottom, right):
+    height, width = image.shape[:2]
+    return image[int(top * height):int(bottom * height), int(left * width):int(right * width)]
+
+
+TRANSFORMS = {
+    "mirror": lambda image: image[:, ::-1],
+    "rotate 90°": lambda image: np.rot90(image),
+    "rotate 10°": lambda image: rotate(image, 10),
+    "crop 80% (centre)": lambda image: crop(image, 0.1, 0.1, 0.9, 0.9),
+    "crop 60% (corner)": lambda image: crop(image, 0.0, 0.0, 0.6, 0.6),
+    "crop 70% + mirror": lambda image: crop(image, 0.15, 0.3, 1.0, 1.0)[:, ::-1],
+    "half size + JPEG q50": lambda image: jpeg(cv2.resize(image, None, fx=0.5, fy=0.5,
+                                                          interpolation=cv2.INTER_AREA), 50),
+}
+
+
+def load_sources(args, rng):
+    if args.images:
+        names = sorted(os.listdir(args.images))
+        images = [cv2.imread(os.path.join(args.images, name)) for name in names]
+        return [image for image in images if image is not None][:args.sources]
+    return [synthetic_photo(rng) for _ in range(args.sources)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1_000_000, help="Total indexed images")
+    parser.add_argument("--sources", type=int, default=100, help="Indexed real/synthetic photos that get queried")
+    parser.add_argument("--unrelated", type=int, default=100, help="Unindexed photos queried for false positives")
+    parser.add_argument("--images", help="Directory of real photos to use as sources")
+    parser.add_argument("--max-distance", type=int, default=3)
+    parser.add_argument("--min-votes", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    hasher = TileHasher()
+
+    print_section(f"🧩 Tile-hash index: {args.size:,} images")
+
+    sources = load_sources(args, rng)
+    stored = [hasher.stored_hashes(image) for image in sources]
+
+    # Distractors with random tile hashes fill the index up to --size images
+    distractors = max(0, args.size - len(sources))
+    tile_hashes = [rng.integers(0, 2**64 - 1, size=(distractors, MAX_STORED_TILES), dtype=np.uint64, endpoint=True).ravel()]
+    owners = [np.repeat(np.arange(distractors), MAX_STORED_TILES)]
+    for position, hashes in enumerate(stored):
+        tile_hashes.append(hashes)
+        owners.append(np.full(len(hashes), distractors + position))
+
+    start = time.perf_counter()
+    index = TileHashIndex()
+    index.build(np.concatenate(tile_hashes), np.concatenate(owners), distractors + len(sources))
+    print(f"  • Indexed {len(index):,} images / {sum(map(len, tile_hashes)):,} tiles "
+          f"in {time.perf_counter() - start:.1f}s")
+    print(f"  • Stored tiles per source photo: {np.mean([len(h) for h in stored]):.1f}")
+
+    hash_ms, search_ms = [], []
+
+    def query(image):
+        start = time.perf_counter()
+        hashes = hasher.query_hashes(np.ascontiguousarray(image))
+        middle = time.perf_counter()
+        found = index.search(hashes, args.max_distance, args.min_votes)
+        hash_ms.append((middle - start) * 1000)
+        search_ms.append((time.perf_counter() - middle) * 1000)
+        return [owner for owner, _ in found]
+
+    print_section("🎯 Recall by transform")
+    for name, transform in TRANSFORMS.items():
+        hits = sum(distractors + position in query(transform(image)) for position, image in enumerate(sources))
+        print(f"  • {name:<22} {hits / len(sources):6.1%}  ({hits}/{len(sources)})")
+
+    unrelated = [synthetic_photo(rng) for _ in range(args.unrelated)]
+    false_positives = sum(bool(query(image)) for image in unrelated)
+    print(f"\n  • Unrelated photos flagged: {false_positives}/{len(unrelated)}")
+
+    print_section("⏱️  Query latency")
+    print(f"  • Tile hashing: median {np.median(hash_ms):.1f} ms, p95 {np.percentile(hash_ms, 95):.1f} ms")
+    print(f"  • Index search: median {np.median(search_ms):.1f} ms, p95 {np.percentile(search_ms, 95):.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
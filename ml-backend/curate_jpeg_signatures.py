@@ -0,0 +1,109 @@
+"""
+Curate the camera quantization-table signatures used by the JPEG fingerprint
+Reads camera originals from a trusted source (device test shots, manufacturer
+samples; never claim uploads) and adds the tables of each Make/Model to the
+signature file shipped with the app. The running service only reads that
+file, so review the resulting diff like any other change. Files that show
+signs of re-saving (libjpeg tables, Adobe segments, progressive or optimized
+encoding) or carry no camera Make are skipped.
+
+Usage:
+    python curate_jpeg_signatures.py /vetted/camera_originals
+    python curate_jpeg_signatures.py /vetted/camera_originals --min-files 3
+"""
+
+import argparse
+import io
+import json
+import os
+import struct
+from collections import defaultdict
+
+from app.services.metadata_extractor import MetadataExtractor
+from app.utils.jpeg_forensics import (
+    CAMERA_SIGNATURES_PATH, EDITOR_SEGMENTS, QuantTableIndex, camera_key, load_camera_signatures,
+    read_jpeg_structure, table_signature
+)
+from app.utils.jpeg_header import HeaderParseError
+
+
+def print_section(title):
+    print(f"\n{'='*70}")
+    print(f"  {title}")
+    print(f"{'='*70}")
+
+
+def camera_signature(path, extractor, index):
+    """(camera key, signature) of a camera original, or (None, reason) to skip it"""
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        structure = read_jpeg_structure(io.BytesIO(data))
+    except (HeaderParseError, struct.error) as e:
+        return None, f"unreadable JPEG header ({e})"
+
+    metadata = extractor.extract_metadata_from_bytes(data)
+    make = (metadata.get("camera_make") or "").strip()
+    model = (metadata.get("camera_model") or "").strip()
+    signature = table_signature(structure["quant_tables"])
+
+    if not make:
+        return None, "no camera Make"
+    if any(segment in EDITOR_SEGMENTS for segment in structure["app_segments"]):
+        return None, "Adobe segments"
+    if index.software_quality(signature) is not None:
+        return None, "standard libjpeg tables"
+    if structure["progressive"] or not structure["standard_huffman"]:
+        return None, "progressive or optimized encoding"
+    return camera_key(make, model), signature
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("originals", help="Directory of vetted camera originals")
+    parser.add_argument("--output", default=CAMERA_SIGNATURES_PATH)
+    parser.add_argument("--min-files", type=int, default=2,
+                        help="Files that must share a signature before it is added")
+    args = parser.parse_args()
+
+    extractor = MetadataExtractor()
+    index = QuantTableIndex(None)
+    counts = defaultdict(lambda: defaultdict(int))
+    skipped = 0
+
+    for directory, subdirectories, files in os.walk(args.originals):
+        subdirectories.sort()
+        for name in sorted(files):
+            if os.path.splitext(name)[1].lower() not in (".jpg", ".jpeg"):
+                continue
+            path = os.path.join(directory, name)
+            key, signature = camera_signature(path, extractor, index)
+            if key is None:
+                skipped += 1
+                print(f"  ⚠️  {path}: skipped, {signature}")
+                continue
+            counts[key][signature] += 1
+
+    cameras = load_camera_signatures(args.output) if os.path.exists(args.output) else {}
+    added = 0
+    for key, signatures in sorted(counts.items()):
+        for signature, count in sorted(signatures.items()):
+            if count >= args.min_files and signature not in cameras.get(key, []):
+                cameras.setdefault(key, []).append(signature)
+                added += 1
+                print(f"  • {key}: {signature} ({count} files)")
+
+    # Write beside the target and rename, so a running reader never sees half a file
+    temp_path = f"{args.output}.tmp"
+    with open(temp_path, "w") as f:
+        json.dump({"cameras": cameras}, f, indent=2, sort_keys=True)
+        f.write("\n")
+    os.replace(temp_path, args.output)
+
+    print_section("✅ Signatures curated")
+    print(f"  • Added: {added}  |  Cameras: {len(cameras)}  |  Skipped files: {skipped}")
+    print(f"  • Written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -195,7 +195,7 @@ def test_fraud_detection():
     print("  • Overall fraud risk calculation")
     
     print("\n💾 Storage:")
-    print("  • File-based hash storage: data/image_hashes.json")
+    print("  • File-based hash storage: data/image_hashes.bin (append-only log)")
     print("  • (Qdrant vector DB optional for production)")
     
     print("\n🏆 DAY 6 DELIVERABLES COMPLETE!")
@@ -0,0 +1,131 @@
+"""
+Test the hash indexes against a brute-force scan
+Checks MultiIndexHashIndex (chunk tables, pending hashes, merges, batch
+search) and PackedHashColumns in both distance metrics, with hashes planted
+exactly at, inside and just outside the search radius, so a pigeonhole
+probe that misses a bucket shows up as a missing match.
+
+Usage:
+    python -m pytest test_hash_index.py
+    python test_hash_index.py
+"""
+
+import numpy as np
+
+from app.utils.hamming import PackedHashColumns
+from app.utils.hash_index import ExactHashIndex, MultiIndexHashIndex
+
+METRICS = ("bits", "hex")
+# 6 is the duplicate threshold (0.9 similarity); 3/4 straddle a chunk-radius step,
+# 12 is wide enough for the hex index to fall back to a scan
+RADII = (0, 3, 4, 6, 7, 12)
+
+
+def reference_distance(a, b, metric):
+    """Distance the way it is defined: differing bits, or differing hex characters"""
+    if metric == "bits":
+        return bin(a ^ b).count("1")
+    return sum(x != y for x, y in zip(f"{a:016x}", f"{b:016x}"))
+
+
+def at_distance(rng, value, distance, metric):
+    """A hash exactly `distance` away from value"""
+    if metric == "bits":
+        for bit in rng.choice(64, size=distance, replace=False):
+            value ^= 1 << int(bit)
+    else:
+        for digit in rng.choice(16, size=distance, replace=False):
+            value ^= int(rng.integers(1, 16)) << (4 * int(digit))
+    return value
+
+
+def make_hashes(rng, metric, queries):
+    """Random hashes plus, for every query, neighbours on both sides of each radius"""
+    hashes = [int(value) for value in rng.integers(0, 2 ** 63, size=1500, dtype=np.int64)]
+    hashes += [int(value) << 1 for value in rng.integers(0, 2 ** 63, size=500, dtype=np.int64)]
+    for query in queries:
+        for radius in RADII:
+            for distance in (radius - 1, radius, radius + 1):
+                if 0 <= distance <= 16:
+                    hashes.append(at_distance(rng, query, distance, metric))
+    order = rng.permutation(len(hashes))
+    return [hashes[i] for i in order]
+
+
+def brute_force(hashes, query, radius, metric):
+    return sorted(
+        (position, reference_distance(value, query, metric))
+        for position, value in enumerate(hashes)
+        if reference_distance(value, query, metric) <= radius
+    )
+
+
+def test_multi_index_matches_brute_force():
+    rng = np.random.default_rng(0)
+    for metric in METRICS:
+        queries = [int(value) for value in rng.integers(0, 2 ** 63, size=20, dtype=np.int64)]
+        hashes = make_hashes(rng, metric, queries)
+
+        # Built tables, merged additions and still-pending additions all searched
+        index = MultiIndexHashIndex(num_chunks=4, max_pending=64, metric=metric)
+        split = len(hashes) // 2
+        index.build(hashes[:split])
+        for value in hashes[split:]:
+            index.add(value)
+        assert len(index) == len(hashes)
+        assert index._pending, "some additions should still be pending"
+
+        for radius in RADII:
+            for query in queries:
+                expected = brute_force(hashes, query, radius, metric)
+                assert sorted(index.search(query, radius)) == expected, (metric, radius)
+
+            query_ids, positions, distances = index.search_batch(np.array(queries, dtype=np.uint64), radius)
+            found = sorted(zip(query_ids.tolist(), positions.tolist(), distances.tolist()))
+            expected = sorted(
+                (query_id, position, distance)
+                for query_id, query in enumerate(queries)
+                for position, distance in brute_force(hashes, query, radius, metric)
+            )
+            assert found == expected, (metric, radius)
+
+
+def test_packed_columns_match_brute_force():
+    rng = np.random.default_rng(1)
+    for metric in METRICS:
+        queries = [int(value) for value in rng.integers(0, 2 ** 63, size=10, dtype=np.int64)]
+        hashes = make_hashes(rng, metric, queries)
+
+        columns = PackedHashColumns(fields=("phash",), capacity=16)
+        for value in hashes:
+            columns.append([value])
+
+        for radius in RADII:
+            # A small block size walks the column in several blocks
+            results = columns.search_batch("phash", queries, radius, block_size=256, metric=metric)
+            for query, (positions, distances) in zip(queries, results):
+                expected = brute_force(hashes, query, radius, metric)
+                assert list(zip(positions.tolist(), distances.tolist())) == expected, (metric, radius)
+
+            positions, distances = columns.search("phash", queries[0], radius, metric=metric)
+            assert list(zip(positions.tolist(), distances.tolist())) == brute_force(hashes, queries[0], radius, metric)
+
+
+def test_exact_index_lookup():
+    rng = np.random.default_rng(2)
+    keys = [int(value) for value in rng.integers(1, 50, size=300)] + [0] * 5
+    index = ExactHashIndex(max_pending=16)
+    index.build(np.array(keys[:100], dtype=np.uint64))
+    for key in keys[100:]:
+        index.add(key)
+
+    assert len(index) == len(keys)
+    assert index.lookup(0) == []
+    for key in set(keys) - {0}:
+        assert index.lookup(key) == [position for position, value in enumerate(keys) if value == key]
+
+
+if __name__ == "__main__":
+    for test in (test_multi_index_matches_brute_force, test_packed_columns_match_brute_force, test_exact_index_lookup):
+        test()
+        print(f"✅ {test.__name__}")
@@ -0,0 +1,156 @@
+"""
+Test the append-only hash log round trip
+Appends, group commit and reopening after a partial group (including a torn
+trailing record), compaction, the version 1 → 2 upgrade and the one-time
+migration of a legacy image_hashes.json store, each checked by reopening the
+log and reading every record back.
+
+Usage:
+    python -m pytest test_hash_store.py
+    python test_hash_store.py
+"""
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+
+import numpy as np
+
+from app.utils.hash_store import (
+    HEADER_FORMAT, HEADER_SIZE, MAGIC, RECORD_DTYPE, RECORD_DTYPE_V1, HashLogStore
+)
+
+
+def make_record(i, job_id=None, sha256=True):
+    rng = np.random.default_rng(i)
+    record = {
+        "job_id": job_id or f"job-{i}",
+        "timestamp": f"2024-01-{i % 28 + 1:02d}T10:00:00",
+        "sha256": hashlib.sha256(f"image {i}".encode()).hexdigest() if sha256 else None,
+    }
+    for field in ("phash", "dhash", "whash", "average_hash"):
+        record[field] = format(int(rng.integers(0, 2 ** 63, dtype=np.int64)) << 1 | 1, "016x")
+    return record
+
+
+def read_all(store):
+    return [store.get(position) for position in range(len(store))]
+
+
+def test_append_and_reopen():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hashes.bin")
+        records = [make_record(i, sha256=i % 2 == 0) for i in range(20)]
+
+        store = HashLogStore(path)
+        assert [store.append(record) for record in records] == list(range(20))
+        assert read_all(store) == records
+
+        reopened = HashLogStore(path)
+        assert len(reopened) == 20
+        assert read_all(reopened) == records
+
+
+def test_reopen_after_partial_group():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hashes.bin")
+        records = [make_record(i) for i in range(12)]
+
+        store = HashLogStore(path, group_commit=True)
+        for record in records[:8]:
+            store.append(record)
+        assert store.sync() == 8
+
+        # A second group is appended but never synced (the process dies)
+        for record in records[8:]:
+            store.append(record)
+        assert store.pending_count == 4
+        assert read_all(store) == records
+
+        # ...and the last write was torn halfway through a record
+        with open(path, "ab") as f:
+            f.write(b"\x01" * (RECORD_DTYPE.itemsize // 2))
+
+        reopened = HashLogStore(path, group_commit=True)
+        assert len(reopened) == 8
+        assert read_all(reopened) == records[:8]
+        assert os.path.getsize(path) == HEADER_SIZE + 8 * RECORD_DTYPE.itemsize
+
+        # Appends continue cleanly after the truncated tail
+        assert reopened.append(records[8]) == 8
+        reopened.sync()
+        assert read_all(HashLogStore(path)) == records[:9]
+
+
+def test_compaction_keeps_latest_per_job():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hashes.bin")
+        store = HashLogStore(path, compact_every=10, group_commit=True)
+
+        expected = {}
+        for i in range(30):
+            record = make_record(i, job_id=f"job-{i % 10}")
+            store.append(record)
+            expected[record["job_id"]] = record
+        assert store.should_compact()
+
+        # compact() syncs the pending group first
+        assert store.compact()
+        assert not store.should_compact()
+        assert len(store) == 10
+        assert sorted(read_all(store), key=lambda r: r["job_id"]) == sorted(expected.values(), key=lambda r: r["job_id"])
+        assert not store.compact()
+
+        reopened = HashLogStore(path)
+        assert read_all(reopened) == read_all(store)
+
+
+def test_upgrade_from_v1():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hashes.bin")
+        records = [make_record(i, sha256=False) for i in range(5)]
+
+        old = np.zeros(len(records), dtype=RECORD_DTYPE_V1)
+        for row, record in zip(old, records):
+            for field in ("phash", "dhash", "whash", "average_hash"):
+                row[field] = int(record[field], 16)
+            row["timestamp"] = record["timestamp"].encode()
+            row["job_id"] = record["job_id"].encode()
+        with open(path, "wb") as f:
+            f.write(struct.pack(HEADER_FORMAT, MAGIC, 1, RECORD_DTYPE_V1.itemsize))
+            f.write(old.tobytes())
+
+        store = HashLogStore(path)
+        assert read_all(store) == records
+        assert os.path.getsize(path) == HEADER_SIZE + len(records) * RECORD_DTYPE.itemsize
+
+        store.append(make_record(5))
+        assert read_all(HashLogStore(path)) == records + [make_record(5)]
+
+
+def test_migrate_legacy_json():
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "hashes.bin")
+        json_path = os.path.join(tmp, "image_hashes.json")
+        # Legacy records carry no sha256
+        records = [make_record(i, sha256=False) for i in range(7)]
+        with open(json_path, "w") as f:
+            json.dump([{key: value for key, value in record.items() if key != "sha256"} for record in records], f)
+
+        store = HashLogStore(path, legacy_json_path=json_path)
+        assert read_all(store) == records
+        assert not os.path.exists(json_path)
+        assert os.path.exists(f"{json_path}.migrated")
+
+        # Later opens use the log; the migrated JSON is not read again
+        store.append(make_record(7))
+        assert read_all(HashLogStore(path, legacy_json_path=json_path)) == records + [make_record(7)]
+
+
+if __name__ == "__main__":
+    for test in (test_append_and_reopen, test_reopen_after_partial_group, test_compaction_keeps_latest_per_job,
+                 test_upgrade_from_v1, test_migrate_legacy_json):
+        test()
+        print(f"✅ {test.__name__}")